@@ -0,0 +1,196 @@
+from netfilterqueue import NetfilterQueue
+import asyncio
+import os
+import socket
+import struct
+import helper
+import reporting
+
+# Netlink message of a batch verdict (linux/netfilter/nfnetlink_queue.h)
+NFNL_SUBSYS_QUEUE = 3
+NFQNL_MSG_VERDICT_BATCH = 3
+NFQA_VERDICT_HDR = 2
+NLM_F_REQUEST = 1
+NF_ACCEPT = 1
+# Netlink message of the configuration of a queue: NFQA_CFG_F_GSO queues the GSO packets before their segmentation
+NFQNL_MSG_CONFIG = 2
+NFQA_CFG_MASK = 4
+NFQA_CFG_FLAGS = 5
+NFQA_CFG_F_GSO = 4
+
+CONTROL_INTERFACE_HOST = '127.0.0.1'
+
+def build_batch_verdict_header(queue_number):
+	'''
+	Returns the netlink message giving a verdict to all the packets of the queue with an id up to the one appended to it
+	(NFQNL_MSG_VERDICT_BATCH, not exposed by python-netfilterqueue) without its last 8 bytes, i.e. the verdict and the packet id.
+	:param queue_number: The number of the netfilter queue.
+	'''
+	netlink_header = struct.pack('=IHHII', 32, (NFNL_SUBSYS_QUEUE << 8) | NFQNL_MSG_VERDICT_BATCH, NLM_F_REQUEST, 0, 0)
+	netfilter_header = struct.pack('!BBH', socket.AF_UNSPEC, 0, queue_number)
+	attribute_header = struct.pack('=HH', 12, NFQA_VERDICT_HDR)
+	return netlink_header + netfilter_header + attribute_header
+
+def build_gso_config_message(queue_number):
+	'''
+	Returns the netlink message setting the NFQA_CFG_F_GSO flag of the queue (not exposed by python-netfilterqueue): the kernel queues
+	the GSO packets whole, instead of segmenting them in software first, and they are segmented by the device (or later on the path).
+	:param queue_number: The number of the netfilter queue.
+	'''
+	netlink_header = struct.pack('=IHHII', 36, (NFNL_SUBSYS_QUEUE << 8) | NFQNL_MSG_CONFIG, NLM_F_REQUEST, 0, 0)
+	netfilter_header = struct.pack('!BBH', socket.AF_UNSPEC, 0, queue_number)
+	mask = struct.pack('=HH', 8, NFQA_CFG_MASK) + struct.pack('!I', NFQA_CFG_F_GSO)
+	flags = struct.pack('=HH', 8, NFQA_CFG_FLAGS) + struct.pack('!I', NFQA_CFG_F_GSO)
+	return netlink_header + netfilter_header + mask + flags
+
+def enable_gso(nfqueue, queue_number):
+	'''
+	Negotiates the GSO packets with the bound queue (see build_gso_config_message).
+	:param nfqueue: The NetfilterQueue, or the Async_Queue or flow_sessions.Flow_Sessions wrapping it.
+	:param queue_number: The number of the netfilter queue.
+	'''
+	os.write(nfqueue.get_fd(), build_gso_config_message(queue_number))
+
+class Batched_Packet:
+
+	__slots__ = ('queue', 'packet', 'modified')
+
+	def __init__(self, queue, packet):
+		'''
+		The packet given to the callback of the covert channel by Async_Queue. A plain accept() is deferred and sent with the following ones
+		in a single batch verdict; a packet with a new payload first sends the pending batch, then its own verdict, so the packets keep their order.
+		:param queue: The Async_Queue.
+		:param packet: The NetfilterQueue Packet object.
+		'''
+		self.queue = queue
+		self.packet = packet
+		self.modified = False
+
+	def get_payload(self):
+		return self.packet.get_payload()
+
+	def get_payload_len(self):
+		return self.packet.get_payload_len()
+
+	def set_payload(self, payload):
+		self.modified = True
+		self.packet.set_payload(payload)
+
+	def accept(self):
+		if self.modified:
+			self.queue.send_batch_verdict()
+			self.packet.accept()
+			self.queue.verdict_messages += 1
+		else:
+			self.queue.pending_id = self.packet.id
+
+	def drop(self):
+		self.queue.send_batch_verdict()
+		self.packet.drop()
+		self.queue.verdict_messages += 1
+
+class Async_Queue:
+
+	def __init__(self, cc, control_port=0):
+		'''
+		Used by the covert channel cc in place of a NetfilterQueue (same bind, run and unbind methods) to drive it from an asyncio event loop.
+		Each time the socket of the queue is readable, all the queued packets are read and handled, and the plain accept() verdicts are sent
+		in batches. The same loop runs the reports of the channel (reporting.Loop_Reporter) and, if control_port is given, a control interface
+		on CONTROL_INTERFACE_HOST which answers the line commands stats, flush and stop.
+		:param cc: The covert channel.
+		:param control_port: The TCP port of the control interface (0: no control interface).
+		'''
+		self.cc = cc
+		self.control_port = control_port
+		self.nfqueue = NetfilterQueue()
+		self.callback = None
+		self.batch_verdict_header = None
+		self.pending_id = None
+		self.stopped = None
+
+		self.packets = 0
+		self.wakeups = 0
+		self.verdict_messages = 0
+
+	def bind(self, queue_number, callback, range=helper.FULL_COPY_RANGE):
+		self.callback = callback
+		self.batch_verdict_header = build_batch_verdict_header(queue_number)
+		self.nfqueue.bind(queue_number, self.run_callback, range=range)
+
+	def unbind(self):
+		self.nfqueue.unbind()
+
+	def get_fd(self):
+		return self.nfqueue.get_fd()
+
+	def run_callback(self, packet):
+		self.packets += 1
+		self.callback(Batched_Packet(self, packet))
+
+	def send_batch_verdict(self):
+		if self.pending_id is not None:
+			os.write(self.nfqueue.get_fd(), self.batch_verdict_header + struct.pack('!II', NF_ACCEPT, self.pending_id))
+			self.pending_id = None
+			self.verdict_messages += 1
+
+	def read_packets(self):
+		self.wakeups += 1
+		# Handles the packets until the socket is empty
+		self.nfqueue.run(False)
+		self.send_batch_verdict()
+
+	def run(self):
+		'''
+		Runs the event loop until the stop command. Ctrl + c stops it too and is raised.
+		'''
+		asyncio.run(self.serve())
+
+	async def serve(self):
+		loop = asyncio.get_running_loop()
+		self.stopped = loop.create_future()
+		# The pending reports of the thread reporter run before the ones of the loop
+		self.cc.reporter.close()
+		self.cc.reporter = reporting.Loop_Reporter(loop)
+		fd = self.nfqueue.get_fd()
+		loop.add_reader(fd, self.read_packets)
+		server = None
+		if self.control_port:
+			server = await asyncio.start_server(self.control, CONTROL_INTERFACE_HOST, self.control_port)
+		try:
+			await self.stopped
+		finally:
+			loop.remove_reader(fd)
+			if server is not None:
+				server.close()
+				await server.wait_closed()
+
+	async def control(self, reader, writer):
+		while True:
+			line = await reader.readline()
+			if not line:
+				break
+			command = line.decode().strip()
+			if command == 'stats':
+				writer.write(self.get_stats().encode())
+			elif command == 'flush':
+				self.cc.reporter.flush()
+				writer.write(b'ok\n')
+			elif command == 'stop':
+				writer.write(b'ok\n')
+				if not self.stopped.done():
+					self.stopped.set_result(None)
+			else:
+				writer.write(b'unknown command (stats, flush, stop)\n')
+			await writer.drain()
+		writer.close()
+
+	def get_stats(self):
+		'''
+		Returns the state of the covert channel and of the queue, as printed by the stats command.
+		'''
+		stats = "- Number of Repetitions: " + str(self.cc.number_of_repetitions_done) + "/" + str(self.cc.number_of_repetitions) + "\n"
+		stats += "- Stego-packets: " + str(self.cc.sent_received_chunks) + "/" + str(len(self.cc.chunks)) + "\n"
+		stats += "- Packets: " + str(self.packets) + "\n"
+		stats += "- Wake-ups: " + str(self.wakeups) + "\n"
+		stats += "- Verdict messages: " + str(self.verdict_messages) + "\n"
+		return stats
@@ -0,0 +1,127 @@
+import optparse
+import os
+import random
+import sys
+import time
+from array import array
+sys.path.insert(1, '../')
+import helper
+
+# The symbol widths of the start/stop covert channels using character stuffing and their escape values (END_MAGIC_VALUE)
+CHANNELS = [
+	("Traffic Class", 254),
+	("Flow Label", 1048574)
+]
+
+def build_symbols(symbols, field_length_in_bits, escape_value, escape_rate):
+	'''
+	Returns an array of random chunks in which a share escape_rate of the symbols is replaced by the escape value.
+	'''
+	chunks = helper.unpack_chunks(os.urandom(-(-symbols * field_length_in_bits // 8)), field_length_in_bits)
+	del chunks[symbols:]
+	for x in random.sample(range(symbols), int(symbols * escape_rate)):
+		chunks[x] = escape_value
+	return chunks
+
+def legacy_stuff(chunks, escape_value):
+	stuffed = []
+	for x in chunks:
+		stuffed.append(x)
+		if x == escape_value:
+			stuffed.append(x)
+	return stuffed
+
+def legacy_unstuff(list_to_unstuff, escape_value):
+	one_skipped = False
+	tmp = []
+	for k in range(len(list_to_unstuff)):
+		if list_to_unstuff[k] == escape_value:
+			if not one_skipped:
+				one_skipped = True
+				continue
+			else:
+				one_skipped = False
+				tmp.append(list_to_unstuff[k])
+		else:
+			tmp.append(list_to_unstuff[k])
+	return tmp
+
+def streaming_unstuff(stuffed, escape_value, field_length_in_bits):
+	unstuffer = helper.Character_Unstuffer(escape_value, field_length_in_bits)
+	push = unstuffer.push
+	for x in stuffed:
+		push(x)
+	return unstuffer.data
+
+def batch_unstuff(stuffed, escape_value, field_length_in_bits, batch_size):
+	unstuffer = helper.Character_Unstuffer(escape_value, field_length_in_bits)
+	for x in range(0, len(stuffed), batch_size):
+		unstuffer.feed(stuffed[x:x + batch_size])
+	return unstuffer.data
+
+def measure(function, symbols, *args):
+	start = time.perf_counter()
+	result = function(*args)
+	return symbols / (time.perf_counter() - start), result
+
+def process_command_line(argv):
+	parser = optparse.OptionParser()
+
+	parser.add_option(
+	'-n',
+	'--symbols',
+	help='specify the number of symbols of the message (default: 1000000)',
+	default=1000000,
+	action='store',
+	type='int',
+	dest='symbols')
+
+	parser.add_option(
+	'-e',
+	'--escape_rate',
+	help='specify the share of symbols equal to the escape value (default: 0.01)',
+	default=0.01,
+	action='store',
+	type='float',
+	dest='escape_rate')
+
+	parser.add_option(
+	'-b',
+	'--batch_size',
+	help='specify the number of symbols fed at once to the unstuffer in batch mode (default: 4096)',
+	default=4096,
+	action='store',
+	type='int',
+	dest='batch_size')
+
+	settings, args = parser.parse_args(argv)
+	return settings, args
+
+if __name__ == "__main__":
+
+	settings, args = process_command_line(sys.argv)
+
+	print('')
+	print('##################### CHARACTER STUFFING BENCHMARK #####################')
+	print('- Symbols: ' + str(settings.symbols) + ' (escape rate: ' + str(settings.escape_rate) + ')')
+	for field, escape_value in CHANNELS:
+		field_length_in_bits = helper.IPv6_HEADER_FIELD_LENGTHS_IN_BITS[field]
+		chunks = build_symbols(settings.symbols, field_length_in_bits, escape_value, settings.escape_rate)
+
+		legacy_stuff_rate, legacy_stuffed = measure(legacy_stuff, settings.symbols, chunks, escape_value)
+		stuff_rate, stuffed = measure(helper.character_stuff, settings.symbols, chunks, escape_value)
+		legacy_unstuff_rate, legacy_unstuffed = measure(legacy_unstuff, len(stuffed), legacy_stuffed, escape_value)
+		streaming_rate, streamed = measure(streaming_unstuff, len(stuffed), stuffed, escape_value, field_length_in_bits)
+		batch_rate, batched = measure(batch_unstuff, len(stuffed), stuffed, escape_value, field_length_in_bits, settings.batch_size)
+
+		if list(stuffed) != legacy_stuffed or legacy_unstuffed != list(chunks) or streamed != chunks or batched != chunks:
+			raise ValueError("ValueError: the stuffing implementations do not agree!")
+
+		print('- ' + field + ' (' + str(field_length_in_bits) + ' bits):')
+		print('  Stuffing (legacy loop): ' + str(round(legacy_stuff_rate / 10**6, 2)) + ' Msymbols/s')
+		print('  Stuffing (character_stuff): ' + str(round(stuff_rate / 10**6, 2)) + ' Msymbols/s')
+		print('  Unstuffing (legacy loop): ' + str(round(legacy_unstuff_rate / 10**6, 2)) + ' Msymbols/s')
+		print('  Unstuffing (Character_Unstuffer.push, per symbol): ' + str(round(streaming_rate / 10**6, 2)) + ' Msymbols/s')
+		print('  Unstuffing (Character_Unstuffer.feed, ' + str(settings.batch_size) + ' symbols): ' + str(round(batch_rate / 10**6, 2)) + ' Msymbols/s')
+	print('##################### CHARACTER STUFFING BENCHMARK #####################')
+	print('')
@@ -0,0 +1,89 @@
+import optparse
+import sys
+import time
+sys.path.insert(1, '../')
+import helper
+import header_codec
+from header_codec_benchmark import build_ipv6_tcp_packet
+
+def hop_limit_inject(pkt, value):
+	# As the Hop Limit cc: the hop limit is raised or lowered by 20 to carry a bit
+	if value == 1:
+		header_codec.set_hop_limit(pkt, header_codec.get_hop_limit(pkt) + 20)
+	else:
+		header_codec.set_hop_limit(pkt, header_codec.get_hop_limit(pkt) - 20)
+
+def hop_limit_exfiltrate(pkt):
+	return 1 if header_codec.get_hop_limit(pkt) > 64 else 0
+
+# The single field covert channels: (name, bits per packet, inject, exfiltrate)
+SINGLE_FIELD_CHANNELS = [
+	("Flow Label", helper.IPv6_HEADER_FIELD_LENGTHS_IN_BITS["Flow Label"], header_codec.set_flow_label, header_codec.get_flow_label),
+	("Traffic Class", helper.IPv6_HEADER_FIELD_LENGTHS_IN_BITS["Traffic Class"], header_codec.set_traffic_class, header_codec.get_traffic_class),
+	("Hop Limit", 1, hop_limit_inject, hop_limit_exfiltrate)
+]
+
+def get_composite_channel(fields):
+	codec = header_codec.Composite_Codec(fields)
+	return ("Composite (" + " + ".join(fields) + ")", codec.field_length_in_bits, codec.set, codec.get)
+
+def exfiltrate_file(raw, filepath, channel):
+	'''
+	Sends the chunks of the file through the fields of the channel (one stego-packet per chunk, as in the naive mode) and reads them back.
+	Returns the number of stego-packets and the processing time.
+	'''
+	name, field_length_in_bits, inject, exfiltrate = channel
+	chunks = helper.Chunk_Source(filepath, field_length_in_bits)
+	start = time.perf_counter()
+	for chunk in chunks:
+		pkt = bytearray(raw)
+		inject(pkt, chunk)
+		if exfiltrate(pkt) != chunk:
+			raise ValueError("ValueError: the " + name + " channel exfiltrated a wrong chunk!")
+	return len(chunks), time.perf_counter() - start
+
+def process_command_line(argv):
+	parser = optparse.OptionParser()
+
+	parser.add_option(
+	'-f',
+	'--files',
+	help='specify the comma separated files to exfiltrate (default: ../test5000,../test10000)',
+	default='../test5000,../test10000',
+	action='store',
+	type='string',
+	dest='files')
+
+	parser.add_option(
+	'-r',
+	'--packet_rate',
+	help='specify the packets/s of the overt flow (default: 1000)',
+	default=1000,
+	action='store',
+	type='float',
+	dest='packet_rate')
+
+	settings, args = parser.parse_args(argv)
+	settings.files = settings.files.split(',')
+	return settings, args
+
+if __name__ == "__main__":
+
+	settings, args = process_command_line(sys.argv)
+	raw = build_ipv6_tcp_packet(1420)
+	channels = SINGLE_FIELD_CHANNELS + [
+		get_composite_channel(["Flow Label", "DSCP", "Hop Limit"]),
+		get_composite_channel(["Flow Label", "Traffic Class", "Hop Limit"])
+	]
+
+	print('')
+	print('##################### COMPOSITE CHANNEL BENCHMARK #####################')
+	print('- Overt flow: ' + str(settings.packet_rate) + ' packets/s')
+	for filepath in settings.files:
+		print('- File: ' + filepath)
+		for channel in channels:
+			packets, processing_time = exfiltrate_file(raw, filepath, channel)
+			print('  ' + channel[0] + ' (' + str(channel[1]) + ' bits/packet): ' + str(packets) + ' stego-packets, ' \
+				+ str(round(packets / settings.packet_rate, 3)) + ' s to exfiltrate, ' + str(round(processing_time * 1000, 3)) + ' ms of processing')
+	print('##################### COMPOSITE CHANNEL BENCHMARK #####################')
+	print('')
@@ -0,0 +1,113 @@
+import optparse
+import struct
+import sys
+import time
+sys.path.insert(1, '../')
+import header_codec
+
+def build_ipv6_tcp_packet(payload_size):
+	'''
+	Builds a raw IPv6/TCP packet (as returned by packet.get_payload()) without using Scapy.
+	:param payload_size: The length of the TCP payload in bytes.
+	'''
+	source = bytes.fromhex('fd000000000000000000000000000001')
+	destination = bytes.fromhex('fd000000000000000000000000000002')
+	tcp = struct.pack('!HHIIBBHHH', 40000, 5201, 123456789, 0, 5 << 4, 0x18, 64240, 0, 0) + bytes(payload_size)
+	ipv6 = struct.pack('!IHBB', 6 << 28, len(tcp), header_codec.NEXT_HEADER_TCP, 64) + source + destination
+	return ipv6 + tcp
+
+def measure(function, raw, packets):
+	start = time.perf_counter()
+	for x in range(packets):
+		function(raw, x)
+	return packets / (time.perf_counter() - start)
+
+def codec_inject(raw, value):
+	pkt = bytearray(raw)
+	header_codec.set_flow_label(pkt, value & 0xfffff)
+	return bytes(pkt)
+
+def codec_exfiltrate(raw, value):
+	return header_codec.get_flow_label(raw)
+
+def codec_reliable_inject(raw, value):
+	pkt = bytearray(raw)
+	if header_codec.get_next_header(pkt) == header_codec.NEXT_HEADER_TCP:
+		seq, payload_length = header_codec.get_tcp_sequence_number_and_payload_length(pkt)
+		header_codec.set_traffic_class(pkt, value & 0xff)
+		header_codec.set_flow_label(pkt, value & 0xfffff)
+	return bytes(pkt)
+
+def scapy_inject(raw, value):
+	pkt = IPv6(raw)
+	pkt.fl = value & 0xfffff
+	return bytes(pkt)
+
+def scapy_exfiltrate(raw, value):
+	return IPv6(raw).fl
+
+def scapy_reliable_inject(raw, value):
+	pkt = IPv6(raw)
+	if pkt.nh == 6:
+		seq, payload_length = pkt[TCP].seq, len(pkt[TCP].payload)
+		pkt.tc = value & 0xff
+		pkt.fl = value & 0xfffff
+	return bytes(pkt)
+
+def process_command_line(argv):
+	parser = optparse.OptionParser()
+
+	parser.add_option(
+	'-n',
+	'--packets',
+	help='specify the number of packets processed by each path (default: 100000)',
+	default=100000,
+	action='store',
+	type='int',
+	dest='packets')
+
+	parser.add_option(
+	'-s',
+	'--payload_size',
+	help='specify the TCP payload size of the benchmark packet in bytes (default: 1420)',
+	default=1420,
+	action='store',
+	type='int',
+	dest='payload_size')
+
+	settings, args = parser.parse_args(argv)
+	return settings, args
+
+if __name__ == "__main__":
+
+	settings, args = process_command_line(sys.argv)
+	raw = build_ipv6_tcp_packet(settings.payload_size)
+
+	results = [
+		("Header codec: inject (Flow Label)", measure(codec_inject, raw, settings.packets)),
+		("Header codec: exfiltrate (Flow Label)", measure(codec_exfiltrate, raw, settings.packets)),
+		("Header codec: reliable marking inject", measure(codec_reliable_inject, raw, settings.packets))
+	]
+
+	try:
+		from scapy.all import IPv6, TCP
+	except ImportError:
+		IPv6 = None
+		print("Scapy is not installed: only the header codec path is measured.")
+
+	if IPv6 is not None:
+		# Scapy is orders of magnitude slower, do not let it dominate the runtime
+		scapy_packets = max(1, settings.packets // 10)
+		results += [
+			("Scapy: inject (Flow Label)", measure(scapy_inject, raw, scapy_packets)),
+			("Scapy: exfiltrate (Flow Label)", measure(scapy_exfiltrate, raw, scapy_packets)),
+			("Scapy: reliable marking inject", measure(scapy_reliable_inject, raw, scapy_packets))
+		]
+
+	print('')
+	print('##################### HEADER CODEC BENCHMARK #####################')
+	print('- Packet size: ' + str(len(raw)) + ' bytes')
+	for name, rate in results:
+		print('- ' + name + ': ' + str(round(rate)) + ' packets/s')
+	print('##################### HEADER CODEC BENCHMARK #####################')
+	print('')
@@ -0,0 +1,99 @@
+import optparse
+import random
+import sys
+sys.path.insert(1, '../')
+import helper
+import header_codec
+from header_codec_benchmark import build_ipv6_tcp_packet
+
+def exfiltrate_file(raw, filepath, levels, hops, jitter, probability, seed):
+	'''
+	Sends the chunks of the file in the hop limit with the given number of levels over a path of hops routers. With the given probability,
+	a packet takes a path up to jitter hops shorter or longer. Returns the stego-packets, the wrong chunks and the wrong bits.
+	'''
+	codec = header_codec.Hop_Limit_Codec(levels, baseline=header_codec.get_hop_limit(raw) - hops)
+	chunks = helper.Chunk_Source(filepath, codec.bits)
+	rnd = random.Random(seed)
+	failures = 0
+	bit_errors = 0
+	for chunk in chunks:
+		pkt = bytearray(raw)
+		codec.set(pkt, chunk)
+		path = hops
+		if jitter > 0 and rnd.random() < probability:
+			path += rnd.choice([x for x in range(-jitter, jitter + 1) if x != 0])
+		header_codec.set_hop_limit(pkt, header_codec.get_hop_limit(pkt) - path)
+		value = codec.get(pkt)
+		if value != chunk:
+			failures += 1
+			bit_errors += bin(value ^ chunk).count('1')
+	return len(chunks), failures, bit_errors
+
+def process_command_line(argv):
+	parser = optparse.OptionParser()
+
+	parser.add_option(
+	'-f',
+	'--file',
+	help='specify the file to exfiltrate (default: ../test10000)',
+	default='../test10000',
+	action='store',
+	type='string',
+	dest='file')
+
+	parser.add_option(
+	'-o',
+	'--hops',
+	help='specify the number of routers between sender and receiver (default: 0)',
+	default=0,
+	action='store',
+	type='int',
+	dest='hops')
+
+	parser.add_option(
+	'-j',
+	'--jitter',
+	help='specify the largest change of the path length, in hops (default: 3)',
+	default=3,
+	action='store',
+	type='int',
+	dest='jitter')
+
+	parser.add_option(
+	'-p',
+	'--probability',
+	help='specify the probability that a packet takes a path of a different length (default: 0.05)',
+	default=0.05,
+	action='store',
+	type='float',
+	dest='probability')
+
+	parser.add_option(
+	'-l',
+	'--max_levels',
+	help='specify the largest number of levels, a power of 2 (default: 16)',
+	default=16,
+	action='store',
+	type='int',
+	dest='max_levels')
+
+	settings, args = parser.parse_args(argv)
+	return settings, args
+
+if __name__ == "__main__":
+
+	settings, args = process_command_line(sys.argv)
+	raw = build_ipv6_tcp_packet(1420)
+
+	print('')
+	print('##################### HOP LIMIT LEVELS BENCHMARK #####################')
+	print('- File: ' + settings.file)
+	print('- Path: ' + str(settings.hops) + ' hops, +/-' + str(settings.jitter) + ' hops for ' + str(settings.probability * 100) + '% of the packets')
+	levels = 2
+	while levels <= settings.max_levels:
+		packets, failures, bit_errors = exfiltrate_file(raw, settings.file, levels, settings.hops, settings.jitter, settings.probability, levels)
+		print('- Levels: ' + str(levels) + ' (' + str(levels.bit_length() - 1) + ' bits/packet): ' + str(packets) + ' stego-packets, error rate: ' \
+			+ str(round(failures / packets, 4)) + ' failures/packet, bit error rate: ' + str(round(bit_errors / (packets * (levels.bit_length() - 1)), 4)))
+		levels *= 2
+	print('##################### HOP LIMIT LEVELS BENCHMARK #####################')
+	print('')
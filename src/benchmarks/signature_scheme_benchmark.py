@@ -0,0 +1,98 @@
+import functools
+import multiprocessing
+import optparse
+import os
+import sys
+import tempfile
+import time
+sys.path.insert(1, '../')
+import helper
+
+def measure(function, *args):
+	start = time.perf_counter()
+	result = function(*args)
+	return time.perf_counter() - start, result
+
+def build_legacy(n, indices):
+	return helper.Signature_Stream(indices, n).signatures
+
+def build_counter(n, indices):
+	return helper.get_counter_signatures(0, n, indices)
+
+def build_counter_in_parallel(n, indices, workers):
+	'''
+	Splits the n signatures in one range per worker: each worker computes its range directly from the indices of the signatures.
+	'''
+	bounds = [n * x // workers for x in range(workers + 1)]
+	with multiprocessing.Pool(workers) as pool:
+		ranges = pool.starmap(functools.partial(helper.get_counter_signatures, indices=indices), zip(bounds, bounds[1:]))
+	signatures = ranges[0]
+	for x in ranges[1:]:
+		signatures.extend(x)
+	return signatures
+
+def open_cache(n, indices, directory):
+	return helper.Signature_Cache('counter', indices, directory=directory).get_range(0, n)
+
+def process_command_line(argv):
+	parser = optparse.OptionParser()
+
+	parser.add_option(
+	'-n',
+	'--signatures',
+	help='specify the number of signatures of the session (default: 1000000)',
+	default=1000000,
+	action='store',
+	type='int',
+	dest='signatures')
+
+	parser.add_option(
+	'-w',
+	'--workers',
+	help='specify the number of worker processes computing the counter mode signatures in parallel (default: number of CPUs)',
+	default=os.cpu_count(),
+	action='store',
+	type='int',
+	dest='workers')
+
+	settings, args = parser.parse_args(argv)
+	return settings, args
+
+if __name__ == "__main__":
+
+	settings, args = process_command_line(sys.argv)
+	n = settings.signatures
+
+	print('')
+	print('##################### SIGNATURE SCHEME BENCHMARK #####################')
+	print('- Signatures: ' + str(n) + ' (workers: ' + str(settings.workers) + ')')
+	for field, indices in (("Flow Label", helper.USED_INDICES_OF_HASH_FLOW_LABEL), ("Traffic Class", helper.USED_INDICES_OF_HASH_TRAFFIC_CLASS)):
+		legacy_time, legacy = measure(build_legacy, n, indices)
+		counter_time, counter = measure(build_counter, n, indices)
+		parallel_time, parallel = measure(build_counter_in_parallel, n, indices, settings.workers)
+		if parallel != counter:
+			raise ValueError("ValueError: the parallel counter mode signatures differ!")
+
+		# Random access to the last signature of the session
+		legacy_access_time, legacy_last = measure(helper.get_md5_signature_at_indices, n - 1, indices)
+		counter_access_time, counter_last = measure(helper.get_counter_signatures, n - 1, n, indices)
+		if legacy_last != legacy[-1] or counter_last[0] != counter[-1]:
+			raise ValueError("ValueError: the random access signatures differ!")
+
+		# First run (the cache file is generated) and following runs (the cache file is mapped)
+		with tempfile.TemporaryDirectory() as directory:
+			cache_build_time, cached = measure(open_cache, n, indices, directory)
+			cache_open_time, cached = measure(open_cache, n, indices, directory)
+		if cached != counter:
+			raise ValueError("ValueError: the cached signatures differ!")
+
+		print('- Signature in field: ' + field + ' (' + str(4 * len(indices)) + ' bits):')
+		print('  Legacy stream: ' + str(round(n / legacy_time / 10**6, 3)) + ' Msignatures/s')
+		print('  Counter mode: ' + str(round(n / counter_time / 10**6, 3)) + ' Msignatures/s')
+		print('  Counter mode (' + str(settings.workers) + ' workers): ' + str(round(n / parallel_time / 10**6, 3)) + ' Msignatures/s')
+		print('  Signature ' + str(n - 1) + ' (legacy replay): ' + str(round(legacy_access_time * 1000, 3)) + ' ms')
+		print('  Signature ' + str(n - 1) + ' (counter mode): ' + str(round(counter_access_time * 1000, 3)) + ' ms')
+		print('  Signature cache (counter mode, generated): ' + str(round(cache_build_time * 1000, 3)) + ' ms')
+		print('  Signature cache (counter mode, mapped): ' + str(round(cache_open_time * 1000, 3)) + ' ms')
+	print('##################### SIGNATURE SCHEME BENCHMARK #####################')
+	print('')
@@ -0,0 +1,78 @@
+import optparse
+import sys
+import time
+sys.path.insert(1, '../')
+import helper
+
+def get_comma_separated_args(option, opt, value, parser):
+	setattr(parser.values, option.dest, value.split(','))
+
+def measure_signature_stream(n, indices):
+	'''
+	Returns the time needed to build the stream of n signatures and the time needed to look all of them up.
+	'''
+	start = time.perf_counter()
+	signatures = helper.Signature_Stream(indices, n)
+	build_time = time.perf_counter() - start
+
+	start = time.perf_counter()
+	for x in range(n):
+		signatures[x]
+	lookup_time = time.perf_counter() - start
+
+	return build_time, lookup_time
+
+def estimate_legacy_session(n, indices, samples):
+	'''
+	Estimates the time spent by get_md5_signature_at_indices for a session of n chunks. The call for chunk i costs O(i),
+	hence the whole session is O(n^2) and is extrapolated from a few calls spread evenly over the session.
+	'''
+	sampled_time = 0.0
+	for k in range(samples):
+		signature_number = int((k + 0.5) * n / samples)
+		start = time.perf_counter()
+		helper.get_md5_signature_at_indices(signature_number, indices)
+		sampled_time += time.perf_counter() - start
+	return sampled_time / samples * n
+
+def process_command_line(argv):
+	parser = optparse.OptionParser()
+
+	parser.add_option(
+	'-n',
+	'--chunks',
+	help='specify the comma separated session lengths in chunks (default: 10000,100000,1000000)',
+	default=['10000', '100000', '1000000'],
+	action='callback',
+	callback=get_comma_separated_args,
+	type='string',
+	dest='chunks')
+
+	parser.add_option(
+	'-s',
+	'--samples',
+	help='specify the number of legacy calls used to extrapolate the legacy cost of a session (default: 20)',
+	default=20,
+	action='store',
+	type='int',
+	dest='samples')
+
+	settings, args = parser.parse_args(argv)
+	settings.chunks = [int(x) for x in settings.chunks]
+	return settings, args
+
+if __name__ == "__main__":
+
+	settings, args = process_command_line(sys.argv)
+
+	print('')
+	print('##################### SIGNATURE STREAM BENCHMARK #####################')
+	for n in settings.chunks:
+		build_time, lookup_time = measure_signature_stream(n, helper.USED_INDICES_OF_HASH_FLOW_LABEL)
+		legacy_time = estimate_legacy_session(n, helper.USED_INDICES_OF_HASH_FLOW_LABEL, settings.samples)
+		print('- Chunks: ' + str(n))
+		print('  Signature stream build: ' + str(round(build_time * 1000, 2)) + ' ms')
+		print('  Signature stream lookups: ' + str(round(lookup_time * 1000, 2)) + ' ms (' + str(round(lookup_time / n * 10**9, 2)) + ' ns/packet)')
+		print('  get_md5_signature_at_indices (estimated): ' + str(round(legacy_time, 2)) + ' s (' + str(round(legacy_time / n * 10**6, 2)) + ' us/packet)')
+	print('##################### SIGNATURE STREAM BENCHMARK #####################')
+	print('')
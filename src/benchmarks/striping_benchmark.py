@@ -0,0 +1,128 @@
+import optparse
+import sys
+import time
+sys.path.insert(1, '../')
+import helper
+import header_codec
+from header_codec_benchmark import build_ipv6_tcp_packet
+
+def send_stripe(raw, schedule):
+	'''
+	Returns the stego-packets of the stripe, marked as by the Flow Label cc (signature in the Traffic Class, chunk in the Flow Label).
+	'''
+	packets = []
+	for slot in schedule:
+		signature, data = divmod(slot, schedule.data_modulus)
+		pkt = bytearray(raw)
+		header_codec.set_traffic_class(pkt, signature)
+		header_codec.set_flow_label(pkt, data)
+		packets.append(bytes(pkt))
+	return packets
+
+def receive_stripe(packets, schedule):
+	'''
+	Returns the chunks exfiltrated from the stego-packets of the stripe, checking their signatures as the receiver.
+	'''
+	values = []
+	for pkt in packets:
+		if header_codec.get_traffic_class(pkt) == schedule.get_signature(len(values)):
+			values.append(header_codec.get_flow_label(pkt))
+	return values
+
+def run_stripes(raw, chunks, schedule, weights, packet_rate, consecutive_stego, consecutive_nonstego):
+	'''
+	Sends the message over one overt flow per weight and merges the stripes back. Each flow carries packet_rate packets/s,
+	so the duration of a stripe is the time taken by its stego and clean packets on its flow.
+	Returns the bits/s of each stripe, the aggregate bits/s and the processing time.
+	'''
+	start = time.perf_counter()
+	stripes = helper.get_stripe_indices(len(chunks), weights)
+	values = []
+	for indices in stripes:
+		stripe_schedule = schedule.select(indices, consecutive_stego)
+		values.append(receive_stripe(send_stripe(raw, stripe_schedule), stripe_schedule))
+	merged = helper.merge_stripes(stripes, values)
+	processing_time = time.perf_counter() - start
+	if merged != list(chunks):
+		raise ValueError("ValueError: the merged stripes differ from the message!")
+
+	field_length_in_bits = helper.IPv6_HEADER_FIELD_LENGTHS_IN_BITS["Flow Label"]
+	durations = []
+	for indices in stripes:
+		clean_packets = (len(indices) - 1) // consecutive_stego * consecutive_nonstego if consecutive_stego > 0 else 0
+		durations.append((len(indices) + clean_packets) / packet_rate)
+	bandwidths = [field_length_in_bits * len(indices) / duration for indices, duration in zip(stripes, durations)]
+	# The flows run in parallel: the message is received with the slowest stripe
+	aggregate = field_length_in_bits * len(chunks) / max(durations)
+	return bandwidths, aggregate, processing_time
+
+def process_command_line(argv):
+	parser = optparse.OptionParser()
+
+	parser.add_option(
+	'-f',
+	'--file',
+	help='specify the file to hide (default: ../test5000)',
+	default='../test5000',
+	action='store',
+	type='string',
+	dest='file')
+
+	parser.add_option(
+	'-n',
+	'--max_stripes',
+	help='specify the maximum number of stripes, i.e. of overt flows (default: 8)',
+	default=8,
+	action='store',
+	type='int',
+	dest='max_stripes')
+
+	parser.add_option(
+	'-r',
+	'--packet_rate',
+	help='specify the packets/s of each overt flow (default: 1000)',
+	default=1000,
+	action='store',
+	type='float',
+	dest='packet_rate')
+
+	parser.add_option(
+	'-s',
+	'--stegopackets',
+	help='specify the length of the burst of stego packets (default: 0, a single burst)',
+	default=0,
+	action='store',
+	type='int',
+	dest='stegopackets')
+
+	parser.add_option(
+	'-c',
+	'--cleanpackets',
+	help='specify the length of the burst of clean packets (default: 0)',
+	default=0,
+	action='store',
+	type='int',
+	dest='cleanpackets')
+
+	settings, args = parser.parse_args(argv)
+	return settings, args
+
+if __name__ == "__main__":
+
+	settings, args = process_command_line(sys.argv)
+	raw = build_ipv6_tcp_packet(1420)
+	chunks = helper.Chunk_Source(settings.file, helper.IPv6_HEADER_FIELD_LENGTHS_IN_BITS["Flow Label"])
+	schedule = helper.Marking_Schedule(chunks, helper.get_signature_stream('counter', helper.USED_INDICES_OF_HASH_TRAFFIC_CLASS), \
+		helper.IPv6_HEADER_FIELD_LENGTHS_IN_BITS["Flow Label"], helper.IPv6_HEADER_FIELD_LENGTHS_IN_BITS["Traffic Class"], settings.stegopackets, 254)
+
+	print('')
+	print('##################### STRIPING BENCHMARK #####################')
+	print('- Stego-packets: ' + str(len(chunks)) + ' (Flow Label, ' + str(settings.packet_rate) + ' packets/s per flow)')
+	for stripes in range(1, settings.max_stripes + 1):
+		bandwidths, aggregate, processing_time = run_stripes(raw, chunks, schedule, [1] * stripes, settings.packet_rate, settings.stegopackets, settings.cleanpackets)
+		print('- Stripes: ' + str(stripes))
+		print('  Per flow: ' + ', '.join(str(round(x, 2)) for x in bandwidths) + ' bits/s')
+		print('  Aggregate: ' + str(round(aggregate, 2)) + ' bits/s')
+		print('  Processing (mark, check and merge): ' + str(round(processing_time * 1000, 3)) + ' ms')
+	print('##################### STRIPING BENCHMARK #####################')
+	print('')
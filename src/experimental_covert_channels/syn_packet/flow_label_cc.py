@@ -18,7 +18,6 @@ class Flow_Label_CC:
 		:raises ValueError: if the chunks is an empty list.
 		'''
 		self.chunks = chunks 				
-		self.int_chunks = [int(x,2) for x in self.chunks] 				
 		self.role = role
 		self.filepath = filepath
 
@@ -32,8 +31,8 @@ class Flow_Label_CC:
 		if pkt.nh == helper.PROTOCOL_IDS["TCP"]:
 			this_flow = (pkt.src, pkt.dst, pkt.fl)
 			if this_flow not in self.known_flows:
-				if self.sent_received_chunks < len(self.int_chunks):
-					secret_value = int(self.chunks[self.sent_received_chunks], 2)
+				if self.sent_received_chunks < len(self.chunks):
+					secret_value = self.chunks[self.sent_received_chunks]
 					self.sent_received_chunks += 1
 					self.known_flows[this_flow] = secret_value
 					self.exfiltrated_data = secret_value
@@ -106,11 +105,11 @@ class Flow_Label_CC:
 		
 		print('')
 		print('##################### ANALYSIS SENT DATA #####################')
-		print("- Sent Chunks: " + str(self.sent_received_chunks) + "/" + str(len(self.int_chunks)))
+		print("- Sent Chunks: " + str(self.sent_received_chunks) + "/" + str(len(self.chunks)))
 		print("- Duration of Stegocommunication: " + str(round((self.endtime_stegocommunication - self.starttime_stegocommunication) * 1000, 2)) + " ms")
 		print("- Average Injection Time: " + str(round((self.injection_exfiltration_time_sum / self.sent_received_chunks) * 1000, 2)) + " ms")
 		print("- Bandwidth: " + str(round((helper.IPv6_HEADER_FIELD_LENGTHS_IN_BITS["Flow Label"] * self.sent_received_chunks) / (self.endtime_stegocommunication - self.starttime_stegocommunication), 2)) + " bits/s")
-		print("- Injected data == Chunks: " + str([x[0] for x in self.exfiltrated_data] == self.int_chunks))
+		print("- Injected data == Chunks: " + str([x[0] for x in self.exfiltrated_data] == list(self.chunks)))
 		print('##################### ANALYSIS SENT DATA #####################')
 		print('')
 
@@ -121,13 +120,13 @@ class Flow_Label_CC:
 
 		# Failure Calculation via Index 
 		for x in range(len(self.exfiltrated_data)):
-			if self.exfiltrated_data[x][0] != self.int_chunks[x]:
+			if self.exfiltrated_data[x][0] != self.chunks[x]:
 				failures += 1
 				
 		# Failure Calculation 1st Index 
 		
 		for x in range(len(self.exfiltrated_data)):
-			if self.exfiltrated_data[x][0] != self.int_chunks[x]:
+			if self.exfiltrated_data[x][0] != self.chunks[x]:
 				index_first_failure = x
 				break
 
@@ -137,11 +136,11 @@ class Flow_Label_CC:
 		print('')
 		print('##################### ANALYSIS RECEIVED DATA #####################')
 		print("- Number of Repition: " + str(self.number_of_repititions_done) + "/" + str(self.number_of_repititions))
-		print("- Received Chunks: " + str(self.sent_received_chunks) + "/" + str(len(self.int_chunks)))
+		print("- Received Chunks: " + str(self.sent_received_chunks) + "/" + str(len(self.chunks)))
 		print("- Duration of Stegocommunication: " + str(round((self.endtime_stegocommunication - self.starttime_stegocommunication) * 1000, 2)) + " ms")
 		print("- Average Exfiltration Time: " + str(round((self.injection_exfiltration_time_sum / self.sent_received_chunks) * 1000, 2)) + " ms")
 		print("- Bandwidth: " + str(round((helper.IPv6_HEADER_FIELD_LENGTHS_IN_BITS["Flow Label"] * self.sent_received_chunks) / (self.endtime_stegocommunication - self.starttime_stegocommunication), 2)) + " bits/s")
-		print("- Exfiltrated data == Chunks: " + str([x[0] for x in self.exfiltrated_data] == self.int_chunks) + " (" + str(failures) + " Failures)")
+		print("- Exfiltrated data == Chunks: " + str([x[0] for x in self.exfiltrated_data] == list(self.chunks)) + " (" + str(failures) + " Failures)")
 		print("- Error Rate: " + str(round(failures/self.sent_received_chunks, 2)) + " Failures/Packet")
 		print("- Successfully transmitted Message: " + str(round((index_first_failure/self.sent_received_chunks) * 100, 2)) + "%")
 		print('##################### ANALYSIS RECEIVED DATA #####################')
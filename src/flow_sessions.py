@@ -0,0 +1,158 @@
+import collections
+import copy
+import time
+import helper
+import header_codec
+
+# The attributes of a covert channel which make up a covert session: the position in the covert stream (chunk index, burst counters,
+# start/stop flags, repetitions and measurements) and the objects which follow it or learn from the flow (as the hop limit baseline). 
+# Each flow gets its own copy of them.
+FLOW_STATE = [
+	'sent_received_chunks',
+	'stegotime',
+	'clean_counter',
+	'number_of_repetitions_done',
+	'actual_number',
+	'first_packet',
+	'start_exf',
+	'finish_exf',
+	'next_expected_seq',
+	'count_stego_retransmissions',
+	'stego_segments',
+	'sent_packets',
+	'received_packets',
+	'starttime_stegocommunication',
+	'endtime_stegocommunication',
+	'injection_exfiltration_time_sum',
+	'resyncs',
+	'exfiltrated_data',
+	'errors',
+	'unstuffer',
+	'retransmissions',
+	'reassembly',
+	'resync_window',
+	'hop_limit_codec',
+	'hop_limit_calibration'
+]
+
+DEFAULT_MAX_FLOWS = helper.DEFAULT_MAX_FLOWS
+# Seconds without packets after which a flow is forgotten
+DEFAULT_IDLE_TIMEOUT = helper.DEFAULT_FLOW_IDLE_TIMEOUT
+
+class Session_Reporter:
+
+	def __init__(self, flows):
+		'''
+		The reporter of a covert session: the reports go to the reporter of the covert channel, looked up at each call since
+		the event loop replaces it (see async_queue.Async_Queue). The ip6tables rule is shared by the flows, so a session which
+		is done does not delete it: it is deleted when the covert channel stops.
+		:param flows: The Flow_Sessions.
+		'''
+		self.flows = flows
+
+	def submit(self, function, *args):
+		if function is helper.delete_ip6tables_rule:
+			return
+		self.flows.cc.reporter.submit(function, *args)
+
+	def __getattr__(self, name):
+		return getattr(self.flows.cc.reporter, name)
+
+class Flow_Sessions:
+
+	def __init__(self, cc, nfqueue, max_flows=DEFAULT_MAX_FLOWS, idle_timeout=DEFAULT_IDLE_TIMEOUT):
+		'''
+		Used by the covert channel cc in place of its NetfilterQueue (same bind, run and unbind methods) to run an independent covert session
+		on each overt flow (source and destination addresses and TCP ports) matching the ip6tables rule. A session is a copy of the covert channel
+		made when the first packet of the flow arrives: it shares the configuration, the schedule and the reporter of cc, and has its own copy
+		of the attributes in FLOW_STATE (and of the chunks if they are a helper.Chunk_Source, whose length may change). The flows are kept
+		from the least to the most recently seen: a flow idle for idle_timeout seconds is forgotten, as well as the least recent one when
+		a new flow exceeds max_flows.
+		:param cc: The covert channel.
+		:param nfqueue: The queue delivering the packets (a NetfilterQueue, async_queue.Async_Queue or multi_queue.Queue_Workers).
+		:param max_flows: The maximum number of flows.
+		:param idle_timeout: The seconds without packets after which a flow is forgotten.
+		'''
+		self.cc = cc
+		self.nfqueue = nfqueue
+		self.max_flows = max_flows
+		self.idle_timeout = idle_timeout
+		self.callback_name = None
+		# Flow key -> [session, time of the last packet]
+		self.sessions = collections.OrderedDict()
+
+		self.created = 0
+		self.expired = 0
+		self.evicted = 0
+
+	def bind(self, queue_number, callback, range=helper.FULL_COPY_RANGE):
+		'''
+		:param queue_number: The number of the queue.
+		:param callback: The method of the covert channel called for each packet (i.e., inject or exfiltrate): the one of the session runs instead.
+		:param range: The bytes of each packet copied to userspace.
+		'''
+		self.callback_name = callback.__name__
+		self.nfqueue.bind(queue_number, self.run_callback, range=range)
+
+	def unbind(self):
+		self.nfqueue.unbind()
+
+	def get_fd(self):
+		return self.nfqueue.get_fd()
+
+	def run(self):
+		self.nfqueue.run()
+
+	def run_callback(self, packet):
+		now = time.monotonic()
+		self.expire(now)
+		session = self.get_session(header_codec.get_flow_key(packet.get_payload()), now)
+		getattr(session, self.callback_name)(packet)
+
+	def get_session(self, key, now):
+		sessions = self.sessions
+		entry = sessions.get(key)
+		if entry is None:
+			if len(sessions) >= self.max_flows:
+				sessions.popitem(last=False)
+				self.evicted += 1
+			entry = sessions[key] = [self.new_session(), now]
+			self.created += 1
+		else:
+			sessions.move_to_end(key)
+			entry[1] = now
+		return entry[0]
+
+	def expire(self, now):
+		'''
+		Forgets the flows idle for idle_timeout seconds.
+		'''
+		sessions = self.sessions
+		while sessions:
+			key, entry = next(iter(sessions.items()))
+			if now - entry[1] < self.idle_timeout:
+				break
+			del sessions[key]
+			self.expired += 1
+
+	def new_session(self, chunks=None, schedule=None):
+		'''
+		Returns a copy of the covert channel with the state it had when it was built.
+		:param chunks: The chunks of the session (default: those of cc, copied if they are a helper.Chunk_Source).
+		:param schedule: The schedule of the session, if cc has one (default: the one of cc).
+		'''
+		cc = self.cc
+		session = copy.copy(cc)
+		if chunks is None:
+			chunks = copy.copy(cc.chunks) if isinstance(cc.chunks, helper.Chunk_Source) else cc.chunks
+		session.chunks = chunks
+		# The copies of the state refer to the chunks and to the schedule of the session
+		memo = {id(cc.chunks): chunks}
+		if hasattr(cc, 'schedule'):
+			session.schedule = schedule if schedule is not None else cc.schedule
+			memo[id(cc.schedule)] = session.schedule
+		for name in FLOW_STATE:
+			if name in cc.__dict__:
+				setattr(session, name, copy.deepcopy(cc.__dict__[name], memo))
+		session.reporter = Session_Reporter(self)
+		return session
@@ -0,0 +1,285 @@
+import bisect
+import struct
+
+# Fixed offsets (in bytes) of the IPv6 header fields touched by the covert channels.
+IPv6_HEADER_LENGTH = 40
+PAYLOAD_LENGTH_OFFSET = 4
+NEXT_HEADER_OFFSET = 6
+HOP_LIMIT_OFFSET = 7
+SOURCE_ADDRESS_OFFSET = 8
+DESTINATION_ADDRESS_END = 40
+
+TCP_SEQUENCE_OFFSET = 4
+TCP_DATA_OFFSET_OFFSET = 12
+TCP_MINIMUM_HEADER_LENGTH = 20
+
+NEXT_HEADER_TCP = 6
+
+# Smallest MTU of an IPv6 link (RFC 8200)
+IPv6_MINIMUM_MTU = 1280
+
+# Fields a Composite_Codec can pack the bits of a chunk into, with the bits each one carries.
+# The DSCP is the Traffic Class without its 2 ECN bits, the Hop Limit carries a single bit (see Composite_Codec).
+COMPOSITE_FIELD_LENGTHS_IN_BITS = {
+	"Flow Label": 20,
+	"Traffic Class": 8,
+	"DSCP": 6,
+	"Hop Limit": 1
+}
+# Names of the fields on the command line of the composite covert channels
+COMPOSITE_FIELD_ABBREVIATIONS = {
+	"fl": "Flow Label",
+	"tc": "Traffic Class",
+	"dscp": "DSCP",
+	"hl": "Hop Limit"
+}
+# Position (shift) and mask of the fields in the first 32 bit word of the header
+FIRST_WORD_FIELDS = {
+	"Flow Label": (0, 0xfffff),
+	"Traffic Class": (20, 0xff),
+	"DSCP": (22, 0x3f)
+}
+DEFAULT_HOP_LIMIT_DELTA = 20
+# Hop limit of the clean packets at the receiver (the default hop limit of Linux)
+DEFAULT_HOP_LIMIT_BASELINE = 64
+
+# Extension headers whose length can be walked without Scapy: Hop-by-Hop Options, Routing,
+# Fragment and Destination Options. The other extension headers which Scapy can parse (AH, Mobility, HIP, Shim6) go to Scapy,
+# while any other next header value (e.g. UDP, ICMPv6, or ESP, whose payload is encrypted) does not carry a readable TCP header.
+WALKABLE_EXTENSION_HEADERS = (0, 43, 44, 60)
+SCAPY_EXTENSION_HEADERS = (51, 135, 139, 140)
+FRAGMENT_HEADER = 44
+
+_FIRST_WORD = struct.Struct('!I')
+_TCP_SEQUENCE = struct.Struct('!I')
+_PAYLOAD_LENGTH = struct.Struct('!H')
+
+def get_traffic_class(buf):
+	return (_FIRST_WORD.unpack_from(buf, 0)[0] >> 20) & 0xff
+
+def set_traffic_class(buf, value):
+	word = _FIRST_WORD.unpack_from(buf, 0)[0]
+	_FIRST_WORD.pack_into(buf, 0, (word & 0xf00fffff) | ((value & 0xff) << 20))
+
+def get_flow_label(buf):
+	return _FIRST_WORD.unpack_from(buf, 0)[0] & 0xfffff
+
+def set_flow_label(buf, value):
+	word = _FIRST_WORD.unpack_from(buf, 0)[0]
+	_FIRST_WORD.pack_into(buf, 0, (word & 0xfff00000) | (value & 0xfffff))
+
+def get_dscp(buf):
+	return (_FIRST_WORD.unpack_from(buf, 0)[0] >> 22) & 0x3f
+
+def set_dscp(buf, value):
+	word = _FIRST_WORD.unpack_from(buf, 0)[0]
+	_FIRST_WORD.pack_into(buf, 0, (word & 0xf03fffff) | ((value & 0x3f) << 22))
+
+def get_next_header(buf):
+	return buf[NEXT_HEADER_OFFSET]
+
+def get_hop_limit(buf):
+	return buf[HOP_LIMIT_OFFSET]
+
+def set_hop_limit(buf, value):
+	# A hop limit changed beyond the 8 bits of the field is clamped
+	buf[HOP_LIMIT_OFFSET] = min(max(value, 0), 255)
+
+class Hop_Limit_Codec:
+
+	def __init__(self, levels=2, delta=DEFAULT_HOP_LIMIT_DELTA, baseline=DEFAULT_HOP_LIMIT_BASELINE):
+		'''
+		Carries log2(levels) bits per packet in the hop limit, changed by one of levels offsets evenly spaced from -delta to +delta.
+		The values are Gray coded onto the offsets, so a hop limit read one level off costs a single bit error. The receiver decodes
+		the level whose offset from baseline is the nearest, i.e. the thresholds are halfway between the levels, through a table of the 256 hop limits.
+		With 2 levels the hop limit is raised (1) or lowered (0) by delta and read back as hop limit > baseline, as in the Hop Limit cc.
+		:param levels: The number of levels, a power of 2.
+		:param delta: The largest change of the hop limit.
+		:param baseline: The hop limit of the clean packets at the receiver.
+		'''
+		if levels < 2 or levels & (levels - 1):
+			raise ValueError("ValueError: the number of hop limit levels must be a power of 2!")
+		if 2 * delta < levels - 1:
+			raise ValueError("ValueError: the hop limit delta is too small for " + str(levels) + " levels!")
+		self.levels = levels
+		self.bits = levels.bit_length() - 1
+		self.delta = delta
+		# The offsets of the levels, from the lowest one, and the value of each level
+		self.level_offsets = [round(-delta + 2 * delta * x / (levels - 1)) for x in range(levels)]
+		self.level_values = [x ^ (x >> 1) for x in range(levels)]
+		# The offset of each value
+		self.offsets = [0] * levels
+		for offset, value in zip(self.level_offsets, self.level_values):
+			self.offsets[value] = offset
+		# The hop limit marked with each value, by the hop limit of the packet: the marked hop limit is clamped to 0..255, 
+		# so a packet whose hop limit is within delta of the bounds may be read one level off
+		self.marked = [bytes(min(max(x + offset, 0), 255) for x in range(256)) for offset in self.offsets]
+		self.set_baseline(baseline)
+
+	def set_baseline(self, baseline):
+		'''
+		Places the thresholds between the levels around the hop limit baseline of the clean packets.
+		'''
+		self.baseline = baseline
+		self.thresholds = [baseline + (low + high) / 2 for low, high in zip(self.level_offsets, self.level_offsets[1:])]
+		self.table = bytes(self.level_values[bisect.bisect_left(self.thresholds, x)] for x in range(256))
+
+	def set(self, buf, value):
+		buf[HOP_LIMIT_OFFSET] = self.marked[value][buf[HOP_LIMIT_OFFSET]]
+
+	def get(self, buf):
+		return self.table[buf[HOP_LIMIT_OFFSET]]
+
+class Composite_Codec:
+
+	def __init__(self, fields, hoplimit_delta=DEFAULT_HOP_LIMIT_DELTA, hoplimit_baseline=DEFAULT_HOP_LIMIT_BASELINE):
+		'''
+		Packs a chunk into several fields of the same packet, e.g. 20 bits in the Flow Label, 6 in the DSCP and 1 in the Hop Limit (27 bits per packet).
+		The first field holds the most significant bits of the chunk. The fields in the first word of the header are written with a single
+		read-modify-write of the word. As in the Hop Limit cc, the bit of the Hop Limit raises (1) or lowers (0) the hop limit by hoplimit_delta
+		and is read back as hop limit > hoplimit_baseline (see Hop_Limit_Codec).
+		:param fields: The names of the fields (keys of COMPOSITE_FIELD_LENGTHS_IN_BITS).
+		:param hoplimit_delta: The change of the hop limit carrying a bit.
+		:param hoplimit_baseline: The hop limit of the clean packets at the receiver.
+		'''
+		if not fields or any(x not in COMPOSITE_FIELD_LENGTHS_IN_BITS for x in fields) or len(set(fields)) != len(fields):
+			raise ValueError("ValueError: the fields of a composite channel must be distinct names among " + ", ".join(COMPOSITE_FIELD_LENGTHS_IN_BITS) + "!")
+		if "Traffic Class" in fields and "DSCP" in fields:
+			raise ValueError("ValueError: the DSCP is part of the Traffic Class!")
+		self.fields = tuple(fields)
+		self.field_length_in_bits = sum(COMPOSITE_FIELD_LENGTHS_IN_BITS[x] for x in fields)
+		self.hoplimit = Hop_Limit_Codec(2, hoplimit_delta, hoplimit_baseline)
+
+		# (shift in the chunk, mask, shift in the first word) of the fields in the first word
+		self.word_layout = []
+		self.word_mask = 0xffffffff
+		# Shift in the chunk of the bit of the Hop Limit, None if it is not used
+		self.hoplimit_shift = None
+		shift = self.field_length_in_bits
+		for field in fields:
+			shift -= COMPOSITE_FIELD_LENGTHS_IN_BITS[field]
+			if field == "Hop Limit":
+				self.hoplimit_shift = shift
+			else:
+				word_shift, mask = FIRST_WORD_FIELDS[field]
+				self.word_layout.append((shift, mask, word_shift))
+				self.word_mask &= ~(mask << word_shift)
+
+	def set(self, buf, value):
+		word = _FIRST_WORD.unpack_from(buf, 0)[0] & self.word_mask
+		for shift, mask, word_shift in self.word_layout:
+			word |= ((value >> shift) & mask) << word_shift
+		_FIRST_WORD.pack_into(buf, 0, word)
+		if self.hoplimit_shift is not None:
+			buf[HOP_LIMIT_OFFSET] = self.hoplimit.marked[(value >> self.hoplimit_shift) & 1][buf[HOP_LIMIT_OFFSET]]
+
+	def get(self, buf):
+		word = _FIRST_WORD.unpack_from(buf, 0)[0]
+		value = 0
+		for shift, mask, word_shift in self.word_layout:
+			value |= ((word >> word_shift) & mask) << shift
+		if self.hoplimit_shift is not None:
+			value |= self.hoplimit.table[buf[HOP_LIMIT_OFFSET]] << self.hoplimit_shift
+		return value
+
+def walk_extension_headers(buf):
+	'''
+	Walks the simple extension headers of the packet and returns the tuple (next header, offset) of the first header which is not one of them.
+	Returns (None, -1) if the chain is truncated or the packet is a fragment other than the first one.
+	:param buf: The raw IPv6 packet.
+	'''
+	next_header = buf[NEXT_HEADER_OFFSET]
+	offset = IPv6_HEADER_LENGTH
+	while next_header in WALKABLE_EXTENSION_HEADERS:
+		if offset + 8 > len(buf):
+			return None, -1
+		if next_header == FRAGMENT_HEADER:
+			# Only the first fragment carries the TCP header
+			if (buf[offset + 2] << 8 | buf[offset + 3]) & 0xfff8:
+				return None, -1
+			length = 8
+		else:
+			length = (buf[offset + 1] + 1) * 8
+		next_header = buf[offset]
+		offset += length
+	return next_header, offset
+
+def get_tcp_offset(buf):
+	'''
+	Returns the offset of the TCP header in the buffer, walking the simple extension headers.
+	Returns -1 if the packet does not carry TCP or if the chain cannot be walked without Scapy.
+	:param buf: The raw IPv6 packet.
+	'''
+	next_header, offset = walk_extension_headers(buf)
+	if next_header != NEXT_HEADER_TCP or offset + TCP_MINIMUM_HEADER_LENGTH > len(buf):
+		return -1
+	return offset
+
+def get_flow_key(buf):
+	'''
+	Returns the key of the flow of the packet: its source and destination addresses, followed by its TCP ports if it carries TCP.
+	:param buf: The raw IPv6 packet.
+	'''
+	offset = get_tcp_offset(buf)
+	if offset == -1:
+		return bytes(buf[SOURCE_ADDRESS_OFFSET:DESTINATION_ADDRESS_END])
+	return bytes(buf[SOURCE_ADDRESS_OFFSET:DESTINATION_ADDRESS_END]) + bytes(buf[offset:offset + 4])
+
+def _scapy_tcp(buf):
+	'''
+	Fallback for packets the fast path cannot handle: parses the packet with Scapy and returns its TCP layer (or None).
+	'''
+	from scapy.all import IPv6, TCP
+	pkt = IPv6(bytes(buf))
+	if TCP in pkt:
+		return pkt[TCP]
+	return None
+
+def get_packet_length(buf):
+	'''
+	Returns the length of the packet from its Payload Length field, so the buffer may hold only its headers (e.g. a captured packet).
+	The length of the buffer is returned for a jumbogram, whose Payload Length is 0.
+	:param buf: The raw IPv6 packet.
+	'''
+	payload_length = _PAYLOAD_LENGTH.unpack_from(buf, PAYLOAD_LENGTH_OFFSET)[0]
+	if payload_length == 0:
+		return len(buf)
+	return IPv6_HEADER_LENGTH + payload_length
+
+def get_segment_count(buf, mtu, payload_length=None):
+	'''
+	Returns the number of packets sent on the wire for a packet queued before its segmentation (a GSO packet): its TCP payload is cut
+	in segments of the largest size which fits in mtu with the headers. A packet which fits in mtu, or which does not carry TCP, is a single packet.
+	:param buf: The raw IPv6 packet (its headers are enough).
+	:param mtu: The MTU of the path.
+	:param payload_length: The TCP payload length of the packet when the caller already has it, so the header chain is not walked again.
+	'''
+	length = get_packet_length(buf)
+	if length <= mtu:
+		return 1
+	if payload_length is None:
+		offset = get_tcp_offset(buf)
+		if offset == -1:
+			return 1
+		payload_length = length - offset - (buf[offset + TCP_DATA_OFFSET_OFFSET] >> 4) * 4
+	return -(-payload_length // (mtu - length + payload_length))
+
+def get_tcp_sequence_number_and_payload_length(buf):
+	'''
+	Returns the tuple (sequence number, payload length) of the TCP segment with a single walk of the header chain.
+	Both values are None if the packet does not carry TCP.
+	:param buf: The raw IPv6 packet.
+	'''
+	next_header, offset = walk_extension_headers(buf)
+	if next_header == NEXT_HEADER_TCP and offset + TCP_MINIMUM_HEADER_LENGTH <= len(buf):
+		return _TCP_SEQUENCE.unpack_from(buf, offset + TCP_SEQUENCE_OFFSET)[0], get_packet_length(buf) - offset - (buf[offset + TCP_DATA_OFFSET_OFFSET] >> 4) * 4
+	# Only a chain going on with an extension header the fast path cannot walk may still carry TCP
+	if next_header not in SCAPY_EXTENSION_HEADERS:
+		return None, None
+	tcp = _scapy_tcp(buf)
+	if tcp is None:
+		return None, None
+	# The payload of the buffer may be cut by the copy range: the length follows from the Payload Length, as in the fast path,
+	# with the offset of the TCP header given by the bytes Scapy dissected from it
+	offset = len(buf) - len(tcp.original)
+	return tcp.seq, get_packet_length(buf) - offset - tcp.dataofs * 4
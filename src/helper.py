@@ -1,18 +1,63 @@
 import random
 import hashlib
+from array import array
 import subprocess
 import sys
+import math
+import mmap
+import functools
+import time
 import os
+import fcntl
+import collections
+import itertools
+import copy
+import optparse
+import header_codec
 
 TITLE_APPEND_IP6TABLES = '##### APPENDING IP6TABLES RULE #####'
 TITLE_DELETE_IP6TABLES = '##### DELETING IP6TABLES RULE #####'
+TITLE_IP6TABLES_FILTER = '##### IP6TABLES FILTER #####'
 
 PRESHARED_SEED = "SIMARGL"
 
 BEGIN_RANGE_RANDOM_INT = 1
 END_RANGE_RANDOM_INT = 10000
 
+SIGNATURE_STREAM_BLOCK_SIZE = 4096
+
+# Length in bytes of a block of the keystream of the counter mode signatures (a keyed BLAKE2b digest)
+COUNTER_KEYSTREAM_BLOCK_SIZE = 64
+
+# Bytes in flight assumed by the reliable marking senders if the maximum TCP send buffer cannot be read
+DEFAULT_TCP_SEND_BUFFER_SIZE = 4194304
+
+# Directory of the signature cache files shared by the covert channel processes
+SIGNATURE_CACHE_DIRECTORY = os.path.join(os.path.expanduser("~"), ".cache", "ipv6cc")
+
+UNPACK_SEGMENT_BLOCKS = 65536
+
+# Hop limits of the last clean packets from which the receivers learn the hop limit baseline (0: fixed baseline)
+DEFAULT_HOP_LIMIT_CALIBRATION_WINDOW = 256
+# Hop limits received before the learnt baseline replaces the initial one
+HOP_LIMIT_CALIBRATION_MIN_SAMPLES = 16
+# Overt flows followed at a time by the covert sessions of a queue (see flow_sessions.Flow_Sessions)
+DEFAULT_MAX_FLOWS = 1024
+# Seconds without packets after which an overt flow is forgotten (see flow_sessions.Flow_Sessions)
+DEFAULT_FLOW_IDLE_TIMEOUT = 60.0
+# Initial hop limits of the common operating systems, from which the routers on the path are estimated
+COMMON_INITIAL_HOP_LIMITS = (32, 64, 128, 255)
+
+CHUNK_SOURCE_BLOCK_CHUNKS = 65536
+# Slots of a marking schedule packed at once, and blocks of slots kept (the expected stego-packet and the resync window ahead of it)
+MARKING_SCHEDULE_BLOCK_SLOTS = 4096
+MARKING_SCHEDULE_CACHED_BLOCKS = 4
+
 NETFILTER_QUEUE_NUMBER = 1
+# Bytes of each packet copied to userspace: the whole packet (the default of NetfilterQueue.bind), or only its headers for the receivers,
+# which read the IPv6 header, the usual extension headers and the TCP header (see header_codec.get_packet_length)
+FULL_COPY_RANGE = 65535
+HEADER_COPY_RANGE = 128
 
 SOURCE_IPv6_ADDRESS = "" 
 DESTINATION_IPv6_ADDRESS = ""
@@ -60,63 +105,345 @@ TCP_FLAGS = {
 	"NONCE": 256
 }
 
-def read_binary_file_for_n_packets_and_return_chunks(path_to_binary_file, n, field_length_in_bits):
+def get_chunk_typecode(field_length_in_bits):
+	'''
+	Returns the smallest array typecode whose items can hold a chunk of the given length.
+	'''
+	for typecode in ('B', 'H', 'I', 'L', 'Q'):
+		if array(typecode).itemsize * 8 >= field_length_in_bits:
+			return typecode
+	raise ValueError("ValueError: chunks can be at most 64 bits long!")
 
-	content_in_bits = ''
+@functools.lru_cache(maxsize=None)
+def get_unpack_layout(field_length_in_bits, itemsize):
+	'''
+	Returns, for every byte of every chunk item of a block, the input bytes of the block contributing to it and their translation tables.
+	A block is the smallest run of bytes containing a whole number of chunks.
+	'''
+	layout = []
+	for phase in range(field_length_in_bits * 8 // math.gcd(field_length_in_bits, 8) // field_length_in_bits):
+		first_bit = phase * field_length_in_bits
+		last_bit = first_bit + field_length_in_bits
+		for o in range(itemsize):
+			contributions = []
+			for q in range(first_bit // 8, (last_bit - 1) // 8 + 1):
+				low = max(first_bit, 8 * q)
+				high = min(last_bit, 8 * q + 8)
+				mask = ((1 << (high - low)) - 1) << (8 * q + 8 - high)
+				shift = last_bit - 8 * q - 8
+				table = bytes([((((b & mask) << shift) if shift >= 0 else ((b & mask) >> -shift)) >> (8 * o)) & 0xff for b in range(256)])
+				if any(table):
+					contributions.append((q, table))
+			if contributions:
+				byte = o if sys.byteorder == 'little' else itemsize - 1 - o
+				layout.append((phase * itemsize + byte, contributions))
+	return layout
 
-	bits_read = 0
-	bits_needed = n * field_length_in_bits
-	
-	st = os.stat(path_to_binary_file)
-	bits_of_file = st.st_size * 8
+def unpack_chunks(content, field_length_in_bits):
+	'''
+	Splits the bits of content into integer chunks of field_length_in_bits bits (the first bit is the most significant one).
+	If the bits of content are not a multiple of the field length, the last chunk holds the remaining bits.
+	The work is done column by column with bytes.translate and strided slices, so the per-chunk cost stays out of the interpreter.
+	:param content: The bytes to split.
+	:param field_length_in_bits: The length of a chunk.
+	:return: An array of integer chunks.
+	'''
+	chunks = array(get_chunk_typecode(field_length_in_bits))
+	itemsize = chunks.itemsize
 
-	with open(path_to_binary_file, 'rb') as content_file:
-		
-		# if needed read the file multiple times complete
-		for x in range(int(bits_needed/bits_of_file)):
-			content = content_file.read()
-			for k in content:
-				content_in_bits += "{0:08b}".format(k)
-			content_file.seek(0)
-			bits_read += bits_of_file
-		
-		# read the rest whole bits of the file
-		rest = bits_needed - bits_read
+	# A block of block_bytes bytes contains exactly chunks_per_block chunks
+	block_bits = field_length_in_bits * 8 // math.gcd(field_length_in_bits, 8)
+	block_bytes = block_bits // 8
+	chunks_per_block = block_bits // field_length_in_bits
+	blocks = len(content) // block_bytes
+
+	if block_bytes == itemsize and chunks_per_block == 1:
+		# The chunks are exactly the (big-endian) items of content
+		chunks.frombytes(content[:blocks * block_bytes])
+		if sys.byteorder == 'little' and itemsize > 1:
+			chunks.byteswap()
+	else:
+		layout = get_unpack_layout(field_length_in_bits, itemsize)
+		stride = chunks_per_block * itemsize
+		for start in range(0, blocks, UNPACK_SEGMENT_BLOCKS):
+			segment_blocks = min(UNPACK_SEGMENT_BLOCKS, blocks - start)
+			segment = content[start * block_bytes:(start + segment_blocks) * block_bytes]
+			columns = [segment[q::block_bytes] for q in range(block_bytes)]
+			output = bytearray(segment_blocks * stride)
+			for position, contributions in layout:
+				if len(contributions) == 1:
+					q, table = contributions[0]
+					output[position::stride] = columns[q].translate(table)
+				else:
+					value = 0
+					for q, table in contributions:
+						value |= int.from_bytes(columns[q].translate(table), 'little')
+					output[position::stride] = value.to_bytes(segment_blocks, 'little')
+			chunks.frombytes(output)
 
-		content = content_file.read(int(rest/8))
-		for k in content:
-			content_in_bits += "{0:08b}".format(k)
-		bits_read += int(rest/8) * 8
+	# Remaining chunks which do not fill a whole block
+	rest = content[blocks * block_bytes:]
+	rest_bits = len(rest) * 8
+	rest_value = int.from_bytes(rest, 'big')
+	for first_bit in range(0, rest_bits, field_length_in_bits):
+		last_bit = min(first_bit + field_length_in_bits, rest_bits)
+		chunks.append((rest_value >> (rest_bits - last_bit)) & ((1 << (last_bit - first_bit)) - 1))
 
-		# read the rest of the last needed byte
-		rest = bits_needed - bits_read
-		content_in_bits += format(int.from_bytes(content_file.read(1), byteorder='big'), '#010b')[2:rest+2]
+	return chunks
+
+class Chunk_Source:
+
+	def __init__(self, path_to_binary_file, field_length_in_bits, length=None, block_chunks=CHUNK_SOURCE_BLOCK_CHUNKS):
+		'''
+		A lazy sequence of integer chunks backed by a memory mapping of the file, so the memory used does not depend on the size of the secret.
+		Only the block of chunks containing the last accessed index is decoded.
+		:param path_to_binary_file: The path to the message to hide.
+		:param field_length_in_bits: The length of a chunk.
+		:param length: The number of chunks of the sequence. If None, the file is split once and the last chunk holds the remaining bits
+		(as read_binary_file_and_return_chunks). Otherwise the file is repeated as many times as needed to fill length chunks 
+		(as read_binary_file_for_n_packets_and_return_chunks).
+		:param block_chunks: The number of chunks decoded at once, rounded up to a multiple of 8 to keep the blocks byte aligned.
+		'''
+		self.field_length_in_bits = field_length_in_bits
+		self.block_chunks = -(-block_chunks // 8) * 8
+		self.file = open(path_to_binary_file, 'rb')
+		self.content = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+		self.repeat = length is not None
+		self.set_length(length)
+
+	def set_length(self, length):
+		'''
+		Changes the number of chunks of a repeated sequence (e.g. for the next number of stego-packets of the naive mode) without reading the file again.
+		'''
+		if length is None:
+			length = -(-len(self.content) * 8 // self.field_length_in_bits)
+		self.length = length
+		# The cached block may have been truncated to the previous length
+		self.block_index = -1
+		self.block = None
+
+	def load_block(self, block_index):
+		first_chunk = block_index * self.block_chunks
+		count = min(self.block_chunks, self.length - first_chunk)
+		first_byte = first_chunk * self.field_length_in_bits // 8
+		bytes_needed = -(-count * self.field_length_in_bits // 8)
+		if self.repeat:
+			size = len(self.content)
+			first_byte %= size
+			content = self.content[first_byte:first_byte + bytes_needed]
+			while len(content) < bytes_needed:
+				content += self.content[:bytes_needed - len(content)]
+		else:
+			content = self.content[first_byte:first_byte + bytes_needed]
+		self.block = unpack_chunks(content, self.field_length_in_bits)
+		del self.block[count:]
+		self.block_index = block_index
 
-	return [content_in_bits[i:i+field_length_in_bits] for i in range(0, len(content_in_bits), field_length_in_bits)]
+	def __getitem__(self, index):
+		if index < 0:
+			index += self.length
+		if not 0 <= index < self.length:
+			raise IndexError("IndexError: chunk index out of range!")
+		block_index, offset = divmod(index, self.block_chunks)
+		if block_index != self.block_index:
+			self.load_block(block_index)
+		return self.block[offset]
 
+	def __iter__(self):
+		for block_index in range(-(-self.length // self.block_chunks)):
+			if block_index != self.block_index:
+				self.load_block(block_index)
+			yield from self.block
 
-def read_binary_file_and_return_chunks(path_to_binary_file, field_length, character_stuffing="false", escape_value=None):
+	def __len__(self):
+		return self.length
 
-	chunks = []
+	def close(self):
+		self.block = None
+		self.content.close()
+		self.file.close()
+
+def read_binary_file_for_n_packets_and_return_chunks(path_to_binary_file, n, field_length_in_bits):
+
+	bytes_needed = -(-n * field_length_in_bits // 8)
 
 	with open(path_to_binary_file, 'rb') as content_file:
 		content = content_file.read()
-	content_in_bits = ""
-	for k in content:
-		content_in_bits += "{0:08b}".format(k)
 
-	chunks = [content_in_bits[i:i+field_length] for i in range(0, len(content_in_bits), field_length)]
+	# if needed repeat the file multiple times complete, then the rest of the needed bytes
+	content = content * (bytes_needed // len(content)) + content[:bytes_needed % len(content)]
+
+	chunks = unpack_chunks(content, field_length_in_bits)
+	del chunks[n:]
+	return chunks
+
 
-	if character_stuffing:
-		tmp = []
-		for x in chunks:
-			tmp.append(x)
-			if int(x,2) == escape_value:
-				tmp.append(x)
-		chunks = tmp
+def read_binary_file_and_return_chunks(path_to_binary_file, field_length, character_stuffing=False, escape_value=None):
+
+	with open(path_to_binary_file, 'rb') as content_file:
+		content = content_file.read()
+
+	chunks = unpack_chunks(content, field_length)
+
+	if character_stuffing and escape_value is not None:
+		chunks = character_stuff(chunks, escape_value)
 
 	return chunks
 
+def find_chunks(chunks, value, start=0, content=None):
+	'''
+	Yields the indices of the chunks equal to value, from the index start on.
+	Arrays are searched in their raw bytes with bytes.find, which is much faster than array.index.
+	:param chunks: An array (or a list) of integer chunks.
+	:param value: The value to search.
+	:param start: The index the search starts from.
+	:param content: chunks.tobytes(), to avoid converting the array again.
+	'''
+	if not isinstance(chunks, array):
+		try:
+			while True:
+				start = chunks.index(value, start)
+				yield start
+				start += 1
+		except ValueError:
+			return
+	if content is None:
+		content = chunks.tobytes()
+	itemsize = chunks.itemsize
+	pattern = array(chunks.typecode, [value]).tobytes()
+	find = content.find
+	offset = find(pattern, start * itemsize)
+	while offset != -1:
+		if offset % itemsize == 0:
+			yield offset // itemsize
+			offset = find(pattern, offset + itemsize)
+		else:
+			# The pattern overlaps two chunks, go on from the next chunk
+			offset = find(pattern, offset + itemsize - offset % itemsize)
+
+def character_stuff(chunks, escape_value):
+	'''
+	Returns a copy of the chunk array in which every escape value is doubled.
+	The raw bytes of the array are split at the escape values and joined again with a doubled escape value, 
+	so no Python code runs per chunk.
+	:param chunks: The array of integer chunks (see unpack_chunks).
+	:param escape_value: The value to escape (i.e., the end magic value of the covert channel).
+	'''
+	content = chunks.tobytes()
+	escape = array(chunks.typecode, [escape_value]).tobytes()
+	parts = content.split(escape)
+	# The split is valid only if no match overlaps two chunks (always the case for chunks of a single byte)
+	if chunks.itemsize == 1 or all(len(part) % chunks.itemsize == 0 for part in parts):
+		stuffed = array(chunks.typecode)
+		stuffed.frombytes((escape + escape).join(parts))
+		return stuffed
+
+	view = memoryview(content)
+	pieces = []
+	position = 0
+	for index in find_chunks(chunks, escape_value, 0, content):
+		end = (index + 1) * chunks.itemsize
+		pieces.append(view[position:end])
+		pieces.append(escape)
+		position = end
+	pieces.append(view[position:])
+
+	stuffed = array(chunks.typecode)
+	stuffed.frombytes(b''.join(pieces))
+	return stuffed
+
+class Character_Unstuffer:
+
+	def __init__(self, escape_value, field_length_in_bits):
+		'''
+		Removes the character stuffing of a sequence of chunks while it is received. 
+		A single escape value followed by any other value is the delimiter which ends the sequence.
+		:param escape_value: The escaped value (i.e., the end magic value of the covert channel).
+		:param field_length_in_bits: The length of a chunk.
+		'''
+		self.escape_value = escape_value
+		self.data = array(get_chunk_typecode(field_length_in_bits))
+		self.escape_pending = False
+
+	def push(self, symbol):
+		'''
+		Unstuffs a single received symbol. Returns False if the previous symbol was the delimiter, 
+		in which case the symbol is not part of the sequence and is not consumed.
+		'''
+		if self.escape_pending:
+			if symbol != self.escape_value:
+				return False
+			self.escape_pending = False
+			self.data.append(symbol)
+		elif symbol == self.escape_value:
+			self.escape_pending = True
+		else:
+			self.data.append(symbol)
+		return True
+
+	def feed(self, symbols, position=0):
+		'''
+		Unstuffs a block of received symbols (an array or a list) at once, starting at the given position.
+		Returns the position following the last consumed symbol, which is lower than len(symbols) if the delimiter is found.
+		'''
+		escape_value = self.escape_value
+		data = self.data
+		if self.escape_pending and position < len(symbols):
+			if symbols[position] != escape_value:
+				return position
+			self.escape_pending = False
+			data.append(escape_value)
+			position += 1
+		content = None
+		if isinstance(symbols, array):
+			if symbols.typecode == data.typecode:
+				consumed = self.feed_array(symbols, position)
+				if consumed is not None:
+					return consumed
+			content = symbols.tobytes()
+		for index in find_chunks(symbols, escape_value, position, content):
+			# The second escape value of a pair is already consumed
+			if index < position:
+				continue
+			data.extend(symbols[position:index])
+			if index + 1 == len(symbols) or symbols[index + 1] != escape_value:
+				self.escape_pending = True
+				return index + 1
+			data.append(escape_value)
+			position = index + 2
+		data.extend(symbols[position:])
+		return len(symbols)
+
+	def feed_array(self, symbols, position=0):
+		'''
+		As feed, for an array of symbols with the same typecode of self.data: the raw bytes are split at the escape values, 
+		so the Python code runs once per escape value instead of once per symbol. Returns None if a match of the escape value 
+		overlaps two symbols, in which case nothing is consumed.
+		'''
+		itemsize = symbols.itemsize
+		escape = array(symbols.typecode, [self.escape_value]).tobytes()
+		parts = symbols[position:].tobytes().split(escape)
+		if itemsize != 1 and not all(len(part) % itemsize == 0 for part in parts):
+			return None
+		pieces = [parts[0]]
+		position += len(parts[0]) // itemsize
+		for x in range(1, len(parts), 2):
+			# An empty part between two escape values => escaped data value
+			if x + 1 < len(parts) and not parts[x]:
+				pieces.append(escape)
+				pieces.append(parts[x + 1])
+				position += 2 + len(parts[x + 1]) // itemsize
+			else:
+				self.data.frombytes(b''.join(pieces))
+				self.escape_pending = True
+				return position + 1
+		self.data.frombytes(b''.join(pieces))
+		return position
+
+	def reset(self):
+		self.data = array(self.data.typecode)
+		self.escape_pending = False
+
 def character_unstuff(list_to_unstuff, escape_value):
 
 	one_skipped = False
@@ -146,37 +473,1248 @@ def chunk_the_phrase(some_phrase, field_length):
 def get_md5_signature_at_indices(signature_number, indices):
 
 	signature = ''
-	random.seed(PRESHARED_SEED)
+	# A private generator: the global state of the random module is left untouched
+	generator = random.Random(PRESHARED_SEED)
 	
 	for x in range(signature_number):
-		random.randint(BEGIN_RANGE_RANDOM_INT, END_RANGE_RANDOM_INT)
-	hashed_random_integer = hashlib.md5(str(random.randint(BEGIN_RANGE_RANDOM_INT, END_RANGE_RANDOM_INT)).encode('utf-8')).hexdigest()
+		generator.randint(BEGIN_RANGE_RANDOM_INT, END_RANGE_RANDOM_INT)
+	hashed_random_integer = hashlib.md5(str(generator.randint(BEGIN_RANGE_RANDOM_INT, END_RANGE_RANDOM_INT)).encode('utf-8')).hexdigest()
 	
 	for y in range(len(indices)):
 		signature += hashed_random_integer[indices[y]]
 
 	return int(signature, 16)
 
-def append_ip6tables_rule(sender):
+class Signature_Stream:
+
+	def __init__(self, indices, length=None, seed=PRESHARED_SEED, block_size=SIGNATURE_STREAM_BLOCK_SIZE):
+		'''
+		The sequence of signatures of get_md5_signature_at_indices, generated once per session.
+		The i-th element is equal to get_md5_signature_at_indices(i, indices), but the lookup costs O(1).
+		:param indices: The indices of the MD5 hex digest which compose the signature.
+		:param length: The number of signatures to generate upfront (e.g. the number of chunks). 
+		If None, the signatures are generated in blocks on demand.
+		:param seed: The preshared seed of the signature sequence.
+		:param block_size: The number of signatures generated each time the stream must be extended.
+		'''
+		self.indices = indices
+		self.block_size = block_size
+		self.generator = random.Random(seed)
+		self.signatures = array('I' if len(indices) <= 8 else 'Q')
+		if length:
+			self.extend(length)
+
+	def extend(self, count):
+		'''
+		Appends the next count signatures of the sequence.
+		'''
+		randint = self.generator.randint
+		indices = self.indices
+		md5 = hashlib.md5
+		append = self.signatures.append
+		for x in range(count):
+			hashed_random_integer = md5(str(randint(BEGIN_RANGE_RANDOM_INT, END_RANGE_RANDOM_INT)).encode('utf-8')).hexdigest()
+			append(int(''.join([hashed_random_integer[y] for y in indices]), 16))
+
+	def __getitem__(self, signature_number):
+		if signature_number >= len(self.signatures):
+			missing = signature_number + 1 - len(self.signatures)
+			self.extend(-(-missing // self.block_size) * self.block_size)
+		return self.signatures[signature_number]
+
+	def get_range(self, start, stop):
+		'''
+		Returns the array of the signatures start, ..., stop - 1.
+		'''
+		if stop > len(self.signatures):
+			self[stop - 1]
+		return self.signatures[start:stop]
+
+	def __len__(self):
+		return len(self.signatures)
+
+def get_counter_keystream(first_block, count, seed=PRESHARED_SEED):
+	'''
+	Returns the blocks first_block, ..., first_block + count - 1 of the keystream of the counter mode signatures:
+	the block j is the BLAKE2b digest of j keyed with the preshared seed.
+	'''
+	keyed_hash = hashlib.blake2b(key=seed.encode('utf-8'), digest_size=COUNTER_KEYSTREAM_BLOCK_SIZE)
+	blocks = []
+	for x in range(first_block, first_block + count):
+		block_hash = keyed_hash.copy()
+		block_hash.update(x.to_bytes(8, 'big'))
+		blocks.append(block_hash.digest())
+	return b''.join(blocks)
+
+def get_counter_signatures(start, stop, indices, seed=PRESHARED_SEED):
+	'''
+	Returns the array of the counter mode signatures start, ..., stop - 1. The signature k is made of the bits k * b, ..., (k + 1) * b - 1 
+	of the keystream, where b = 4 * len(indices) is the length of the legacy signature with the same indices of the MD5 hex digest. 
+	Any range is computed directly from its indices (e.g. by parallel workers), without generating the previous signatures.
+	'''
+	signature_length_in_bits = 4 * len(indices)
+	block_length_in_bits = COUNTER_KEYSTREAM_BLOCK_SIZE * 8
+	# Two consecutive signatures fill a whole number of bytes: start the decoding at an even index
+	aligned_start = start - start % 2
+	first_block = aligned_start * signature_length_in_bits // block_length_in_bits
+	last_block = -(-stop * signature_length_in_bits // block_length_in_bits)
+	keystream = get_counter_keystream(first_block, last_block - first_block, seed)
+	first_byte = aligned_start * signature_length_in_bits // 8 - first_block * COUNTER_KEYSTREAM_BLOCK_SIZE
+	signatures = unpack_chunks(keystream[first_byte:], signature_length_in_bits)
+	return signatures[start - aligned_start:stop - aligned_start]
+
+class Counter_Signature_Stream:
+
+	def __init__(self, indices, length=None, seed=PRESHARED_SEED, block_size=SIGNATURE_STREAM_BLOCK_SIZE):
+		'''
+		The sequence of the counter mode signatures (see get_counter_signatures), with the interface of Signature_Stream. 
+		Unlike the legacy signatures, which replay the seeded random generator from the start, any signature can be computed in O(1).
+		:param indices: The indices of the legacy signature with the same length (4 bits per index).
+		:param length: The number of signatures to generate upfront (e.g. the number of chunks). 
+		If None, the signatures are generated in blocks on demand.
+		:param seed: The preshared seed, i.e. the key of the keyed hash.
+		:param block_size: The number of signatures generated each time the stream is extended.
+		'''
+		self.indices = indices
+		self.seed = seed
+		self.block_size = block_size
+		self.signatures = get_counter_signatures(0, length or 0, indices, seed)
+
+	def __getitem__(self, signature_number):
+		count = len(self.signatures)
+		if signature_number < count:
+			return self.signatures[signature_number]
+		# Far ahead of the stream: compute the signature alone
+		if signature_number >= count + self.block_size:
+			return get_counter_signatures(signature_number, signature_number + 1, self.indices, self.seed)[0]
+		self.signatures.extend(get_counter_signatures(count, count + self.block_size, self.indices, self.seed))
+		return self.signatures[signature_number]
+
+	def get_range(self, start, stop):
+		'''
+		Returns the array of the signatures start, ..., stop - 1.
+		'''
+		if stop <= len(self.signatures):
+			return self.signatures[start:stop]
+		return get_counter_signatures(start, stop, self.indices, self.seed)
+
+	def __len__(self):
+		return len(self.signatures)
+
+# The signature schemes of the marking covert channels: the legacy one (MD5 of the seeded random integers) and the counter mode one
+SIGNATURE_SCHEMES = {
+	"legacy": Signature_Stream,
+	"counter": Counter_Signature_Stream
+}
+
+class Signature_Cache:
+
+	def __init__(self, signature_scheme, indices, seed=PRESHARED_SEED, directory=SIGNATURE_CACHE_DIRECTORY, block_size=SIGNATURE_STREAM_BLOCK_SIZE):
+		'''
+		The signatures of a scheme stored in a file keyed by the scheme, the seed and the indices, with the interface of Signature_Stream.
+		The file is generated once and shared by all the covert channel processes with the same parameters (e.g. sender, receiver and 
+		multi-queue workers): each one maps it read-only, so opening the cache costs the same for any number of signatures.
+		If a process needs more signatures than the file holds, it appends them under an exclusive lock and maps the file again.
+		:param signature_scheme: The scheme of the signatures, a key of SIGNATURE_SCHEMES.
+		:param indices: The indices of the signature.
+		:param seed: The preshared seed.
+		:param directory: The directory of the cache files.
+		:param block_size: The file grows by a multiple of block_size signatures.
+		'''
+		self.signature_scheme = signature_scheme
+		self.indices = indices
+		self.seed = seed
+		self.block_size = block_size
+		self.typecode = 'I' if len(indices) <= 8 else 'Q'
+		self.itemsize = array(self.typecode).itemsize
+		key = hashlib.sha256(repr((signature_scheme, seed, list(indices), self.typecode, sys.byteorder)).encode('utf-8')).hexdigest()[:16]
+		os.makedirs(directory, exist_ok=True)
+		self.path = os.path.join(directory, "signatures_" + signature_scheme + "_" + key + ".bin")
+		# Create the file if it does not exist yet
+		open(self.path, 'ab').close()
+		self.file = None
+		self.content = None
+		self.signatures = memoryview(b'').cast(self.typecode)
+		self.map()
+
+	def map(self):
+		'''
+		Maps the complete signatures of the file read-only.
+		'''
+		self.unmap()
+		self.file = open(self.path, 'rb')
+		fcntl.flock(self.file, fcntl.LOCK_SH)
+		try:
+			length = os.fstat(self.file.fileno()).st_size // self.itemsize * self.itemsize
+			if length > 0:
+				self.content = mmap.mmap(self.file.fileno(), length, access=mmap.ACCESS_READ)
+				self.signatures = memoryview(self.content).cast(self.typecode)
+		finally:
+			fcntl.flock(self.file, fcntl.LOCK_UN)
+
+	def unmap(self):
+		self.signatures.release()
+		self.signatures = memoryview(b'').cast(self.typecode)
+		if self.content is not None:
+			self.content.close()
+			self.content = None
+		if self.file is not None:
+			self.file.close()
+			self.file = None
+
+	def grow(self, count):
+		'''
+		Appends the missing signatures, so the file holds at least count of them, and maps the file again.
+		'''
+		count = -(-count // self.block_size) * self.block_size
+		with open(self.path, 'ab') as file:
+			fcntl.flock(file, fcntl.LOCK_EX)
+			try:
+				# Another process may have grown the file in the meantime
+				available = os.fstat(file.fileno()).st_size // self.itemsize
+				if available < count:
+					signatures = SIGNATURE_SCHEMES[self.signature_scheme](self.indices, seed=self.seed).get_range(available, count)
+					file.write(array(self.typecode, signatures).tobytes())
+					file.flush()
+			finally:
+				fcntl.flock(file, fcntl.LOCK_UN)
+		self.map()
+
+	def __getitem__(self, signature_number):
+		if signature_number >= len(self.signatures):
+			self.grow(signature_number + 1)
+		return self.signatures[signature_number]
+
+	def get_range(self, start, stop):
+		'''
+		Returns the array of the signatures start, ..., stop - 1.
+		'''
+		if stop > len(self.signatures):
+			self.grow(stop)
+		return array(self.typecode, self.signatures[start:stop].tobytes())
+
+	def __len__(self):
+		return len(self.signatures)
+
+	def close(self):
+		self.unmap()
+
+def get_signature_stream(signature_scheme, indices, cached=False):
+	'''
+	Returns the signatures of the scheme (a key of SIGNATURE_SCHEMES), generated on demand, or read from the signature cache if cached.
+	'''
+	if cached:
+		return Signature_Cache(signature_scheme, indices)
+	return SIGNATURE_SCHEMES[signature_scheme](indices)
+
+class Marking_Schedule:
+
+	def __init__(self, chunks, signatures, field_length_in_bits, signature_length_in_bits, consecutive_stego, max_signature=None, block_slots=MARKING_SCHEDULE_BLOCK_SLOTS):
+		'''
+		The schedule of a marking covert channel session: the i-th stego-packet carries the chunk and the signature packed in the slot
+		schedule[i] (divmod(schedule[i], data_modulus) == (signature, chunk)) and is the last one of its burst, i.e. it is followed by 
+		the clean packets, if ends_burst(i). The slots are packed from the chunks and the signatures a block at a time, when a stego-packet 
+		of the block is needed, and the last MARKING_SCHEDULE_CACHED_BLOCKS blocks are kept, so building the schedule costs the same 
+		for any number of chunks. The ends of the bursts follow from consecutive_stego.
+		:param chunks: The chunks of the message to hide.
+		:param signatures: The signatures of the stego-packets (a Signature_Stream, a Counter_Signature_Stream or a Signature_Cache).
+		:param field_length_in_bits: The length of a chunk.
+		:param signature_length_in_bits: The length of a signature.
+		:param consecutive_stego: The length of the burst of stego packets (0: a single burst).
+		:param max_signature: If given, the signatures above max_signature are lowered to it.
+		:param block_slots: The number of slots packed at once.
+		'''
+		start = time.perf_counter()
+		self.chunks = chunks
+		self.signatures = signatures
+		self.field_length_in_bits = field_length_in_bits
+		self.data_modulus = 1 << field_length_in_bits
+		self.typecode = get_chunk_typecode(field_length_in_bits + signature_length_in_bits)
+		self.max_signature = max_signature
+		self.consecutive_stego = consecutive_stego
+		self.block_slots = block_slots
+		# The indices of the chunks of the stego-packets (None: all the chunks, in order)
+		self.indices = None
+		self.length = len(chunks)
+		self.clear_blocks()
+		self.build_time = time.perf_counter() - start
+
+	def clear_blocks(self):
+		self.blocks = collections.OrderedDict()
+		self.block_index = -1
+		self.block = None
+
+	def load_block(self, block_index):
+		block = self.blocks.get(block_index)
+		if block is None:
+			first = block_index * self.block_slots
+			stop = min(first + self.block_slots, self.length)
+			if self.indices is None:
+				positions = range(first, stop)
+				signatures = self.signatures.get_range(first, stop)
+			else:
+				positions = self.indices[first:stop]
+				signatures = self.signatures.get_range(positions[0], positions[-1] + 1)
+				signatures = [signatures[x - positions[0]] for x in positions]
+			if self.max_signature is not None:
+				signatures = [min(signature, self.max_signature) for signature in signatures]
+			chunks = self.chunks
+			shift = self.field_length_in_bits
+			block = array(self.typecode, [signature << shift | chunks[x] for x, signature in zip(positions, signatures)])
+			if len(self.blocks) >= MARKING_SCHEDULE_CACHED_BLOCKS:
+				self.blocks.popitem(last=False)
+			self.blocks[block_index] = block
+		else:
+			self.blocks.move_to_end(block_index)
+		self.block = block
+		self.block_index = block_index
+
+	def select(self, indices, consecutive_stego):
+		'''
+		Returns the schedule of the stego-packets at indices (e.g. a stripe of the message), which keep their chunks and signatures.
+		:param indices: The indices of the stego-packets, in increasing order.
+		:param consecutive_stego: The length of the burst of stego packets of the new schedule (0: a single burst).
+		'''
+		start = time.perf_counter()
+		schedule = copy.copy(self)
+		schedule.indices = indices if self.indices is None else array('Q', [self.indices[x] for x in indices])
+		schedule.length = len(indices)
+		schedule.consecutive_stego = consecutive_stego
+		schedule.clear_blocks()
+		schedule.build_time = time.perf_counter() - start
+		return schedule
+
+	def ends_burst(self, index):
+		'''
+		Returns True if the index-th stego-packet is the last one of its burst.
+		'''
+		return self.consecutive_stego > 0 and index % self.consecutive_stego == self.consecutive_stego - 1
+
+	def get_signature(self, index):
+		'''
+		Returns the signature of the index-th stego-packet, or None if the index is past the end of the message.
+		'''
+		if index < self.length:
+			return self[index] // self.data_modulus
+		return None
+
+	def repeats_signature(self, index):
+		'''
+		Returns True if the index-th stego-packet has the signature of the following one, so a copy of it (e.g. another segment of the same
+		GSO packet) would be taken for the following one by the receiver.
+		'''
+		return index + 1 < self.length and self[index] // self.data_modulus == self[index + 1] // self.data_modulus
+
+	def __getitem__(self, index):
+		if not 0 <= index < self.length:
+			raise IndexError("IndexError: slot index out of range!")
+		block_index, offset = divmod(index, self.block_slots)
+		if block_index != self.block_index:
+			self.load_block(block_index)
+		return self.block[offset]
+
+	def __iter__(self):
+		for block_index in range(-(-self.length // self.block_slots)):
+			if block_index != self.block_index:
+				self.load_block(block_index)
+			yield from self.block
+
+	def __len__(self):
+		return self.length
+
+def get_stripe_indices(length, weights):
+	'''
+	Splits the indices 0, ..., length - 1 in one stripe per weight: the indices are dealt in turn to the stripes, weights[i] at a time to the i-th one.
+	Returns the arrays of the indices of the stripes.
+	:param length: The number of indices (e.g. of chunks of the message).
+	:param weights: The weights of the stripes.
+	'''
+	period = sum(weights)
+	stripes = []
+	first = 0
+	for weight in weights:
+		offsets = range(first, first + weight)
+		stripes.append(array('Q', sorted(itertools.chain.from_iterable(range(x, length, period) for x in offsets))))
+		first += weight
+	return stripes
+
+def merge_stripes(stripes, values):
+	'''
+	Returns the values of the stripes in the order of their indices (the inverse of get_stripe_indices). 
+	The missing values of a stripe which is not complete are None.
+	:param stripes: The arrays of the indices of the stripes.
+	:param values: The lists of the values of the stripes.
+	'''
+	merged = [None] * sum(len(x) for x in stripes)
+	for indices, stripe_values in zip(stripes, values):
+		for index, value in zip(indices, stripe_values):
+			merged[index] = value
+	return merged
+
+class Stripe:
+
+	def __init__(self, sequence, indices):
+		'''
+		The items of sequence at indices, e.g. the chunks of a stripe of the message.
+		:param sequence: The complete sequence (e.g. a Chunk_Source).
+		:param indices: The indices of the items, in increasing order.
+		'''
+		self.sequence = sequence
+		self.indices = indices
+
+	def __getitem__(self, index):
+		return self.sequence[self.indices[index]]
+
+	def __iter__(self):
+		for x in self.indices:
+			yield self.sequence[x]
+
+	def __len__(self):
+		return len(self.indices)
+
+class Resync_Window:
+
+	def __init__(self, schedule, size):
+		'''
+		Indexes the signatures of the size stego-packets following the expected one (signature -> indices), so a packet marking receiver 
+		which lost some stego-packets finds the index of the next one it receives and goes on from there. 
+		The window follows the index of the expected stego-packet given to find, which may move backwards (e.g. a new repetition).
+		:param schedule: The Marking_Schedule of the covert channel.
+		:param size: The number of signatures in the window.
+		'''
+		self.schedule = schedule
+		self.size = size
+		self.start = 0
+		self.indices = {}
+		# The packet matching a signature of the window which waits for its confirmation (see confirm)
+		self.candidate = None
+		self.add(1, size + 1)
+
+	def add(self, start, stop):
+		schedule = self.schedule
+		data_modulus = schedule.data_modulus
+		for x in range(start, min(stop, len(schedule))):
+			self.indices.setdefault(schedule[x] // data_modulus, []).append(x)
+
+	def remove(self, start, stop):
+		schedule = self.schedule
+		data_modulus = schedule.data_modulus
+		for x in range(start, min(stop, len(schedule))):
+			signature = schedule[x] // data_modulus
+			# The indices leave the window in increasing order
+			indices = self.indices[signature]
+			del indices[0]
+			if not indices:
+				del self.indices[signature]
+
+	def move(self, start):
+		'''
+		Moves the window to the signatures following the index start.
+		'''
+		if start < self.start or start - self.start >= self.size:
+			self.indices = {}
+			self.add(start + 1, start + self.size + 1)
+		else:
+			self.remove(self.start + 1, start + 1)
+			self.add(self.start + self.size + 1, start + self.size + 1)
+		self.start = start
+
+	def lookup(self, signature, start):
+		'''
+		Returns the indices in start + 1, ..., start + size whose signature is signature, in increasing order.
+		:param signature: The signature of the received packet.
+		:param start: The index of the expected stego-packet.
+		'''
+		if start != self.start:
+			self.move(start)
+		return self.indices.get(signature, ())
+
+	def find(self, signature, start):
+		'''
+		Returns the lowest index in start + 1, ..., start + size whose signature is signature, or None.
+		'''
+		indices = self.lookup(signature, start)
+		if indices:
+			return indices[0]
+		return None
+
+	def confirm(self, signature, start, value, clean_packets=0):
+		'''
+		Returns the tuple (index, value) of the stego-packet the receiver resynchronizes on, or None. A packet whose signature is in the window
+		is only a candidate, since a clean packet carries one of its signatures by chance (e.g. while the receiver waits for a stego-packet lost
+		before the clean packets of the burst mode): it is confirmed by a packet with the signature of the following stego-packet, which is the
+		next packet given, or one of the next clean_packets + 1 if the candidate ends its burst. Otherwise the candidate is dropped.
+		:param signature: The signature of the received packet, which is not the expected one.
+		:param start: The index of the expected stego-packet.
+		:param value: The value carried by the packet, returned if it is confirmed.
+		:param clean_packets: The length of the burst of clean packets.
+		'''
+		candidate = self.candidate
+		self.candidate = None
+		if candidate is not None and candidate[0] == start:
+			index, candidate_value, remaining = candidate[1:]
+			if signature == self.schedule.get_signature(index + 1):
+				return index, candidate_value
+			if remaining > 1:
+				self.candidate = (start, index, candidate_value, remaining - 1)
+				return None
+		index = self.find(signature, start)
+		if index is not None:
+			self.candidate = (start, index, value, clean_packets + 1 if self.schedule.ends_burst(index) else 1)
+		return None
+
+class Error_Accumulator:
+
+	def __init__(self, chunks):
+		'''
+		Compares the exfiltrated chunks with the expected ones while they are received, 
+		so the failures of a repetition are known in O(1) when it ends.
+		:param chunks: The expected chunks (i.e., the message hidden by the covert sender).
+		'''
+		self.chunks = chunks
+		self.reset()
+
+	def reset(self):
+		self.received = 0
+		self.mismatches = 0
+		self.bit_errors = 0
+		self.erasures = 0
+		self.index_first_mismatch = -1
+		self.last_bit_errors = 0
+
+	def add(self, value):
+		'''
+		Accounts the next exfiltrated chunk. Chunks received beyond the expected ones are only counted.
+		'''
+		index = self.received
+		self.received += 1
+		self.last_bit_errors = 0
+		if index < len(self.chunks):
+			expected = self.chunks[index]
+			if value != expected:
+				self.mismatches += 1
+				self.last_bit_errors = bin(value ^ expected).count('1')
+				self.bit_errors += self.last_bit_errors
+				if self.index_first_mismatch == -1:
+					self.index_first_mismatch = index
+
+	def erase(self, count):
+		'''
+		Accounts count lost chunks (e.g. skipped by a resynchronization) as failures without bit errors.
+		'''
+		index = self.received
+		self.received += count
+		self.erasures += count
+		self.last_bit_errors = 0
+		if index < len(self.chunks):
+			self.mismatches += min(count, len(self.chunks) - index)
+			if self.index_first_mismatch == -1:
+				self.index_first_mismatch = index
+
+	def remove_last(self):
+		'''
+		Withdraws the last added chunk (e.g. the ending value of the start/stop mode). 
+		'''
+		self.received -= 1
+		if self.last_bit_errors:
+			self.mismatches -= 1
+			self.bit_errors -= self.last_bit_errors
+			# The last chunk has the highest index, it is the first mismatch only if it is the only one
+			if self.index_first_mismatch == self.received:
+				self.index_first_mismatch = -1
+		self.last_bit_errors = 0
+
+	def get_failures(self):
+		'''
+		Returns the chunks which differ from the expected ones plus the missing or exceeding chunks.
+		'''
+		return self.mismatches + abs(self.received - len(self.chunks))
+
+	def get_index_first_failure(self, sent_received_chunks):
+		'''
+		Returns the index of the first wrong chunk, the index following the last one received (or expected) 
+		if only the length is wrong, and sent_received_chunks if there are no failures.
+		'''
+		if self.get_failures() == 0:
+			return sent_received_chunks
+		if self.index_first_mismatch != -1:
+			return self.index_first_mismatch
+		return min(self.received, len(self.chunks))
+
+class Hop_Limit_Calibration:
+
+	def __init__(self, codec, window=DEFAULT_HOP_LIMIT_CALIBRATION_WINDOW, min_samples=HOP_LIMIT_CALIBRATION_MIN_SAMPLES):
+		'''
+		Learns the hop limit baseline of a flow at the receiver and moves the thresholds of the codec around it (see
+		header_codec.Hop_Limit_Codec.set_baseline). The baseline is the most frequent hop limit of the last window clean packets, kept in a histogram.
+		Without min_samples clean packets in the window (e.g. with no clean packets between the stego-packets), it is the centre of the hop limits
+		of the last window stego-packets, once they span the lowest and the highest level. The stego-packets are never decoded for the
+		calibration: the errors of a wrong baseline would be fed back into it.
+		The most frequent hop limit is searched again only when a sample leaving the window had its count, and so are the lowest and highest ones.
+		:param codec: The header_codec.Hop_Limit_Codec decoding the hop limits.
+		:param window: The number of hop limits in each histogram.
+		:param min_samples: The number of hop limits received before the baseline of the codec is changed.
+		'''
+		self.codec = codec
+		self.window = window
+		self.min_samples = min_samples
+		self.counts = [0] * 256
+		self.samples = collections.deque()
+		self.mode = codec.baseline
+		self.stego_counts = [0] * 256
+		self.stego_samples = collections.deque()
+		self.lowest = 255
+		self.highest = 0
+		self.spread = codec.level_offsets[-1] - codec.level_offsets[0]
+		self.recalibrations = 0
+
+	def add(self, hop_limit):
+		'''
+		Accounts the hop limit of a clean packet, and recalibrates the codec if the most frequent hop limit changed.
+		'''
+		hop_limit = min(max(hop_limit, 0), 255)
+		counts = self.counts
+		samples = self.samples
+		counts[hop_limit] += 1
+		samples.append(hop_limit)
+		if len(samples) > self.window:
+			oldest = samples.popleft()
+			counts[oldest] -= 1
+			if oldest == self.mode and oldest != hop_limit:
+				self.mode = max(range(256), key=counts.__getitem__)
+		if counts[hop_limit] > counts[self.mode]:
+			self.mode = hop_limit
+		if len(samples) >= self.min_samples:
+			self.set_baseline(self.mode)
+
+	def add_stego(self, hop_limit):
+		'''
+		Accounts the raw hop limit of a stego-packet, and recalibrates the codec on the centre of the stego hop limits
+		if too few clean packets are in the window.
+		'''
+		hop_limit = min(max(hop_limit, 0), 255)
+		counts = self.stego_counts
+		samples = self.stego_samples
+		counts[hop_limit] += 1
+		samples.append(hop_limit)
+		self.lowest = min(self.lowest, hop_limit)
+		self.highest = max(self.highest, hop_limit)
+		if len(samples) > self.window:
+			oldest = samples.popleft()
+			counts[oldest] -= 1
+			if not counts[oldest]:
+				if oldest == self.lowest:
+					self.lowest = next(x for x in range(oldest, 256) if counts[x])
+				if oldest == self.highest:
+					self.highest = next(x for x in range(oldest, -1, -1) if counts[x])
+		if len(self.samples) < self.min_samples and len(samples) >= self.min_samples and self.highest - self.lowest >= self.spread:
+			self.set_baseline((self.lowest + self.highest) // 2)
+
+	def set_baseline(self, baseline):
+		'''
+		Recalibrates the codec on baseline, if it changed.
+		'''
+		if baseline != self.codec.baseline:
+			self.codec.set_baseline(baseline)
+			self.recalibrations += 1
+
+def get_hop_count(baseline):
+	'''
+	Returns the estimated number of routers on the path of the packets received with the hop limit baseline:
+	the lowest common initial hop limit not below the baseline, minus the baseline.
+	'''
+	return min(x for x in COMMON_INITIAL_HOP_LIMITS if x >= baseline) - baseline
+
+def count_clean_segments(clean_counter, consecutive_nonstego, segments):
+	'''
+	Returns the clean counter of a marking sender after segments clean packets on the wire (the segments of a GSO packet). The receiver
+	goes back to the stegotime at the end of the burst of clean packets, so the segments past it are not counted.
+	:param clean_counter: The clean counter.
+	:param consecutive_nonstego: The length of the burst of non-stego packets.
+	:param segments: The number of clean packets on the wire.
+	'''
+	return clean_counter + min(segments, consecutive_nonstego - clean_counter % consecutive_nonstego)
+
+def get_tcp_send_buffer_size():
+	'''
+	Returns the maximum size of the TCP send buffer (the last value of net.ipv4.tcp_wmem), which bounds the bytes in flight of a connection.
+	'''
+	try:
+		with open('/proc/sys/net/ipv4/tcp_wmem') as file:
+			return int(file.read().split()[2])
+	except (OSError, ValueError, IndexError):
+		return DEFAULT_TCP_SEND_BUFFER_SIZE
+
+# TCP sequence numbers wrap around: they are compared with serial number arithmetic (RFC 1982), i.e. a sequence number is before 
+# another one if it is less than half the sequence number space behind it
+TCP_SEQUENCE_MASK = 0xffffffff
+TCP_SEQUENCE_HALF = 0x80000000
+
+def is_sequence_before(seq, other):
+	'''
+	Returns True if the TCP sequence number seq comes before other, also across a wrap of the sequence numbers.
+	'''
+	return (seq - other) & TCP_SEQUENCE_MASK >= TCP_SEQUENCE_HALF
+
+def get_next_sequence(next_expected_seq, seq, payload_length):
+	'''
+	Returns the sequence number expected after the segment starting at seq with payload_length bytes, in a flow where next_expected_seq 
+	was expected: the end of the segment, unless it is before next_expected_seq. The segments left in the kernel (e.g. by the min_payload
+	match) are not seen, so the end of the last segment seen is taken instead of adding up the payload lengths.
+	'''
+	end = (seq + payload_length) & TCP_SEQUENCE_MASK
+	return next_expected_seq if is_sequence_before(end, next_expected_seq) else end
+
+class Retransmission_Map:
+
+	def __init__(self, window=None):
+		'''
+		The value and the signature injected in each stego-segment by the TCP sequence number of the segment, so a reliable marking sender 
+		marks a retransmitted segment again with them. A segment starting more than window bytes before the highest sequence number sent
+		is acknowledged, since it cannot be in flight anymore: it is evicted.
+		:param window: The maximum number of bytes in flight (default: the maximum TCP send buffer).
+		'''
+		self.window = window if window is not None else get_tcp_send_buffer_size()
+		self.marks = {}
+		# The sequence numbers in the order they were added, from the index first on: the evicted ones are dropped in batches
+		self.sequence_numbers = []
+		self.first = 0
+		# The end of the GSO packets by their sequence number
+		self.ends = {}
+
+	def add(self, seq, data, signature, length=0):
+		'''
+		:param length: The payload length of a GSO packet, whose segments are retransmitted alone (0: a single segment).
+		'''
+		self.marks[seq] = (data, signature)
+		self.sequence_numbers.append(seq)
+		if length:
+			self.ends[seq] = (seq + length) & TCP_SEQUENCE_MASK
+
+	def get(self, seq):
+		'''
+		Returns the (value, signature) injected in the segment seq, or in the GSO packet covering it, or None if it was not a stego-segment.
+		'''
+		mark = self.marks.get(seq)
+		if mark is None and self.ends:
+			start = self.find_start(seq)
+			if start is not None and is_sequence_before(seq, self.ends.get(start, start)):
+				return self.marks[start]
+		return mark
+
+	def find_start(self, seq):
+		'''
+		Returns the last sequence number added which is not after seq, or None. The sender adds the sequence numbers in sending order, 
+		so their distances from the oldest one kept increase along the list, also across a wrap: the distance of seq is bisected.
+		'''
+		sequence_numbers = self.sequence_numbers
+		low, high = self.first, len(sequence_numbers)
+		if low == high:
+			return None
+		oldest = sequence_numbers[low]
+		distance = (seq - oldest) & TCP_SEQUENCE_MASK
+		if distance >= TCP_SEQUENCE_HALF:
+			return None
+		while low < high:
+			middle = (low + high) >> 1
+			if distance < (sequence_numbers[middle] - oldest) & TCP_SEQUENCE_MASK:
+				high = middle
+			else:
+				low = middle + 1
+		return sequence_numbers[low - 1]
+
+	def evict(self, highest_seq):
+		'''
+		Forgets the segments which start more than window bytes before highest_seq.
+		'''
+		limit = (highest_seq - self.window) & TCP_SEQUENCE_MASK
+		sequence_numbers = self.sequence_numbers
+		first = self.first
+		while first < len(sequence_numbers) and is_sequence_before(sequence_numbers[first], limit):
+			# Segments without data (e.g. pure ACKs) may repeat a sequence number
+			seq = sequence_numbers[first]
+			first += 1
+			self.marks.pop(seq, None)
+			self.ends.pop(seq, None)
+		# The evicted sequence numbers are dropped once they make up half of the list
+		if first > len(sequence_numbers) >> 1:
+			del sequence_numbers[:first]
+			first = 0
+		self.first = first
+
+	def clear(self):
+		self.marks = {}
+		self.ends = {}
+		self.sequence_numbers = []
+		self.first = 0
+
+	def __len__(self):
+		return len(self.marks)
+
+def get_retransmission_key(pkt):
+	'''
+	Returns the TCP sequence number of the packet if it is a TCP segment carrying data (i.e. a segment which can be retransmitted), or None.
+	:param pkt: The raw IPv6 packet.
+	'''
+	if header_codec.get_next_header(pkt) != PROTOCOL_IDS["TCP"]:
+		return None
+	seq, payload_length = header_codec.get_tcp_sequence_number_and_payload_length(pkt)
+	if not payload_length:
+		return None
+	return seq
+
+class Reassembly_Buffer:
+
+	def __init__(self, schedule, size, window=None):
+		'''
+		Places the stego-segments received by a reliable marking receiver at the index of their signature: the expected one or, for a segment
+		which overtook some of the previous ones, one of the following size indices. A bitmap over the indices records the chunks received,
+		and the values received out of order wait for the missing ones. A retransmitted copy of a segment already received (same TCP sequence 
+		number, or no index left for its signature) is dropped.
+		:param schedule: The Marking_Schedule of the covert channel.
+		:param size: The number of signatures following the expected one searched for the segments received out of order.
+		:param window: The maximum number of bytes in flight, after which the sequence number of a segment is forgotten (see Retransmission_Map).
+		'''
+		self.schedule = schedule
+		self.window = Resync_Window(schedule, size)
+		self.segments = Retransmission_Map(window)
+		self.reset()
+
+	def reset(self):
+		self.received = bytearray((len(self.schedule) + 7) >> 3)
+		self.values = {}
+		self.segments.clear()
+		self.highest_seq = None
+		self.duplicates = 0
+		self.reordered = 0
+
+	def place(self, expected, signature, value, seq=None):
+		'''
+		Returns the index of the chunk carried by the segment, or None if it is a duplicate or no index has its signature.
+		:param expected: The index of the next chunk to deliver.
+		:param signature: The signature of the segment.
+		:param value: The value carried by the segment, returned by pop.
+		:param seq: The TCP sequence number of the segment (None: not a TCP segment).
+		'''
+		if seq is not None and self.segments.get(seq) is not None:
+			self.duplicates += 1
+			return None
+		received = self.received
+		if signature == self.schedule.get_signature(expected):
+			index = expected
+		else:
+			indices = self.window.lookup(signature, expected)
+			index = next((x for x in indices if not received[x >> 3] & (1 << (x & 7))), None)
+			if index is None:
+				if indices:
+					self.duplicates += 1
+				return None
+			self.reordered += 1
+		received[index >> 3] |= 1 << (index & 7)
+		self.values[index] = value
+		if seq is not None:
+			self.segments.add(seq, index, signature)
+			if self.highest_seq is None or is_sequence_before(self.highest_seq, seq):
+				self.highest_seq = seq
+				self.segments.evict(seq)
+		return index
+
+	def pop(self, index):
+		'''
+		Yields and removes the values of the consecutive indices received from index on.
+		'''
+		values = self.values
+		while index in values:
+			yield values.pop(index)
+			index += 1
+
+def get_nfqueue_target(queues=1):
+	'''
+	Returns the options of the NFQUEUE target. With more than one queue, the packets are balanced over the queues 
+	NETFILTER_QUEUE_NUMBER, ..., NETFILTER_QUEUE_NUMBER + queues - 1 by the kernel with --queue-balance: the queue is chosen by hashing 
+	the IPv6 addresses of the packet, so all the packets of a flow go to the same queue and keep their order, but so do all the flows 
+	between the same two hosts. Balancing by CPU (--queue-cpu-fanout) would spread the packets of a flow over the queues, out of order.
+	:param queues: The number of queues.
+	'''
+	if queues == 1:
+		return ['--queue-num', str(NETFILTER_QUEUE_NUMBER)]
+	return ['--queue-balance', str(NETFILTER_QUEUE_NUMBER) + ':' + str(NETFILTER_QUEUE_NUMBER + queues - 1)]
+
+# Keys of the ip6tables match options (see get_ip6tables_matches), the protocols whose ports can be matched,
+# and the largest TCP header, which the minimum payload length is added to
+IP6TABLES_MATCH_KEYS = ('protocol', 'ports', 'min_payload', 'mark', 'connmark')
+IP6TABLES_PORT_PROTOCOLS = ('tcp', 'udp', 'sctp')
+TCP_MAXIMUM_HEADER_LENGTH = 60
+# Comments of the rules counting the packets from SOURCE_IPv6_ADDRESS to DESTINATION_IPv6_ADDRESS and the queued ones
+IP6TABLES_COUNTER_COMMENT = 'ipv6cc-all'
+IP6TABLES_QUEUE_COMMENT = 'ipv6cc-queued'
+
+def get_ip6tables_matches(options):
+	'''
+	Returns the ip6tables match arguments which select the packets queued to the covert channel, so only the eligible packets leave the kernel.
+	Each option is key=value, with the keys: protocol (e.g. tcp), ports (the comma separated ports, either source or destination, of a tcp, 
+	udp or sctp protocol), min_payload (the smallest TCP payload after the largest TCP header, which leaves out the pure ACKs), mark and 
+	connmark (value[/mask] of the packet and connection marks). Sender and receiver must use the same options, so they see the same packets.
+	:param options: The list of key=value options (None or empty: no match).
+	'''
+	values = {}
+	for option in options or []:
+		key, separator, value = option.partition('=')
+		if key not in IP6TABLES_MATCH_KEYS or not value:
+			raise ValueError("ValueError: the ip6tables match options are key=value, with the keys " + ", ".join(IP6TABLES_MATCH_KEYS) + "!")
+		values[key] = value
+	matches = []
+	protocol = values.get('protocol')
+	if protocol is not None:
+		matches += ['-p', protocol]
+	if 'ports' in values:
+		if protocol not in IP6TABLES_PORT_PROTOCOLS:
+			raise ValueError("ValueError: the ports can be matched only with the protocol " + ", ".join(IP6TABLES_PORT_PROTOCOLS) + "!")
+		matches += ['-m', 'multiport', '--ports', values['ports']]
+	if 'min_payload' in values:
+		if protocol != 'tcp' or not values['min_payload'].isdigit():
+			raise ValueError("ValueError: the minimum payload length is a number of bytes of the protocol tcp!")
+		minimum_length = header_codec.IPv6_HEADER_LENGTH + TCP_MAXIMUM_HEADER_LENGTH + int(values['min_payload'])
+		matches += ['-m', 'length', '--length', str(minimum_length) + ':']
+	if 'mark' in values:
+		matches += ['-m', 'mark', '--mark', values['mark']]
+	if 'connmark' in values:
+		matches += ['-m', 'connmark', '--mark', values['connmark']]
+	return matches
+
+# The rules (arguments following the chain) appended and not yet deleted, by side (sender=True, receiver=False)
+installed_ip6tables_rules = {}
+
+def get_ip6tables_chain(sender):
+	# The sender queues the packets it sends, the receiver the ones it receives
+	return 'OUTPUT' if sender else 'INPUT'
+
+def append_ip6tables_rule(sender, queues=1, matches=None):
+	'''
+	Appends the rule queueing the packets from SOURCE_IPv6_ADDRESS to DESTINATION_IPv6_ADDRESS. With matches (see get_ip6tables_matches),
+	only the matching packets are queued, and a rule without target before it counts all the packets, so the packets left in the kernel
+	are reported when the rules are deleted.
+	:param sender: True for the OUTPUT chain of the sender, False for the INPUT chain of the receiver.
+	:param queues: The number of queues (see get_nfqueue_target).
+	:param matches: The ip6tables match arguments of the queued packets.
+	'''
+	addresses = ['-s', SOURCE_IPv6_ADDRESS, '-d', DESTINATION_IPv6_ADDRESS]
+	target = ['-j', 'NFQUEUE'] + get_nfqueue_target(queues)
+	if matches:
+		rules = [addresses + ['-m', 'comment', '--comment', IP6TABLES_COUNTER_COMMENT], 
+			addresses + matches + ['-m', 'comment', '--comment', IP6TABLES_QUEUE_COMMENT] + target]
+	else:
+		rules = [addresses + target]
+	installed_ip6tables_rules[sender] = rules
 	print('')
 	print(TITLE_APPEND_IP6TABLES)
-	if sender:
-		args = ['sudo', 'ip6tables', '-A', 'OUTPUT', '-s', SOURCE_IPv6_ADDRESS, '-d', DESTINATION_IPv6_ADDRESS, '-j', 'NFQUEUE', '--queue-num', str(NETFILTER_QUEUE_NUMBER)]
-	else:
-		args = ['sudo', 'ip6tables', '-A', 'INPUT', '-s', SOURCE_IPv6_ADDRESS, '-d', DESTINATION_IPv6_ADDRESS, '-j', 'NFQUEUE', '--queue-num', str(NETFILTER_QUEUE_NUMBER)]
-	#p = subprocess.Popen(args, stdout=subprocess.PIPE, stderr=subprocess.PIPE, shell=True)
-	p = subprocess.Popen(args)
-	stdout, stderr = p.communicate()
+	for rule in rules:
+		#p = subprocess.Popen(args, stdout=subprocess.PIPE, stderr=subprocess.PIPE, shell=True)
+		p = subprocess.Popen(['sudo', 'ip6tables', '-A', get_ip6tables_chain(sender)] + rule)
+		stdout, stderr = p.communicate()
 	print('')
 
 
+def get_ip6tables_counters(chain):
+	'''
+	Returns the packet counters of the commented rules of the chain, by their comment.
+	'''
+	p = subprocess.Popen(['sudo', 'ip6tables', '-L', chain, '-v', '-x', '-n'], stdout=subprocess.PIPE, universal_newlines=True)
+	stdout, stderr = p.communicate()
+	counters = {}
+	for line in stdout.splitlines():
+		fields = line.split()
+		# The comment follows the matches as /* comment */
+		if '/*' in fields and fields[0].isdigit():
+			counters[fields[fields.index('/*') + 1]] = int(fields[0])
+	return counters
+
+def print_ip6tables_filter_stats(sender):
+	counters = get_ip6tables_counters(get_ip6tables_chain(sender))
+	if IP6TABLES_COUNTER_COMMENT not in counters or IP6TABLES_QUEUE_COMMENT not in counters:
+		return
+	packets = counters[IP6TABLES_COUNTER_COMMENT]
+	queued = counters[IP6TABLES_QUEUE_COMMENT]
+	print('')
+	print(TITLE_IP6TABLES_FILTER)
+	print("- Packets from the source to the destination: " + str(packets))
+	print("- Queued packets: " + str(queued))
+	print("- Packets left in the kernel by the filter: " + str(packets - queued) + (" (" + str(round((packets - queued) / packets * 100, 2)) + "%)" if packets else ""))
+
 def delete_ip6tables_rule(sender):
+	# The rule may already be deleted once all the repetitions are done
+	if sender not in installed_ip6tables_rules:
+		return
+	rules = installed_ip6tables_rules.pop(sender)
+	if len(rules) > 1:
+		print_ip6tables_filter_stats(sender)
 	print('')
 	print(TITLE_DELETE_IP6TABLES)
-	if sender:
-		args = ['sudo', 'ip6tables', '-D', 'OUTPUT', '-s', SOURCE_IPv6_ADDRESS, '-d', DESTINATION_IPv6_ADDRESS, '-j', 'NFQUEUE', '--queue-num', str(NETFILTER_QUEUE_NUMBER)]
-	else:
-		args = ['sudo', 'ip6tables', '-D', 'INPUT', '-s', SOURCE_IPv6_ADDRESS, '-d', DESTINATION_IPv6_ADDRESS, '-j', 'NFQUEUE', '--queue-num', str(NETFILTER_QUEUE_NUMBER)]
-	p = subprocess.Popen(args)
-	stdout, stderr = p.communicate()
+	for rule in rules:
+		p = subprocess.Popen(['sudo', 'ip6tables', '-D', get_ip6tables_chain(sender)] + rule)
+		stdout, stderr = p.communicate()
 	print('')
+
+# The options of a covert channel besides its message, role and burst lengths: the queue (queues, event_loop, control_port, capture, gso_mtu),
+# the signatures (signature_scheme, signature_cache), the receiver (resync_window, retransmission_window, reorder_window), the covert sessions
+# (flows, idle_timeout, stripe_weights) and the hop limit codec (hop_limit_levels, hop_limit_baseline, calibration_window).
+# Each channel reads the options it supports.
+Channel_Options = collections.namedtuple('Channel_Options', [
+	'queues',
+	'event_loop',
+	'control_port',
+	'capture',
+	'gso_mtu',
+	'signature_scheme',
+	'signature_cache',
+	'resync_window',
+	'retransmission_window',
+	'reorder_window',
+	'flows',
+	'idle_timeout',
+	'stripe_weights',
+	'hop_limit_levels',
+	'hop_limit_baseline',
+	'calibration_window'
+], defaults=[1, False, 0, None, 0, 'legacy', False, 0, None, 0, 0, DEFAULT_FLOW_IDLE_TIMEOUT, None, 2, header_codec.DEFAULT_HOP_LIMIT_BASELINE, DEFAULT_HOP_LIMIT_CALIBRATION_WINDOW])
+
+# The command line destinations of the channel options named differently
+CHANNEL_OPTION_DESTS = {'hop_limit_levels': 'levels', 'hop_limit_baseline': 'baseline'}
+
+def get_channel_options(settings):
+	'''
+	Returns the Channel_Options of the command line settings of a covert channel script. The options the script does not have keep 
+	their defaults, and the stripe weights are only kept with more than one stripe.
+	:param settings: The settings returned by the optparse parser of the script.
+	'''
+	values = {}
+	for name in Channel_Options._fields:
+		dest = CHANNEL_OPTION_DESTS.get(name, name)
+		if hasattr(settings, dest):
+			values[name] = getattr(settings, dest)
+	if getattr(settings, 'stripes', 1) < 2:
+		values.pop('stripe_weights', None)
+	return Channel_Options(**values)
+
+def get_comma_separated_args(option, opt, value, parser):
+	setattr(parser.values, option.dest, value.split(','))
+
+def get_channel_option_parser(marking=False):
+	'''
+	Returns the optparse parser of a covert channel script with the options shared by all the scripts (the message, the role, the burst
+	lengths, the queues, the flow sessions, the passive capture and the ip6tables matches). Each script adds its own options.
+	:param marking: Whether the options of the packet marking channels are added too (the signatures, the stripes and GSO).
+	'''
+	parser = optparse.OptionParser()
+
+	parser.add_option(
+	'-r',
+	'--role',
+	help='specify the sender or the receiving role of the script: {sender|receiver}',
+	action='store',
+	type='string',
+	dest='role')
+
+	parser.add_option(
+	'-f',
+	'--file',
+	help='specify the file which shall be read and exfiltrated',
+	action='store',
+	type='string',
+	dest='filepath')
+
+	parser.add_option(
+	'-p',
+	'--consecutive_nonstego',
+	help='specify the number of clean packets inserted before/after stegopackets (default: 0)',
+	default=0,
+	action='store',
+	type='int',
+	dest='consecutive_nonstego')
+
+	parser.add_option(
+	'-l',
+	'--consecutive_stego',
+	help='specify the burst length of stegopackets (default: 0)',
+	default=0,
+	action='store',
+	type='int',
+	dest='consecutive_stego')
+
+	parser.add_option(
+	'-q',
+	'--queues',
+	help='specify the number of netfilter queues, each one served by a worker process which runs an independent covert session on each overt flow (see --flows); the kernel balances the packets over the queues by IPv6 addresses, so the flows between a single pair of addresses share one queue (default: 1)',
+	default=1,
+	action='store',
+	type='int',
+	dest='queues')
+
+	parser.add_option(
+	'-a',
+	'--event_loop',
+	help='drive the covert channel from an asyncio event loop which reads all the queued packets at each wake-up and sends the verdicts in batches',
+	default=False,
+	action='store_true',
+	dest='event_loop')
+
+	parser.add_option(
+	'-k',
+	'--control_port',
+	help='specify the local TCP port of the control interface of the event loop, answering to stats, flush and stop (default: 0, disabled)',
+	default=0,
+	action='store',
+	type='int',
+	dest='control_port')
+
+	parser.add_option(
+	'-o',
+	'--flows',
+	help='run an independent covert session on each overt flow (addresses and TCP ports), up to the specified number of flows in each queue (default: 0, a single session with one queue, ' + str(DEFAULT_MAX_FLOWS) + ' flows with several queues)',
+	default=0,
+	action='store',
+	type='int',
+	dest='flows')
+
+	parser.add_option(
+	'-i',
+	'--idle_timeout',
+	help='specify the seconds without packets after which a flow is forgotten (default: ' + str(DEFAULT_FLOW_IDLE_TIMEOUT) + ')',
+	default=DEFAULT_FLOW_IDLE_TIMEOUT,
+	action='store',
+	type='float',
+	dest='idle_timeout')
+
+	parser.add_option(
+	'-z',
+	'--capture',
+	help='receive passively from an AF_PACKET socket on the specified interface (any: all the interfaces), instead of a netfilter queue: no ip6tables rule and no verdicts (receiver only)',
+	action='store',
+	type='string',
+	dest='capture')
+
+	parser.add_option(
+	'-y',
+	'--match',
+	help='queue only the packets matching the ip6tables match option key=value, repeated for each option: protocol (e.g. tcp), ports (comma separated, with the protocol tcp, udp or sctp), min_payload (bytes of TCP payload after the largest TCP header, e.g. 1 to leave out the pure ACKs), mark and connmark (value[/mask]); the packets left in the kernel are reported (default: all the packets from the source to the destination)',
+	action='append',
+	type='string',
+	dest='matches')
+
+	if marking:
+		parser.add_option(
+		'-s',
+		'--signature_scheme',
+		help='specify the scheme of the signatures: {legacy|counter} (default: legacy). The legacy signatures replay the seeded random generator, the counter ones are keyed hashes of their index',
+		default='legacy',
+		action='store',
+		type='string',
+		dest='signature_scheme')
+
+		parser.add_option(
+		'-m',
+		'--signature_cache',
+		help='read the signatures from a memory-mapped cache file in ' + SIGNATURE_CACHE_DIRECTORY + ', generated once and grown on demand (default: False)',
+		default=False,
+		action='store_true',
+		dest='signature_cache')
+
+		parser.add_option(
+		'-t',
+		'--stripes',
+		help='split the message in the specified number of stripes, each one sent on its own overt flow (default: 1, no striping)',
+		default=1,
+		action='store',
+		type='int',
+		dest='stripes')
+
+		parser.add_option(
+		'-g',
+		'--stripe_weights',
+		help='specify the comma separated weights of the stripes, i.e. the stego-packets dealt at a time to each one (default: 1 for each stripe)',
+		default=None,
+		action='callback',
+		callback=get_comma_separated_args,
+		type='string',
+		dest='stripe_weights')
+
+		parser.add_option(
+		'-d',
+		'--gso_mtu',
+		help='negotiate GSO with the queue: the GSO packets are queued before their segmentation and counted in segments of the specified MTU of the path (default: 0, the kernel segments them before queueing them, sender only)',
+		default=0,
+		action='store',
+		type='int',
+		dest='gso_mtu')
+
+	return parser
+
+def check_channel_options(settings, marking=False):
+	'''
+	Validates the shared options of a covert channel script parsed with the parser of get_channel_option_parser, and converts the ip6tables
+	matches and the stripe weights. Raises a ValueError on an invalid option.
+	:param settings: The settings returned by the parser.
+	:param marking: Whether the options of the packet marking channels are validated too.
+	'''
+	if settings.filepath is None:
+		raise ValueError("ValueError: filepath must be specified!")
+
+	if settings.role not in ["sender", "receiver"]:
+		raise ValueError("ValueError: role can be only sender or receiver!")
+
+	if settings.queues < 1:
+		raise ValueError("ValueError: the number of queues must be at least 1!")
+
+	if settings.queues > 1 and settings.event_loop:
+		raise ValueError("ValueError: the event loop drives a single queue!")
+
+	if settings.capture is not None and settings.role != "receiver":
+		raise ValueError("ValueError: only the receiver can capture passively!")
+
+	if settings.capture is not None and (settings.queues > 1 or settings.event_loop):
+		raise ValueError("ValueError: the passive capture replaces the netfilter queues!")
+
+	if settings.capture is not None and settings.matches is not None:
+		raise ValueError("ValueError: the passive capture needs no ip6tables rule!")
+
+	settings.matches = get_ip6tables_matches(settings.matches)
+
+	if settings.flows < 0:
+		raise ValueError("ValueError: the number of flows cannot be negative!")
+
+	if settings.idle_timeout <= 0:
+		raise ValueError("ValueError: the idle timeout must be positive!")
+
+	if marking:
+		if settings.gso_mtu < 0:
+			raise ValueError("ValueError: the MTU cannot be negative!")
+
+		if settings.gso_mtu > 0 and settings.role != "sender":
+			raise ValueError("ValueError: only the sender negotiates GSO!")
+
+		if 0 < settings.gso_mtu < header_codec.IPv6_MINIMUM_MTU:
+			raise ValueError("ValueError: the MTU of an IPv6 path is at least " + str(header_codec.IPv6_MINIMUM_MTU) + " bytes!")
+
+		if settings.gso_mtu > 0 and settings.queues > 1:
+			raise ValueError("ValueError: GSO is negotiated on a single queue!")
+
+		if settings.stripes < 1:
+			raise ValueError("ValueError: the number of stripes must be at least 1!")
+
+		if settings.stripe_weights is None:
+			settings.stripe_weights = [1] * settings.stripes
+		settings.stripe_weights = [int(x) for x in settings.stripe_weights]
+
+		if len(settings.stripe_weights) != settings.stripes or any(x < 1 for x in settings.stripe_weights):
+			raise ValueError("ValueError: a positive weight must be given for each stripe!")
+
+		if settings.stripes > 1 and (settings.flows > 0 or settings.queues > 1):
+			raise ValueError("ValueError: the stripes run in a single queue, without flow sessions!")
+
+		if settings.signature_scheme not in SIGNATURE_SCHEMES:
+			raise ValueError("ValueError: signature scheme can be only legacy or counter!")
+
+	if settings.consecutive_nonstego != 0 and settings.consecutive_stego == 0 or settings.consecutive_nonstego == 0 and settings.consecutive_stego != 0:
+		print("settings.consecutive_nonstego and settings.consecutive_stego are set to 0!")
+		settings.consecutive_nonstego = 0
+		settings.consecutive_stego = 0
@@ -0,0 +1,101 @@
+from netfilterqueue import NetfilterQueue
+import multiprocessing
+import queue
+import helper
+
+# Seconds waited by the parent process for a report before checking whether the workers are still alive
+REPORT_POLL_INTERVAL = 0.5
+
+class Report_Forwarder:
+
+	def __init__(self, cc, reports):
+		'''
+		Takes the place of the reporting.Reporter of the covert channel in a worker process: the reports are sent to the parent process,
+		whose reporter thread runs them, so the CSV files are written by a single process.
+		:param cc: The covert channel.
+		:param reports: The multiprocessing queue read by the parent process.
+		'''
+		self.cc = cc
+		self.reports = reports
+
+	def submit(self, function, *args):
+		# The methods of the covert channel, or of its flow sessions, are looked up again on the copy of the parent process
+		if isinstance(getattr(function, '__self__', None), type(self.cc)):
+			function = function.__name__
+		self.reports.put((function, args))
+
+class Queue_Workers:
+
+	def __init__(self, cc, queues):
+		'''
+		Used by the covert channel cc in place of a NetfilterQueue (same bind, run and unbind methods) to run its callback 
+		in one worker process per netfilter queue, from the bound queue number to the bound queue number + queues - 1 
+		(see helper.get_nfqueue_target). The workers share no state and take no lock: the callback is the one of a 
+		flow_sessions.Flow_Sessions, so each worker runs an independent covert session on each overt flow of its queue. The kernel 
+		queues all the packets of a flow to the same queue, in order, so the sessions see the same packets as with a single queue.
+		:param cc: The covert channel.
+		:param queues: The number of queues.
+		'''
+		self.cc = cc
+		self.queues = queues
+		self.queue_number = None
+		self.callback = None
+		self.copy_range = helper.FULL_COPY_RANGE
+		# The workers get a copy of the covert channel and of its flow sessions from the parent process
+		self.context = multiprocessing.get_context('fork')
+		self.reports = self.context.Queue()
+
+	def bind(self, queue_number, callback, range=helper.FULL_COPY_RANGE):
+		'''
+		:param queue_number: The number of the first queue.
+		:param callback: The method called for each packet (i.e., run_callback of the flow sessions).
+		:param range: The bytes of each packet copied to userspace by the queues.
+		'''
+		self.queue_number = queue_number
+		self.callback = callback
+		self.copy_range = range
+
+	def unbind(self):
+		# Each worker unbinds its own queue
+		pass
+
+	def work(self, queue_number):
+		self.cc.reporter = Report_Forwarder(self.cc, self.reports)
+		nfqueue = NetfilterQueue()
+		# The bound method of the copy of the flow sessions owned by the worker
+		nfqueue.bind(queue_number, self.callback, range=self.copy_range)
+		try:
+			nfqueue.run()
+		except KeyboardInterrupt:
+			pass
+		nfqueue.unbind()
+
+	def run(self):
+		'''
+		Starts the workers and runs the reports they send until all of them are stopped. 
+		Ctrl + c stops the workers too, since they are in the same process group, and is raised once they are joined.
+		'''
+		workers = [self.context.Process(target=self.work, args=(self.queue_number + x,), daemon=True) for x in range(self.queues)]
+		for worker in workers:
+			worker.start()
+		try:
+			while any(worker.is_alive() for worker in workers):
+				try:
+					self.submit_report(self.reports.get(timeout=REPORT_POLL_INTERVAL))
+				except queue.Empty:
+					pass
+		finally:
+			for worker in workers:
+				worker.join()
+			# The reports sent just before the workers stopped
+			while True:
+				try:
+					self.submit_report(self.reports.get_nowait())
+				except queue.Empty:
+					break
+
+	def submit_report(self, report):
+		function, args = report
+		if isinstance(function, str):
+			function = getattr(self.cc, function)
+		self.cc.reporter.submit(function, *args)
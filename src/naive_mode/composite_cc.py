@@ -0,0 +1,369 @@
+from netfilterqueue import NetfilterQueue
+import sys
+import time
+sys.path.insert(1, '../')
+import helper
+import header_codec
+import reporting
+import multi_queue
+import async_queue
+import packet_capture
+import flow_sessions
+
+class Composite_CC:
+
+	def __init__(self, filepath, chunks, stegopackets, role, consecutive_nonstego, consecutive_stego, codec, options=helper.Channel_Options()):
+		'''
+		Constructor for sender and receiver of a composite cc, which carries each chunk in several fields of the same packet.
+		:param filepath: The path to the message to hide. 
+		:param chunks: A helper.Chunk_Source of integers containing the message to hide splitted in chunks.
+		:param stegopackets: Number of stego packets to consider.
+		:param role: The role (i.e., sender or receiver) assigned.
+		:param consecutive_nonstego: The length of the burst of non-stego packets.
+		:param consecutive_stego: The lenght of the burst of stego packets
+		:param codec: The header_codec.Composite_Codec packing the chunks into the fields.
+		:param options: The helper.Channel_Options of the queue, the signatures, the covert sessions and the codec.
+		'''
+		self.chunks = chunks 				
+		self.stegopackets = stegopackets
+		self.actual_number = 0
+		self.role = role
+		self.filepath = filepath
+		self.codec = codec
+
+		self.consecutive_nonstego = consecutive_nonstego
+		self.consecutive_stego = consecutive_stego
+		self.stegotime = True
+		self.clean_counter = 0
+
+		self.number_of_repetitions = 20
+		self.number_of_repetitions_done = 0
+
+		self.sent_received_chunks = 0
+		if options.queues > 1:
+			self.nfqueue = multi_queue.Queue_Workers(self, options.queues)
+		elif options.event_loop:
+			self.nfqueue = async_queue.Async_Queue(self, options.control_port)
+		elif options.capture is not None:
+			self.nfqueue = packet_capture.Packet_Capture(options.capture)
+		else:
+			self.nfqueue = NetfilterQueue()
+		if options.flows > 0 or options.queues > 1:
+			self.nfqueue = flow_sessions.Flow_Sessions(self, self.nfqueue, options.flows or flow_sessions.DEFAULT_MAX_FLOWS, options.idle_timeout)
+		self.exfiltrated_data = []
+		self.errors = helper.Error_Accumulator(self.chunks)
+		self.reporter = reporting.Reporter()
+
+		# ------------------- MEASUREMENT VARIABLES ------------------- #
+		self.starttime_stegocommunication = 0.0
+		self.endtime_stegocommunication = 0.0
+		self.injection_exfiltration_time_sum = 0.0
+
+	def inject(self, packet):
+		'''
+	   	The inject method of the sender, which is bound the the netfilter queue NETFILTERQUEUE_NUMBER.
+	   	This method injects the i-th chunks of the secret message (i.e., self.chunks[self.sent_received_chunks])
+	   	into the targeted field, accordingly to the sending mode used (i.e., interleaved or burst).
+	   	:param Packet packet: The NetfilterQueue Packet object packet.
+	   	'''
+		if self.number_of_repetitions_done < self.number_of_repetitions: 
+			tmp1 = time.perf_counter()
+			if self.sent_received_chunks < self.stegopackets[self.actual_number]:
+
+				if self.sent_received_chunks == 0:
+					self.starttime_stegocommunication = time.perf_counter()
+
+				if self.stegotime:
+					pkt = bytearray(packet.get_payload())
+					
+					self.codec.set(pkt, self.chunks[self.sent_received_chunks])
+					self.exfiltrated_data.append(self.codec.get(pkt))
+					packet.set_payload(bytes(pkt))
+
+					self.sent_received_chunks += 1
+
+					if self.consecutive_stego > 0:
+						self.stegotime = self.sent_received_chunks % self.consecutive_stego != 0
+				else:
+					self.clean_counter += 1
+					self.stegotime = self.clean_counter % self.consecutive_nonstego == 0
+			else:
+
+				self.endtime_stegocommunication = time.perf_counter()
+				self.stegotime = True
+				self.injection_exfiltration_time_sum += time.perf_counter() - tmp1
+				self.number_of_repetitions_done += 1
+				summary = reporting.get_repetition_summary(self)
+				self.reporter.submit(self.statistical_evaluation_sent_packets, summary)
+				self.reporter.submit(self.write_csv, summary)
+				# All the repetitions are done: the kernel can stop queueing the packets
+				if self.number_of_repetitions_done == self.number_of_repetitions and self.actual_number == len(self.stegopackets) - 1:
+					self.reporter.submit(helper.delete_ip6tables_rule, True)
+				self.injection_exfiltration_time_sum = 0
+				self.sent_received_chunks = 0
+				self.exfiltrated_data = []
+			if self.sent_received_chunks != 0:
+				self.injection_exfiltration_time_sum += time.perf_counter() - tmp1
+		
+		else:
+			if self.actual_number < len(self.stegopackets) - 1:
+				self.actual_number += 1
+				self.chunks.set_length(self.stegopackets[self.actual_number])
+				self.reporter.submit(self.print_start_message)
+				self.number_of_repetitions_done = 0
+			
+		packet.accept()
+
+
+	def exfiltrate(self, packet):
+		'''
+	   	The exfiltration method of the receiver, which is bound the the netfilter queue NETFILTERQUEUE_NUMBER.
+	   	This method extracts the value contained into the targeted field, accordingly to the sending mode used 
+	   	(i.e., interleaved or burst).
+	   	:param Packet packet: The NetfilterQueue Packet object.
+	   	'''
+		if self.number_of_repetitions_done < self.number_of_repetitions: 
+			tmp1 = time.perf_counter()		
+			if self.sent_received_chunks < self.stegopackets[self.actual_number]:
+
+				if self.sent_received_chunks == 0:
+					self.starttime_stegocommunication = time.perf_counter()
+
+				if self.stegotime:
+					pkt = packet.get_payload()
+					
+					self.exfiltrated_data.append(self.codec.get(pkt))
+					self.errors.add(self.exfiltrated_data[-1])
+										
+					self.sent_received_chunks += 1
+
+					if self.consecutive_stego > 0:
+						self.stegotime = self.sent_received_chunks % self.consecutive_stego != 0
+				else:
+					self.clean_counter += 1
+					self.stegotime = self.clean_counter % self.consecutive_nonstego == 0
+			else:	
+
+				self.endtime_stegocommunication = time.perf_counter()
+				self.stegotime = True
+				self.injection_exfiltration_time_sum += time.perf_counter() - tmp1
+				self.number_of_repetitions_done += 1
+				summary = reporting.get_repetition_summary(self)
+				self.reporter.submit(self.statistical_evaluation_received_packets, summary)
+				self.reporter.submit(self.write_csv, summary)
+				# All the repetitions are done: the kernel can stop queueing the packets
+				if self.number_of_repetitions_done == self.number_of_repetitions and self.actual_number == len(self.stegopackets) - 1:
+					self.reporter.submit(helper.delete_ip6tables_rule, False)
+				self.injection_exfiltration_time_sum = 0
+				self.sent_received_chunks = 0
+				self.exfiltrated_data = []
+				self.errors.reset()
+
+			if self.sent_received_chunks != 0:
+				self.injection_exfiltration_time_sum += time.perf_counter() - tmp1
+
+		else:
+
+			if self.actual_number < len(self.stegopackets) - 1:
+				self.actual_number += 1
+				self.chunks.set_length(self.stegopackets[self.actual_number])
+				self.reporter.submit(self.print_start_message)
+				self.number_of_repetitions_done = 0
+
+		packet.accept()
+	
+	def write_csv(self, summary):
+		
+		filename="composite_cc_" + "_".join(x.replace(" ", "_").lower() for x in self.codec.fields) + "_" + self.filepath.replace("../", "", 1) + "_stegopackets_" + str(self.stegopackets[summary.actual_number]) + "_role_" + self.role + "_clean_packets_" + str(self.consecutive_nonstego) + "_number_stegopackets_" + str(self.consecutive_stego) + ".csv"
+		if self.role == 'sender':
+			writer = self.reporter.get_csv_writer(filename, ["Sent Chunks (Packets)", "Duration of Stegocommunication (ms)", "Average Injection Time (ms)", "Bandwidth (bits/s)"])
+		else:
+			writer = self.reporter.get_csv_writer(filename, ["Received Chunks (Packets)", "Duration of Stegocommunication (ms)", "Average Exfiltration Time (ms)", "Bandwith (bits/s)", "Failures", "Error Rate (Failures/Packet)", "Successfully transmitted Message (%)"])
+		
+		if self.role == 'sender':
+			writer.writerow([summary.sent_received_chunks, \
+				round((summary.endtime_stegocommunication - summary.starttime_stegocommunication) * 1000, 2), \
+				round((summary.injection_exfiltration_time_sum / summary.sent_received_chunks) * 1000, 2), \
+				round((self.codec.field_length_in_bits * summary.sent_received_chunks) / (summary.endtime_stegocommunication - summary.starttime_stegocommunication), 2)])  			
+		else:
+			failures = summary.failures
+			index_first_failure = summary.index_first_failure
+				
+			writer.writerow([summary.sent_received_chunks, \
+				round((summary.endtime_stegocommunication - summary.starttime_stegocommunication) * 1000, 2), \
+				round((summary.injection_exfiltration_time_sum / summary.sent_received_chunks) * 1000, 2), \
+				round((self.codec.field_length_in_bits * summary.sent_received_chunks) / (summary.endtime_stegocommunication - summary.starttime_stegocommunication), 2), \
+				failures, \
+				round(failures/summary.sent_received_chunks, 2), \
+				# round(100 - ((failures/summary.sent_received_chunks) * 100), 2)])
+				round((index_first_failure/summary.sent_received_chunks) * 100, 2)])
+
+
+	def start_sending(self):
+		'''
+	   	Binds the inject method to the netfilter queue with its specific number and runs the callback function. 
+	   	If the user press Ctrl + c the inject method is unbind.  
+	   	'''
+
+		self.nfqueue.bind(helper.NETFILTER_QUEUE_NUMBER, self.inject)
+		try:
+			self.nfqueue.run()
+		except KeyboardInterrupt:
+			print("The exfiltration is stopped.")
+		self.nfqueue.unbind()
+		self.reporter.close()
+
+	def start_receiving(self):
+		'''
+	   	Binds the exfiltrate method to the netfilter queue with its specific number and runs the callback function. 
+	   	If the user press Ctrl + c the inject method is unbind.  
+	   	'''
+		self.nfqueue.bind(helper.NETFILTER_QUEUE_NUMBER, self.exfiltrate, range=helper.HEADER_COPY_RANGE)
+		try:
+			self.nfqueue.run()
+		except KeyboardInterrupt:
+			print("The exfiltration is stopped.")
+		self.nfqueue.unbind()
+		self.reporter.close()
+
+
+	def print_start_message(self):
+		print('')
+		if self.role == "sender":
+			print('########## Mode: Naive Mode | CC: Composite | Side: Covert Sender ##########')
+		else:
+			print('########## Mode: Naive Mode | CC: Composite | Side: Covert Receiver ##########')
+		print('- Number of Repetitions: ' + str(self.number_of_repetitions))		
+		if isinstance(self.nfqueue, flow_sessions.Flow_Sessions):
+			print('- Flow Sessions: up to ' + str(self.nfqueue.max_flows) + ' (idle timeout: ' + str(self.nfqueue.idle_timeout) + ' s)')
+		print('- Exfiltrated File: ' + self.filepath)
+		print('- Fields: ' + ' + '.join(x + ' (' + str(header_codec.COMPOSITE_FIELD_LENGTHS_IN_BITS[x]) + ' bits)' for x in self.codec.fields) + ' = ' + str(self.codec.field_length_in_bits) + ' bits per stego-packet')
+		if self.consecutive_nonstego > 0 and self.consecutive_stego > 0:
+			buf = ""
+			for x in range(2):
+				for y in range(self.consecutive_stego):
+					buf += "S "
+				for y in range(self.consecutive_nonstego):
+					buf += "C "	
+			print('- Length Clean Packets: ' + str(self.consecutive_nonstego))		
+			print('- Length Stego Packets: ' + str(self.consecutive_stego))		
+			print('  ==> Packet Pattern (S=stego, C=clean): ' + buf + "...")		
+		print('- Number of Chunks: ' + str(len(self.chunks)))	
+		if self.role == "sender":
+			print('########## Mode: Naive Mode | CC: Composite | Side: Covert Sender ##########')
+		else:
+			print('########## Mode: Naive Mode | CC: Composite | Side: Covert Receiver ##########')
+		if self.role == "sender":
+			print('Injection in covert channel is started...')
+			print('Stop injection with CTRL+C.')
+		else:
+			print('Exfiltration from covert channel is started...')
+			print('Stop exfiltration with CTRL+C...')
+		print('')
+
+	def statistical_evaluation_sent_packets(self, summary):
+		
+		print('')
+		print('##################### ANALYSIS SENT DATA #####################')
+		print("- Number of Repetitions: " + str(summary.number_of_repetitions_done) + "/" + str(self.number_of_repetitions))
+		print("- Sent stego-packets: " + str(summary.sent_received_chunks) + "/" + str(self.stegopackets[summary.actual_number]))
+		print("- Duration: " + str(round((summary.endtime_stegocommunication - summary.starttime_stegocommunication) * 1000, 2)) + " ms")
+		print("- Average Injection Time: " + str(round((summary.injection_exfiltration_time_sum / summary.sent_received_chunks) * 1000, 2)) + " ms")
+		print("- Average Bandwidth: " + str(round((self.codec.field_length_in_bits * summary.sent_received_chunks) / (summary.endtime_stegocommunication - summary.starttime_stegocommunication), 2)) + " bits/s")
+		#print("- Injected data == Chunks: " + str(self.exfiltrated_data == self.chunks))
+		print('##################### ANALYSIS SENT DATA #####################')
+		print('')
+
+	def statistical_evaluation_received_packets(self, summary):
+		
+		failures = summary.failures
+		index_first_failure = summary.index_first_failure
+
+		print('')
+		print('##################### ANALYSIS RECEIVED DATA #####################')
+		print("- Number of Repetitions: " + str(summary.number_of_repetitions_done) + "/" + str(self.number_of_repetitions))
+		print("- Received stego-packets: " + str(summary.sent_received_chunks) + "/" + str(self.stegopackets[summary.actual_number]))
+		print("- Duration: " + str(round((summary.endtime_stegocommunication - summary.starttime_stegocommunication) * 1000, 2)) + " ms")
+		print("- Average Exfiltration Time: " + str(round((summary.injection_exfiltration_time_sum / summary.sent_received_chunks) * 1000, 2)) + " ms")
+		print("- Average Bandwidth: " + str(round((self.codec.field_length_in_bits * summary.sent_received_chunks) / (summary.endtime_stegocommunication - summary.starttime_stegocommunication), 2)) + " bits/s")
+		#print("- Exfiltrated data == Chunks: " + str(self.exfiltrated_data == self.chunks) + " (" + str(failures) + " Failures)")
+		print("- Error Rate: " + str(round(failures/summary.sent_received_chunks, 2)) + " Failures/Packet")
+		print("- Bit Errors: " + str(summary.bit_errors))
+		#print("- Successfully transmitted Message: " + str(round((index_first_failure/summary.sent_received_chunks) * 100, 2)) + "%")
+		# print("- Successfully transmitted Message: " + str(round(100 - ((failures/summary.sent_received_chunks) * 100), 2)) + "%")
+		print('##################### ANALYSIS RECEIVED DATA #####################')
+		print('')
+
+	def process_command_line(argv):
+		'''
+		Parses the command line arguments for the Covert Channel and returns the settings to run the specific covert channel.
+		'''
+		parser = helper.get_channel_option_parser()
+
+		parser.add_option(
+		'-n',
+		'--stegopackets',
+		help='specify the number of packets which shall be exfiltrated: number > 0',
+		action='callback',
+		callback=helper.get_comma_separated_args,
+		type='string',
+		dest='stegopackets')
+
+		parser.add_option(
+		'-e',
+		'--fields',
+		help='specify the comma separated fields carrying each chunk, the first one holding its most significant bits: {fl|tc|dscp|hl} (default: fl,dscp,hl)',
+		default=['fl', 'dscp', 'hl'],
+		action='callback',
+		callback=helper.get_comma_separated_args,
+		type='string',
+		dest='fields')
+
+		settings, args = parser.parse_args(argv)
+
+		helper.check_channel_options(settings)
+
+		settings.stegopackets = [int(x) for x in settings.stegopackets]
+
+		if any(n < 1 for n in settings.stegopackets):
+			raise ValueError("The List of numbers contains at least one element < 1!")
+
+		if not settings.stegopackets:
+			raise ValueError("The List of numbers which shall be exfiltrated needs at least one positive element!")
+
+		if any(x not in header_codec.COMPOSITE_FIELD_ABBREVIATIONS for x in settings.fields):
+			raise ValueError("ValueError: the fields can be only fl, tc, dscp or hl!")
+		settings.fields = [header_codec.COMPOSITE_FIELD_ABBREVIATIONS[x] for x in settings.fields]
+
+		return settings, args
+
+	def __str__(self):
+		return str(self.__dict__)
+
+
+if __name__ == "__main__":
+
+	settings, args = Composite_CC.process_command_line(sys.argv)
+
+	codec = header_codec.Composite_Codec(settings.fields)
+	composite_cc = Composite_CC(settings.filepath, helper.Chunk_Source(settings.filepath, codec.field_length_in_bits, settings.stegopackets[0]), settings.stegopackets, settings.role, settings.consecutive_nonstego, settings.consecutive_stego, codec, helper.get_channel_options(settings))
+
+	if composite_cc.role == "sender":
+		helper.append_ip6tables_rule(sender=True, queues=settings.queues, matches=settings.matches)
+	else:
+		if settings.capture is None:
+			helper.append_ip6tables_rule(sender=False, queues=settings.queues, matches=settings.matches)
+
+	composite_cc.print_start_message()
+	
+	if composite_cc.role == "sender":
+		composite_cc.start_sending()
+	else:
+		composite_cc.start_receiving()
+	
+	if composite_cc.role == "sender":
+		helper.delete_ip6tables_rule(sender=True)
+	else:
+		helper.delete_ip6tables_rule(sender=False)
+
+
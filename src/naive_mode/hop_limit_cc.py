@@ -1,27 +1,27 @@
 from netfilterqueue import NetfilterQueue
-from scapy.all import *
-import optparse
 import sys
 import time
-import csv
-from pathlib import Path
 sys.path.insert(1, '../')
 import helper
-
-def get_comma_separated_args(option, opt, value, parser):
-	setattr(parser.values, option.dest, value.split(','))
+import header_codec
+import reporting
+import multi_queue
+import async_queue
+import packet_capture
+import flow_sessions
 
 class Hop_Limit_CC:
 
-	def __init__(self, filepath, chunks, stegopackets, role, consecutive_nonstego, consecutive_stego):
+	def __init__(self, filepath, chunks, stegopackets, role, consecutive_nonstego, consecutive_stego, options=helper.Channel_Options()):
 		'''
 		Constructor for sender and receiver of a Hop Limit cc.
 		:param filepath: The path to the message to hide. 
-		:param chunks: A string list containing the message to hide splitted in chunks.
+		:param chunks: A helper.Chunk_Source of integers containing the message to hide splitted in chunks.
 		:param stegopackets: Number of stego packets to consider.
 		:param role: The role (i.e., sender or receiver) assigned.
 		:param consecutive_nonstego: The length of the burst of non-stego packets.
 		:param consecutive_stego: The lenght of the burst of stego packets
+		:param options: The helper.Channel_Options of the queue, the signatures, the covert sessions and the codec.
 		'''
 		self.chunks = chunks 				
 		self.stegopackets = stegopackets
@@ -36,11 +36,25 @@ class Hop_Limit_CC:
 
 		self.number_of_repetitions = 20
 		self.number_of_repetitions_done = 0
-		self.hoplimit_delta = 20
+		self.hop_limit_codec = header_codec.Hop_Limit_Codec(options.hop_limit_levels, baseline=options.hop_limit_baseline)
+		self.hop_limit_calibration = None
+		if role == "receiver" and options.calibration_window > 0:
+			self.hop_limit_calibration = helper.Hop_Limit_Calibration(self.hop_limit_codec, options.calibration_window)
 
 		self.sent_received_chunks = 0
-		self.nfqueue = NetfilterQueue()	
+		if options.queues > 1:
+			self.nfqueue = multi_queue.Queue_Workers(self, options.queues)
+		elif options.event_loop:
+			self.nfqueue = async_queue.Async_Queue(self, options.control_port)
+		elif options.capture is not None:
+			self.nfqueue = packet_capture.Packet_Capture(options.capture)
+		else:
+			self.nfqueue = NetfilterQueue()
+		if options.flows > 0 or options.queues > 1:
+			self.nfqueue = flow_sessions.Flow_Sessions(self, self.nfqueue, options.flows or flow_sessions.DEFAULT_MAX_FLOWS, options.idle_timeout)
 		self.exfiltrated_data = []
+		self.errors = helper.Error_Accumulator(self.chunks)
+		self.reporter = reporting.Reporter()
 
 		# ------------------- MEASUREMENT VARIABLES ------------------- #
 		self.starttime_stegocommunication = 0.0
@@ -56,20 +70,16 @@ class Hop_Limit_CC:
 	   	'''
 		if self.number_of_repetitions_done < self.number_of_repetitions: 
 			tmp1 = time.perf_counter()
-			pkt = IPv6(packet.get_payload())
 			if self.sent_received_chunks < self.stegopackets[self.actual_number]:
 
 				if self.sent_received_chunks == 0:
 					self.starttime_stegocommunication = time.perf_counter()
 
 				if self.stegotime:
+					pkt = bytearray(packet.get_payload())
 
-					if self.chunks[self.sent_received_chunks] == '1':
-						pkt.hlim += self.hoplimit_delta
-						self.exfiltrated_data.append('1')
-					else:
-						pkt.hlim -= self.hoplimit_delta
-						self.exfiltrated_data.append('0')
+					self.hop_limit_codec.set(pkt, self.chunks[self.sent_received_chunks])
+					self.exfiltrated_data.append(self.chunks[self.sent_received_chunks])
 					
 					packet.set_payload(bytes(pkt))
 					
@@ -87,8 +97,12 @@ class Hop_Limit_CC:
 				self.stegotime = True
 				self.injection_exfiltration_time_sum += time.perf_counter() - tmp1
 				self.number_of_repetitions_done += 1
-				self.statistical_evaluation_sent_packets()
-				self.write_csv()
+				summary = reporting.get_repetition_summary(self)
+				self.reporter.submit(self.statistical_evaluation_sent_packets, summary)
+				self.reporter.submit(self.write_csv, summary)
+				# All the repetitions are done: the kernel can stop queueing the packets
+				if self.number_of_repetitions_done == self.number_of_repetitions and self.actual_number == len(self.stegopackets) - 1:
+					self.reporter.submit(helper.delete_ip6tables_rule, True)
 				self.injection_exfiltration_time_sum = 0
 				self.sent_received_chunks = 0
 				self.exfiltrated_data = []
@@ -99,8 +113,8 @@ class Hop_Limit_CC:
 			
 			if self.actual_number < len(self.stegopackets) - 1:
 				self.actual_number += 1
-				self.chunks = helper.read_binary_file_for_n_packets_and_return_chunks(self.filepath, self.stegopackets[self.actual_number], 1)
-				self.print_start_message()
+				self.chunks.set_length(self.stegopackets[self.actual_number])
+				self.reporter.submit(self.print_start_message)
 				self.number_of_repetitions_done = 0
 
 		packet.accept()
@@ -115,23 +129,26 @@ class Hop_Limit_CC:
 	   	'''
 		if self.number_of_repetitions_done < self.number_of_repetitions: 
 			tmp1 = time.perf_counter()		
-			pkt = IPv6(packet.get_payload())
 			if self.sent_received_chunks < self.stegopackets[self.actual_number]:
 
 				if self.sent_received_chunks == 0:
 					self.starttime_stegocommunication = time.perf_counter()
 
 				if self.stegotime:
-					if pkt.hlim > 64:
-						self.exfiltrated_data.append('1')
-					else:
-						self.exfiltrated_data.append('0')
+					pkt = packet.get_payload()
+					value = self.hop_limit_codec.get(pkt)
+					self.exfiltrated_data.append(value)
+					self.errors.add(value)
+					if self.hop_limit_calibration is not None:
+						self.hop_limit_calibration.add_stego(header_codec.get_hop_limit(pkt))
 					
 					self.sent_received_chunks += 1
 
 					if self.consecutive_stego > 0:
 						self.stegotime = self.sent_received_chunks % self.consecutive_stego != 0
 				else:
+					if self.hop_limit_calibration is not None:
+						self.hop_limit_calibration.add(header_codec.get_hop_limit(packet.get_payload()))
 					self.clean_counter += 1
 					self.stegotime = self.clean_counter % self.consecutive_nonstego == 0
 			else:
@@ -140,11 +157,16 @@ class Hop_Limit_CC:
 				self.stegotime = True
 				self.injection_exfiltration_time_sum += time.perf_counter() - tmp1
 				self.number_of_repetitions_done += 1
-				self.statistical_evaluation_received_packets()
-				self.write_csv()
+				summary = reporting.get_repetition_summary(self)
+				self.reporter.submit(self.statistical_evaluation_received_packets, summary)
+				self.reporter.submit(self.write_csv, summary)
+				# All the repetitions are done: the kernel can stop queueing the packets
+				if self.number_of_repetitions_done == self.number_of_repetitions and self.actual_number == len(self.stegopackets) - 1:
+					self.reporter.submit(helper.delete_ip6tables_rule, False)
 				self.injection_exfiltration_time_sum = 0
 				self.sent_received_chunks = 0
 				self.exfiltrated_data = []
+				self.errors.reset()
 				# time.sleep(1)
 
 			if self.sent_received_chunks != 0:
@@ -154,83 +176,38 @@ class Hop_Limit_CC:
 
 			if self.actual_number < len(self.stegopackets) - 1:
 				self.actual_number += 1
-				self.chunks = helper.read_binary_file_for_n_packets_and_return_chunks(self.filepath, self.stegopackets[self.actual_number], 1)
-				self.print_start_message()
+				self.chunks.set_length(self.stegopackets[self.actual_number])
+				self.reporter.submit(self.print_start_message)
 				self.number_of_repetitions_done = 0
 
 		packet.accept()
 	
-	def write_csv(self):
+	def write_csv(self, summary):
 		
-		filename="hop_limit_cc_" + self.filepath.replace("../", "", 1) + "_stegopackets_" + str(self.stegopackets[self.actual_number]) + "_role_" + self.role + "_clean_packets_" + str(self.consecutive_nonstego) + "_number_stegopackets_" + str(self.consecutive_stego) + ".csv"
-		csv_file = Path(filename)
-		file_existed=csv_file.is_file()
-
-		with open(filename, 'a', newline='') as file:
-			writer = csv.writer(file)
-
-			if not file_existed:
-				if self.role == 'sender':
-					writer.writerow(["Sent Chunks (Packets)", "Duration of Stegocommunication (ms)", "Average Injection Time (ms)", "Bandwidth (bits/s)"])
-				else:
-					writer.writerow(["Received Chunks (Packets)", "Duration of Stegocommunication (ms)", "Average Exfiltration Time (ms)", "Bandwith (bits/s)", "Failures", "Error Rate (Failures/Packet)", "Successfully transmitted Message (%)"])
-			
-			if self.role == 'sender':
-				writer.writerow([self.sent_received_chunks, \
-					round((self.endtime_stegocommunication - self.starttime_stegocommunication) * 1000, 2), \
-					round((self.injection_exfiltration_time_sum / self.sent_received_chunks) * 1000, 2), \
-					round(self.sent_received_chunks / (self.endtime_stegocommunication - self.starttime_stegocommunication), 2)])  			
-			else:
+		filename="hop_limit_cc_" + self.filepath.replace("../", "", 1) + "_stegopackets_" + str(self.stegopackets[summary.actual_number]) + "_role_" + self.role + "_clean_packets_" + str(self.consecutive_nonstego) + "_number_stegopackets_" + str(self.consecutive_stego) + ".csv"
+		if self.role == 'sender':
+			writer = self.reporter.get_csv_writer(filename, ["Sent Chunks (Packets)", "Duration of Stegocommunication (ms)", "Average Injection Time (ms)", "Bandwidth (bits/s)"])
+		else:
+			writer = self.reporter.get_csv_writer(filename, ["Received Chunks (Packets)", "Duration of Stegocommunication (ms)", "Average Exfiltration Time (ms)", "Bandwith (bits/s)", "Failures", "Error Rate (Failures/Packet)", "Successfully transmitted Message (%)"])
+		
+		if self.role == 'sender':
+			writer.writerow([summary.sent_received_chunks, \
+				round((summary.endtime_stegocommunication - summary.starttime_stegocommunication) * 1000, 2), \
+				round((summary.injection_exfiltration_time_sum / summary.sent_received_chunks) * 1000, 2), \
+				round(self.hop_limit_codec.bits * summary.sent_received_chunks / (summary.endtime_stegocommunication - summary.starttime_stegocommunication), 2)])  			
+		else:
 
-				failures = 0
-				index_first_failure = -1 
+			failures = summary.failures
+			index_first_failure = summary.index_first_failure
 
-				# Count the failures
-				if len(self.exfiltrated_data) <= len(self.chunks):
-					for x in range(len(self.exfiltrated_data)):
-						if self.exfiltrated_data[x] != self.chunks[x]:
-							failures += 1
-				else:
-					for x in range(len(self.chunks)):
-						if self.exfiltrated_data[x] != self.chunks[x]:
-							failures += 1
-				failures += abs(len(self.exfiltrated_data) - len(self.chunks))
-
-				if failures != 0:
-					# Receive less than expected => first failure can happen in the middle or after the last index
-					if len(self.exfiltrated_data) < len(self.chunks):
-						for x in range(len(self.exfiltrated_data)):
-							if self.exfiltrated_data[x] != self.chunks[x]:
-								index_first_failure = x
-								break
-						if index_first_failure == -1:
-							index_first_failure = len(self.exfiltrated_data)
-					# Receive exactly the amount which is expected => index must be in the middle
-					elif len(self.exfiltrated_data) == len(self.chunks):
-						for x in range(len(self.chunks)):
-							if self.exfiltrated_data[x] != self.chunks[x]:
-								index_first_failure = x
-								break
-					else:
-					# Receive more than expected => first failure can happen in the middle or after the last index
-						for x in range(len(self.chunks)):
-							if self.exfiltrated_data[x] != self.chunks[x]:
-								index_first_failure = x
-								break
-						if index_first_failure == -1:
-							index_first_failure = len(self.chunks)
-
-				if index_first_failure == -1:
-					index_first_failure = self.sent_received_chunks
-
-				writer.writerow([self.sent_received_chunks, \
-					round((self.endtime_stegocommunication - self.starttime_stegocommunication) * 1000, 2), \
-					round((self.injection_exfiltration_time_sum / self.sent_received_chunks) * 1000, 2), \
-					round(self.sent_received_chunks / (self.endtime_stegocommunication - self.starttime_stegocommunication), 2), \
-					failures, \
-					round(failures/self.sent_received_chunks, 2), \
-					# round(100 - ((failures/self.sent_received_chunks) * 100), 2)])
-					round((index_first_failure/self.sent_received_chunks) * 100, 2)])
+			writer.writerow([summary.sent_received_chunks, \
+				round((summary.endtime_stegocommunication - summary.starttime_stegocommunication) * 1000, 2), \
+				round((summary.injection_exfiltration_time_sum / summary.sent_received_chunks) * 1000, 2), \
+				round(self.hop_limit_codec.bits * summary.sent_received_chunks / (summary.endtime_stegocommunication - summary.starttime_stegocommunication), 2), \
+				failures, \
+				round(failures/summary.sent_received_chunks, 2), \
+				# round(100 - ((failures/summary.sent_received_chunks) * 100), 2)])
+				round((index_first_failure/summary.sent_received_chunks) * 100, 2)])
 
 
 	def start_sending(self):
@@ -245,18 +222,20 @@ class Hop_Limit_CC:
 		except KeyboardInterrupt:
 			print("The exfiltration is stopped.")
 		self.nfqueue.unbind()
+		self.reporter.close()
 
 	def start_receiving(self):
 		'''
 	   	Binds the exfiltrate method to the netfilter queue with its specific number and runs the callback function. 
 	   	If the user press Ctrl + c the inject method is unbind.  
 	   	'''
-		self.nfqueue.bind(helper.NETFILTER_QUEUE_NUMBER, self.exfiltrate)
+		self.nfqueue.bind(helper.NETFILTER_QUEUE_NUMBER, self.exfiltrate, range=helper.HEADER_COPY_RANGE)
 		try:
 			self.nfqueue.run()
 		except KeyboardInterrupt:
 			print("The exfiltration is stopped.")
 		self.nfqueue.unbind()
+		self.reporter.close()
 
 
 	def print_start_message(self):
@@ -266,7 +245,12 @@ class Hop_Limit_CC:
 		else:
 			print('########## Mode: Naive Mode | CC: Hop Limit | Side: Covert Receiver ##########')
 		print('- Number of Repetitions: ' + str(self.number_of_repetitions))		
+		if isinstance(self.nfqueue, flow_sessions.Flow_Sessions):
+			print('- Flow Sessions: up to ' + str(self.nfqueue.max_flows) + ' (idle timeout: ' + str(self.nfqueue.idle_timeout) + ' s)')
 		print('- Exfiltrated File: ' + self.filepath)
+		print('- Hop Limit Levels: ' + str(self.hop_limit_codec.levels) + ' (' + str(self.hop_limit_codec.bits) + ' bits per stego-packet, offsets: ' + ', '.join(str(x) for x in self.hop_limit_codec.level_offsets) + ')')
+		if self.role == "receiver":
+			print('- Hop Limit Baseline: ' + str(self.hop_limit_codec.baseline) + (' (learnt from the last ' + str(self.hop_limit_calibration.window) + ' packets)' if self.hop_limit_calibration is not None else ' (fixed)'))
 		if self.consecutive_nonstego > 0 and self.consecutive_stego > 0:
 			buf = ""
 			for x in range(2):
@@ -291,73 +275,37 @@ class Hop_Limit_CC:
 			print('Stop exfiltration with CTRL+C...')
 		print('')
 
-	def statistical_evaluation_sent_packets(self):
+	def statistical_evaluation_sent_packets(self, summary):
 		
 		print('')
 		print('##################### ANALYSIS SENT DATA #####################')
-		print("- Number of Repetitions: " + str(self.number_of_repetitions_done) + "/" + str(self.number_of_repetitions))
-		print("- Sent stego-packets: " + str(self.sent_received_chunks) + "/" + str(self.stegopackets[self.actual_number]))
-		print("- Duration: " + str(round((self.endtime_stegocommunication - self.starttime_stegocommunication) * 1000, 2)) + " ms")
-		print("- Average Injection Time: " + str(round((self.injection_exfiltration_time_sum / self.sent_received_chunks) * 1000, 2)) + " ms")
-		print("- Average Bandwidth: " + str(round(self.sent_received_chunks / (self.endtime_stegocommunication - self.starttime_stegocommunication), 2)) + " bits/s")
+		print("- Number of Repetitions: " + str(summary.number_of_repetitions_done) + "/" + str(self.number_of_repetitions))
+		print("- Sent stego-packets: " + str(summary.sent_received_chunks) + "/" + str(self.stegopackets[summary.actual_number]))
+		print("- Duration: " + str(round((summary.endtime_stegocommunication - summary.starttime_stegocommunication) * 1000, 2)) + " ms")
+		print("- Average Injection Time: " + str(round((summary.injection_exfiltration_time_sum / summary.sent_received_chunks) * 1000, 2)) + " ms")
+		print("- Average Bandwidth: " + str(round(self.hop_limit_codec.bits * summary.sent_received_chunks / (summary.endtime_stegocommunication - summary.starttime_stegocommunication), 2)) + " bits/s")
 		#print("- Injected data == Chunks: " + str(self.exfiltrated_data == self.chunks))
 		print('##################### ANALYSIS SENT DATA #####################')
 		print('')
 
-	def statistical_evaluation_received_packets(self):
+	def statistical_evaluation_received_packets(self, summary):
 		
-		failures = 0
-		index_first_failure = -1 
-
-		# Count the failures
-		if len(self.exfiltrated_data) <= len(self.chunks):
-			for x in range(len(self.exfiltrated_data)):
-				if self.exfiltrated_data[x] != self.chunks[x]:
-					failures += 1
-		else:
-			for x in range(len(self.chunks)):
-				if self.exfiltrated_data[x] != self.chunks[x]:
-					failures += 1
-		failures += abs(len(self.exfiltrated_data) - len(self.chunks))
-
-		if failures != 0:
-			# Receive less than expected => first failure can happen in the middle or after the last index
-			if len(self.exfiltrated_data) < len(self.chunks):
-				for x in range(len(self.exfiltrated_data)):
-					if self.exfiltrated_data[x] != self.chunks[x]:
-						index_first_failure = x
-						break
-				if index_first_failure == -1:
-					index_first_failure = len(self.exfiltrated_data)
-			# Receive exactly the amount which is expected => index must be in the middle
-			elif len(self.exfiltrated_data) == len(self.chunks):
-				for x in range(len(self.chunks)):
-					if self.exfiltrated_data[x] != self.chunks[x]:
-						index_first_failure = x
-						break
-			else:
-			# Receive more than expected => first failure can happen in the middle or after the last index
-				for x in range(len(self.chunks)):
-					if self.exfiltrated_data[x] != self.chunks[x]:
-						index_first_failure = x
-						break
-				if index_first_failure == -1:
-					index_first_failure = len(self.chunks)
-
-		if index_first_failure == -1:
-			index_first_failure = self.sent_received_chunks
+		failures = summary.failures
+		index_first_failure = summary.index_first_failure
 
 		print('')
 		print('##################### ANALYSIS RECEIVED DATA #####################')
-		print("- Number of Repetitions: " + str(self.number_of_repetitions_done) + "/" + str(self.number_of_repetitions))
-		print("- Received stego-packets: " + str(self.sent_received_chunks) + "/" + str(self.stegopackets[self.actual_number]))
-		print("- Duration: " + str(round((self.endtime_stegocommunication - self.starttime_stegocommunication) * 1000, 2)) + " ms")
-		print("- Average Exfiltration Time: " + str(round((self.injection_exfiltration_time_sum / self.sent_received_chunks) * 1000, 2)) + " ms")
-		print("- Average Bandwidth: " + str(round(self.sent_received_chunks / (self.endtime_stegocommunication - self.starttime_stegocommunication), 2)) + " bits/s")
+		print("- Number of Repetitions: " + str(summary.number_of_repetitions_done) + "/" + str(self.number_of_repetitions))
+		print("- Received stego-packets: " + str(summary.sent_received_chunks) + "/" + str(self.stegopackets[summary.actual_number]))
+		print("- Duration: " + str(round((summary.endtime_stegocommunication - summary.starttime_stegocommunication) * 1000, 2)) + " ms")
+		print("- Average Exfiltration Time: " + str(round((summary.injection_exfiltration_time_sum / summary.sent_received_chunks) * 1000, 2)) + " ms")
+		print("- Average Bandwidth: " + str(round(self.hop_limit_codec.bits * summary.sent_received_chunks / (summary.endtime_stegocommunication - summary.starttime_stegocommunication), 2)) + " bits/s")
 		#print("- Exfiltrated data == Chunks: " + str(self.exfiltrated_data == self.chunks) + " (" + str(failures) + " Failures)")
-		print("- Error Rate: " + str(round(failures/self.sent_received_chunks, 2)) + " Failures/Packet")
-		#print("- Successfully transmitted Message: " + str(round((index_first_failure/self.sent_received_chunks) * 100, 2)) + "%")
-		# print("- Successfully transmitted Message: " + str(round(100 - ((failures/self.sent_received_chunks) * 100), 2)) + "%")
+		print("- Error Rate: " + str(round(failures/summary.sent_received_chunks, 2)) + " Failures/Packet")
+		print("- Bit Errors: " + str(summary.bit_errors))
+		print("- Hop Limit Baseline: " + str(summary.hop_limit_baseline) + " (" + str(helper.get_hop_count(summary.hop_limit_baseline)) + " hops, " + str(summary.hop_limit_recalibrations) + " recalibrations)")
+		#print("- Successfully transmitted Message: " + str(round((index_first_failure/summary.sent_received_chunks) * 100, 2)) + "%")
+		# print("- Successfully transmitted Message: " + str(round(100 - ((failures/summary.sent_received_chunks) * 100), 2)) + "%")
 		print('##################### ANALYSIS RECEIVED DATA #####################')
 		print('')
 
@@ -365,53 +313,48 @@ class Hop_Limit_CC:
 		'''
 		Parses the command line arguments for the Covert Channel and returns the settings to run the specific covert channel.
 		'''
-		parser = optparse.OptionParser()
-
-		parser.add_option(
-		'-r',
-		'--role',
-		help='specify the sender or the receiving role of the script: {sender|receiver}',
-		action='store',
-		type='string',
-		dest='role')
+		parser = helper.get_channel_option_parser()
 
 		parser.add_option(
 		'-n',
 		'--stegopackets',
 		help='specify the number of packets which shall be exfiltrated: number > 0',
 		action='callback',
-		callback=get_comma_separated_args,
+		callback=helper.get_comma_separated_args,
 		type='string',
 		dest='stegopackets')
 
 		parser.add_option(
-		'-f',
-		'--file',
-		help='specify the file which shall be read and exfiltrated',
+		'-v',
+		'--levels',
+		help='specify the number of hop limit levels, a power of 2: each stego-packet carries log2(levels) bits (default: 2)',
+		default=2,
 		action='store',
-		type='string',
-		dest='filepath')
+		type='int',
+		dest='levels')
 
 		parser.add_option(
-		'-p',
-		'--consecutive_nonstego',
-		help='specify the number of clean packets inserted before/after stegopackets (default: 0)',
-		default=0,
+		'-x',
+		'--baseline',
+		help='specify the hop limit of the clean packets at the receiver, until it is learnt from the flow (default: ' + str(header_codec.DEFAULT_HOP_LIMIT_BASELINE) + ')',
+		default=header_codec.DEFAULT_HOP_LIMIT_BASELINE,
 		action='store',
 		type='int',
-		dest='consecutive_nonstego')
+		dest='baseline')
 
 		parser.add_option(
-		'-l',
-		'--consecutive_stego',
-		help='specify the burst length of stegopackets (default: 0)',
-		default=0,
+		'-u',
+		'--calibration_window',
+		help='specify the number of the last packets from which the receiver learns the hop limit baseline (default: ' + str(helper.DEFAULT_HOP_LIMIT_CALIBRATION_WINDOW) + ', 0: fixed baseline)',
+		default=helper.DEFAULT_HOP_LIMIT_CALIBRATION_WINDOW,
 		action='store',
 		type='int',
-		dest='consecutive_stego')
+		dest='calibration_window')
 
 		settings, args = parser.parse_args(argv)
-		
+
+		helper.check_channel_options(settings)
+
 		settings.stegopackets = [int(x) for x in settings.stegopackets]
 
 		if any(n < 1 for n in settings.stegopackets):
@@ -420,17 +363,15 @@ class Hop_Limit_CC:
 		if not settings.stegopackets:
 			raise ValueError("The List of numbers which shall be exfiltrated needs at least one positive element!")
 
-		if settings.filepath is None:
-			raise ValueError("ValueError: filepath must be specified!")
+		if settings.levels < 2 or settings.levels & (settings.levels - 1):
+			raise ValueError("ValueError: the number of hop limit levels must be a power of 2!")
 
-		if settings.role not in ["sender", "receiver"]:
-			raise ValueError("ValueError: role can be only sender or receiver!")
+		if settings.baseline < 1 or settings.baseline > 255:
+			raise ValueError("ValueError: the hop limit baseline must be between 1 and 255!")
+
+		if settings.calibration_window < 0:
+			raise ValueError("ValueError: the calibration window cannot be negative!")
 
-		if settings.consecutive_nonstego != 0 and settings.consecutive_stego == 0 or settings.consecutive_nonstego == 0 and settings.consecutive_stego != 0:
-			print("settings.consecutive_nonstego and settings.consecutive_stego are set to 0!")
-			settings.consecutive_nonstego = 0
-			settings.consecutive_stego = 0
-		
 		return settings, args
 
 	def __str__(self):
@@ -441,12 +382,13 @@ if __name__ == "__main__":
 
 	settings, args = Hop_Limit_CC.process_command_line(sys.argv)
 
-	hop_limit_cc = Hop_Limit_CC(settings.filepath, helper.read_binary_file_for_n_packets_and_return_chunks(settings.filepath, settings.stegopackets[0], 1), settings.stegopackets, settings.role, settings.consecutive_nonstego, settings.consecutive_stego)
+	hop_limit_cc = Hop_Limit_CC(settings.filepath, helper.Chunk_Source(settings.filepath, settings.levels.bit_length() - 1, settings.stegopackets[0]), settings.stegopackets, settings.role, settings.consecutive_nonstego, settings.consecutive_stego, helper.get_channel_options(settings))
 
 	if hop_limit_cc.role == "sender":
-		helper.append_ip6tables_rule(sender=True)
+		helper.append_ip6tables_rule(sender=True, queues=settings.queues, matches=settings.matches)
 	else:
-		helper.append_ip6tables_rule(sender=False)
+		if settings.capture is None:
+			helper.append_ip6tables_rule(sender=False, queues=settings.queues, matches=settings.matches)
 
 	hop_limit_cc.print_start_message()
 	
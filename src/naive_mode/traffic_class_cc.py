@@ -1,30 +1,29 @@
 from netfilterqueue import NetfilterQueue
-from scapy.all import *
-import optparse
 import sys
 import time
-import csv
-from pathlib import Path
 sys.path.insert(1, '../')
 import helper
-
-def get_comma_separated_args(option, opt, value, parser):
-	setattr(parser.values, option.dest, value.split(','))
+import header_codec
+import reporting
+import multi_queue
+import async_queue
+import packet_capture
+import flow_sessions
 
 class Traffic_Class_CC:
 
-	def __init__(self, filepath, chunks, stegopackets, role, consecutive_nonstego, consecutive_stego):
+	def __init__(self, filepath, chunks, stegopackets, role, consecutive_nonstego, consecutive_stego, options=helper.Channel_Options()):
 		'''
 		Constructor for sender and receiver of a Traffic Class cc.
 		:param filepath: The path to the message to hide. 
-		:param chunks: A string list containing the message to hide splitted in chunks.
+		:param chunks: A helper.Chunk_Source of integers containing the message to hide splitted in chunks.
 		:param stegopackets: Number of stego packets to consider.
 		:param role: The role (i.e., sender or receiver) assigned.
 		:param consecutive_nonstego: The length of the burst of non-stego packets.
 		:param consecutive_stego: The lenght of the burst of stego packets
+		:param options: The helper.Channel_Options of the queue, the signatures, the covert sessions and the codec.
 		'''
 		self.chunks = chunks
-		self.int_chunks = [int(x,2) for x in self.chunks] 				
 		self.stegopackets = stegopackets
 		self.actual_number = 0
 		self.role = role
@@ -39,8 +38,19 @@ class Traffic_Class_CC:
 		self.number_of_repetitions_done = 0
 
 		self.sent_received_chunks = 0
-		self.nfqueue = NetfilterQueue()
+		if options.queues > 1:
+			self.nfqueue = multi_queue.Queue_Workers(self, options.queues)
+		elif options.event_loop:
+			self.nfqueue = async_queue.Async_Queue(self, options.control_port)
+		elif options.capture is not None:
+			self.nfqueue = packet_capture.Packet_Capture(options.capture)
+		else:
+			self.nfqueue = NetfilterQueue()
+		if options.flows > 0 or options.queues > 1:
+			self.nfqueue = flow_sessions.Flow_Sessions(self, self.nfqueue, options.flows or flow_sessions.DEFAULT_MAX_FLOWS, options.idle_timeout)
 		self.exfiltrated_data = []
+		self.errors = helper.Error_Accumulator(self.chunks)
+		self.reporter = reporting.Reporter()
 
 		# ------------------- MEASUREMENT VARIABLES ------------------- #
 		self.starttime_stegocommunication = 0.0
@@ -56,15 +66,15 @@ class Traffic_Class_CC:
 	   	'''
 		if self.number_of_repetitions_done < self.number_of_repetitions: 
 			tmp1 = time.perf_counter()
-			pkt = IPv6(packet.get_payload())
 			if self.sent_received_chunks < self.stegopackets[self.actual_number]:
 				
 				if self.sent_received_chunks == 0:
 					self.starttime_stegocommunication = time.perf_counter()
 
 				if self.stegotime:
-					pkt.tc = int(self.chunks[self.sent_received_chunks], 2)
-					self.exfiltrated_data.append(pkt.tc)
+					pkt = bytearray(packet.get_payload())
+					header_codec.set_traffic_class(pkt, self.chunks[self.sent_received_chunks])
+					self.exfiltrated_data.append(header_codec.get_traffic_class(pkt))
 					packet.set_payload(bytes(pkt))
 
 					self.sent_received_chunks += 1
@@ -81,8 +91,12 @@ class Traffic_Class_CC:
 				self.stegotime = True
 				self.injection_exfiltration_time_sum += time.perf_counter() - tmp1
 				self.number_of_repetitions_done += 1
-				self.statistical_evaluation_sent_packets()
-				self.write_csv()
+				summary = reporting.get_repetition_summary(self)
+				self.reporter.submit(self.statistical_evaluation_sent_packets, summary)
+				self.reporter.submit(self.write_csv, summary)
+				# All the repetitions are done: the kernel can stop queueing the packets
+				if self.number_of_repetitions_done == self.number_of_repetitions and self.actual_number == len(self.stegopackets) - 1:
+					self.reporter.submit(helper.delete_ip6tables_rule, True)
 				self.injection_exfiltration_time_sum = 0
 				self.sent_received_chunks = 0
 				self.stegotime = True
@@ -95,9 +109,8 @@ class Traffic_Class_CC:
 			
 			if self.actual_number < len(self.stegopackets) - 1:
 				self.actual_number += 1
-				self.chunks = helper.read_binary_file_for_n_packets_and_return_chunks(self.filepath, self.stegopackets[self.actual_number], helper.IPv6_HEADER_FIELD_LENGTHS_IN_BITS["Traffic Class"])
-				self.int_chunks = [int(x,2) for x in self.chunks] 				
-				self.print_start_message()
+				self.chunks.set_length(self.stegopackets[self.actual_number])
+				self.reporter.submit(self.print_start_message)
 				self.number_of_repetitions_done = 0
 			
 		packet.accept()
@@ -111,14 +124,15 @@ class Traffic_Class_CC:
 	   	'''
 		if self.number_of_repetitions_done < self.number_of_repetitions: 
 			tmp1 = time.perf_counter()		
-			pkt = IPv6(packet.get_payload())
 			if self.sent_received_chunks < self.stegopackets[self.actual_number]:
 				
 				if self.sent_received_chunks == 0:
 					self.starttime_stegocommunication = time.perf_counter()
 
 				if self.stegotime:
-					self.exfiltrated_data.append(pkt.tc)
+					pkt = packet.get_payload()
+					self.exfiltrated_data.append(header_codec.get_traffic_class(pkt))
+					self.errors.add(self.exfiltrated_data[-1])
 
 					self.sent_received_chunks += 1
 
@@ -133,11 +147,16 @@ class Traffic_Class_CC:
 				self.stegotime = True
 				self.injection_exfiltration_time_sum += time.perf_counter() - tmp1
 				self.number_of_repetitions_done += 1
-				self.statistical_evaluation_received_packets()
-				self.write_csv()
+				summary = reporting.get_repetition_summary(self)
+				self.reporter.submit(self.statistical_evaluation_received_packets, summary)
+				self.reporter.submit(self.write_csv, summary)
+				# All the repetitions are done: the kernel can stop queueing the packets
+				if self.number_of_repetitions_done == self.number_of_repetitions and self.actual_number == len(self.stegopackets) - 1:
+					self.reporter.submit(helper.delete_ip6tables_rule, False)
 				self.injection_exfiltration_time_sum = 0
 				self.sent_received_chunks = 0
 				self.exfiltrated_data = []
+				self.errors.reset()
 
 			if self.sent_received_chunks != 0:
 				self.injection_exfiltration_time_sum += time.perf_counter() - tmp1
@@ -146,83 +165,37 @@ class Traffic_Class_CC:
 
 			if self.actual_number < len(self.stegopackets) - 1:
 				self.actual_number += 1
-				self.chunks = helper.read_binary_file_for_n_packets_and_return_chunks(self.filepath, self.stegopackets[self.actual_number], helper.IPv6_HEADER_FIELD_LENGTHS_IN_BITS["Traffic Class"])
-				self.int_chunks = [int(x,2) for x in self.chunks] 				
-				self.print_start_message()
+				self.chunks.set_length(self.stegopackets[self.actual_number])
+				self.reporter.submit(self.print_start_message)
 				self.number_of_repetitions_done = 0
 			
 		packet.accept()
 		
-	def write_csv(self):
+	def write_csv(self, summary):
 		
-		filename="traffic_class_cc_" + self.filepath.replace("../", "", 1) + "_stegopackets_" + str(self.stegopackets[self.actual_number]) + "_role_" + self.role + "_clean_packets_" + str(self.consecutive_nonstego) + "_number_stegopackets_" + str(self.consecutive_stego) + ".csv"
-		csv_file = Path(filename)
-		file_existed=csv_file.is_file()
-
-		with open(filename, 'a', newline='') as file:
-			writer = csv.writer(file)
+		filename="traffic_class_cc_" + self.filepath.replace("../", "", 1) + "_stegopackets_" + str(self.stegopackets[summary.actual_number]) + "_role_" + self.role + "_clean_packets_" + str(self.consecutive_nonstego) + "_number_stegopackets_" + str(self.consecutive_stego) + ".csv"
+		if self.role == 'sender':
+			writer = self.reporter.get_csv_writer(filename, ["Sent Chunks (Packets)", "Duration of Stegocommunication (ms)", "Average Injection Time (ms)", "Bandwidth (bits/s)"])
+		else:
+			writer = self.reporter.get_csv_writer(filename, ["Received Chunks (Packets)", "Duration of Stegocommunication (ms)", "Average Exfiltration Time (ms)", "Bandwith (bits/s)", "Failures", "Error Rate (Failures/Packet)", "Successfully transmitted Message (%)"])
+		
+		if self.role == 'sender':
+			writer.writerow([summary.sent_received_chunks, \
+				round((summary.endtime_stegocommunication - summary.starttime_stegocommunication) * 1000, 2), \
+				round((summary.injection_exfiltration_time_sum / summary.sent_received_chunks) * 1000, 2), \
+				round((helper.IPv6_HEADER_FIELD_LENGTHS_IN_BITS["Traffic Class"] * summary.sent_received_chunks) / (summary.endtime_stegocommunication - summary.starttime_stegocommunication), 2)])  			
+		else:
+			failures = summary.failures
+			index_first_failure = summary.index_first_failure
 
-			if not file_existed:
-				if self.role == 'sender':
-					writer.writerow(["Sent Chunks (Packets)", "Duration of Stegocommunication (ms)", "Average Injection Time (ms)", "Bandwidth (bits/s)"])
-				else:
-					writer.writerow(["Received Chunks (Packets)", "Duration of Stegocommunication (ms)", "Average Exfiltration Time (ms)", "Bandwith (bits/s)", "Failures", "Error Rate (Failures/Packet)", "Successfully transmitted Message (%)"])
-			
-			if self.role == 'sender':
-				writer.writerow([self.sent_received_chunks, \
-					round((self.endtime_stegocommunication - self.starttime_stegocommunication) * 1000, 2), \
-					round((self.injection_exfiltration_time_sum / self.sent_received_chunks) * 1000, 2), \
-					round((helper.IPv6_HEADER_FIELD_LENGTHS_IN_BITS["Traffic Class"] * self.sent_received_chunks) / (self.endtime_stegocommunication - self.starttime_stegocommunication), 2)])  			
-			else:
-				failures = 0
-				index_first_failure = -1 
-
-				# Count the failures
-				if len(self.exfiltrated_data) <= len(self.int_chunks):
-					for x in range(len(self.exfiltrated_data)):
-						if self.exfiltrated_data[x] != self.int_chunks[x]:
-							failures += 1
-				else:
-					for x in range(len(self.int_chunks)):
-						if self.exfiltrated_data[x] != self.int_chunks[x]:
-							failures += 1
-				failures += abs(len(self.exfiltrated_data) - len(self.int_chunks))
-
-				if failures != 0:
-					# Receive less than expected => first failure can happen in the middle or after the last index
-					if len(self.exfiltrated_data) < len(self.int_chunks):
-						for x in range(len(self.exfiltrated_data)):
-							if self.exfiltrated_data[x] != self.int_chunks[x]:
-								index_first_failure = x
-								break
-						if index_first_failure == -1:
-							index_first_failure = len(self.exfiltrated_data)
-					# Receive exactly the amount which is expected => index must be in the middle
-					elif len(self.exfiltrated_data) == len(self.int_chunks):
-						for x in range(len(self.int_chunks)):
-							if self.exfiltrated_data[x] != self.int_chunks[x]:
-								index_first_failure = x
-								break
-					else:
-					# Receive more than expected => first failure can happen in the middle or after the last index
-						for x in range(len(self.int_chunks)):
-							if self.exfiltrated_data[x] != self.int_chunks[x]:
-								index_first_failure = x
-								break
-						if index_first_failure == -1:
-							index_first_failure = len(self.int_chunks)
-
-				if index_first_failure == -1:
-					index_first_failure = self.sent_received_chunks
-
-				writer.writerow([self.sent_received_chunks, \
-					round((self.endtime_stegocommunication - self.starttime_stegocommunication) * 1000, 2), \
-					round((self.injection_exfiltration_time_sum / self.sent_received_chunks) * 1000, 2), \
-					round((helper.IPv6_HEADER_FIELD_LENGTHS_IN_BITS["Traffic Class"] * self.sent_received_chunks) / (self.endtime_stegocommunication - self.starttime_stegocommunication), 2), \
-					failures, \
-					round(failures/self.sent_received_chunks, 2), \
-					# round(100 - ((failures/self.sent_received_chunks) * 100), 2)])
-					round((index_first_failure/self.sent_received_chunks) * 100, 2)])
+			writer.writerow([summary.sent_received_chunks, \
+				round((summary.endtime_stegocommunication - summary.starttime_stegocommunication) * 1000, 2), \
+				round((summary.injection_exfiltration_time_sum / summary.sent_received_chunks) * 1000, 2), \
+				round((helper.IPv6_HEADER_FIELD_LENGTHS_IN_BITS["Traffic Class"] * summary.sent_received_chunks) / (summary.endtime_stegocommunication - summary.starttime_stegocommunication), 2), \
+				failures, \
+				round(failures/summary.sent_received_chunks, 2), \
+				# round(100 - ((failures/summary.sent_received_chunks) * 100), 2)])
+				round((index_first_failure/summary.sent_received_chunks) * 100, 2)])
 
 
 	def start_sending(self):
@@ -237,18 +210,20 @@ class Traffic_Class_CC:
 		except KeyboardInterrupt:
 			print("The exfiltration is stopped.")
 		self.nfqueue.unbind()
+		self.reporter.close()
 
 	def start_receiving(self):
 		'''
 		Binds the exfiltrate method to the netfilter queue with its specific number and runs the callback function. 
 		If the user press Ctrl + c the inject method is unbind.  
 		'''
-		self.nfqueue.bind(helper.NETFILTER_QUEUE_NUMBER, self.exfiltrate)
+		self.nfqueue.bind(helper.NETFILTER_QUEUE_NUMBER, self.exfiltrate, range=helper.HEADER_COPY_RANGE)
 		try:
 			self.nfqueue.run()
 		except KeyboardInterrupt:
 			print("The exfiltration is stopped.")
 		self.nfqueue.unbind()
+		self.reporter.close()
 
 
 	def print_start_message(self):
@@ -259,6 +234,8 @@ class Traffic_Class_CC:
 		else:
 			print('########## Mode: Naive Mode | CC: Traffic Class | Side: Covert Receiver ##########')
 		print('- Number of Repetitions: ' + str(self.number_of_repetitions))		
+		if isinstance(self.nfqueue, flow_sessions.Flow_Sessions):
+			print('- Flow Sessions: up to ' + str(self.nfqueue.max_flows) + ' (idle timeout: ' + str(self.nfqueue.idle_timeout) + ' s)')
 		print('- Exfiltrated File: ' + self.filepath)
 		if self.consecutive_nonstego > 0 and self.consecutive_stego > 0:
 			buf = ""
@@ -284,73 +261,36 @@ class Traffic_Class_CC:
 			print('Stop exfiltration with CTRL+C...')
 		print('')
 
-	def statistical_evaluation_sent_packets(self):
+	def statistical_evaluation_sent_packets(self, summary):
 		
 		print('')
 		print('##################### ANALYSIS SENT DATA #####################')
-		print("- Number of Repetitions: " + str(self.number_of_repetitions_done) + "/" + str(self.number_of_repetitions))
-		print("- Sent stego-packets: " + str(self.sent_received_chunks) + "/" + str(self.stegopackets[self.actual_number]))
-		print("- Duration: " + str(round((self.endtime_stegocommunication - self.starttime_stegocommunication) * 1000, 2)) + " ms")
-		print("- Average Injection Time: " + str(round((self.injection_exfiltration_time_sum / self.sent_received_chunks) * 1000, 2)) + " ms")
-		print("- Average Bandwidth: " + str(round((helper.IPv6_HEADER_FIELD_LENGTHS_IN_BITS["Traffic Class"] * self.sent_received_chunks) / (self.endtime_stegocommunication - self.starttime_stegocommunication), 2)) + " bits/s")
-		#print("- Injected data == Chunks: " + str(self.exfiltrated_data == self.int_chunks))
+		print("- Number of Repetitions: " + str(summary.number_of_repetitions_done) + "/" + str(self.number_of_repetitions))
+		print("- Sent stego-packets: " + str(summary.sent_received_chunks) + "/" + str(self.stegopackets[summary.actual_number]))
+		print("- Duration: " + str(round((summary.endtime_stegocommunication - summary.starttime_stegocommunication) * 1000, 2)) + " ms")
+		print("- Average Injection Time: " + str(round((summary.injection_exfiltration_time_sum / summary.sent_received_chunks) * 1000, 2)) + " ms")
+		print("- Average Bandwidth: " + str(round((helper.IPv6_HEADER_FIELD_LENGTHS_IN_BITS["Traffic Class"] * summary.sent_received_chunks) / (summary.endtime_stegocommunication - summary.starttime_stegocommunication), 2)) + " bits/s")
+		#print("- Injected data == Chunks: " + str(self.exfiltrated_data == self.chunks))
 		print('##################### ANALYSIS SENT DATA #####################')
 		print('')
 
-	def statistical_evaluation_received_packets(self):
+	def statistical_evaluation_received_packets(self, summary):
 		
-		failures = 0
-		index_first_failure = -1 
-
-		# Count the failures
-		if len(self.exfiltrated_data) <= len(self.int_chunks):
-			for x in range(len(self.exfiltrated_data)):
-				if self.exfiltrated_data[x] != self.int_chunks[x]:
-					failures += 1
-		else:
-			for x in range(len(self.int_chunks)):
-				if self.exfiltrated_data[x] != self.int_chunks[x]:
-					failures += 1
-		failures += abs(len(self.exfiltrated_data) - len(self.int_chunks))
-
-		if failures != 0:
-			# Receive less than expected => first failure can happen in the middle or after the last index
-			if len(self.exfiltrated_data) < len(self.int_chunks):
-				for x in range(len(self.exfiltrated_data)):
-					if self.exfiltrated_data[x] != self.int_chunks[x]:
-						index_first_failure = x
-						break
-				if index_first_failure == -1:
-					index_first_failure = len(self.exfiltrated_data)
-			# Receive exactly the amount which is expected => index must be in the middle
-			elif len(self.exfiltrated_data) == len(self.int_chunks):
-				for x in range(len(self.int_chunks)):
-					if self.exfiltrated_data[x] != self.int_chunks[x]:
-						index_first_failure = x
-						break
-			else:
-			# Receive more than expected => first failure can happen in the middle or after the last index
-				for x in range(len(self.int_chunks)):
-					if self.exfiltrated_data[x] != self.int_chunks[x]:
-						index_first_failure = x
-						break
-				if index_first_failure == -1:
-					index_first_failure = len(self.int_chunks)
-
-		if index_first_failure == -1:
-			index_first_failure = self.sent_received_chunks
+		failures = summary.failures
+		index_first_failure = summary.index_first_failure
 
 		print('')
 		print('##################### ANALYSIS RECEIVED DATA #####################')
-		print("- Number of Repetitions: " + str(self.number_of_repetitions_done) + "/" + str(self.number_of_repetitions))
-		print("- Received stego-packets: " + str(self.sent_received_chunks) + "/" + str(self.stegopackets[self.actual_number]))
-		print("- Duration: " + str(round((self.endtime_stegocommunication - self.starttime_stegocommunication) * 1000, 2)) + " ms")
-		print("- Average Exfiltration Time: " + str(round((self.injection_exfiltration_time_sum / self.sent_received_chunks) * 1000, 2)) + " ms")
-		print("- Average Bandwidth: " + str(round((helper.IPv6_HEADER_FIELD_LENGTHS_IN_BITS["Traffic Class"] * self.sent_received_chunks) / (self.endtime_stegocommunication - self.starttime_stegocommunication), 2)) + " bits/s")
-		#print("- Exfiltrated data == Chunks: " + str(self.exfiltrated_data == self.int_chunks) + " (" + str(failures) + " Failures)")
-		print("- Error Rate: " + str(round(failures/self.sent_received_chunks, 2)) + " Failures/Packet")
-		#print("- Successfully transmitted Message: " + str(round( (index_first_failure/self.sent_received_chunks) * 100, 2)) + "%")
-		# print("- Successfully transmitted Message: " + str(round(100 - ((failures/self.sent_received_chunks) * 100), 2)) + "%")
+		print("- Number of Repetitions: " + str(summary.number_of_repetitions_done) + "/" + str(self.number_of_repetitions))
+		print("- Received stego-packets: " + str(summary.sent_received_chunks) + "/" + str(self.stegopackets[summary.actual_number]))
+		print("- Duration: " + str(round((summary.endtime_stegocommunication - summary.starttime_stegocommunication) * 1000, 2)) + " ms")
+		print("- Average Exfiltration Time: " + str(round((summary.injection_exfiltration_time_sum / summary.sent_received_chunks) * 1000, 2)) + " ms")
+		print("- Average Bandwidth: " + str(round((helper.IPv6_HEADER_FIELD_LENGTHS_IN_BITS["Traffic Class"] * summary.sent_received_chunks) / (summary.endtime_stegocommunication - summary.starttime_stegocommunication), 2)) + " bits/s")
+		#print("- Exfiltrated data == Chunks: " + str(self.exfiltrated_data == self.chunks) + " (" + str(failures) + " Failures)")
+		print("- Error Rate: " + str(round(failures/summary.sent_received_chunks, 2)) + " Failures/Packet")
+		print("- Bit Errors: " + str(summary.bit_errors))
+		#print("- Successfully transmitted Message: " + str(round( (index_first_failure/summary.sent_received_chunks) * 100, 2)) + "%")
+		# print("- Successfully transmitted Message: " + str(round(100 - ((failures/summary.sent_received_chunks) * 100), 2)) + "%")
 		print('##################### ANALYSIS RECEIVED DATA #####################')
 		print('')
 
@@ -359,53 +299,21 @@ class Traffic_Class_CC:
 		'''
 		Parses the command line arguments for the Covert Channel and returns the settings to run the specific covert channel.
 		'''
-		parser = optparse.OptionParser()
-
-		parser.add_option(
-		'-r',
-		'--role',
-		help='specify the sender or the receiving role of the script: {sender|receiver}',
-		action='store',
-		type='string',
-		dest='role')
+		parser = helper.get_channel_option_parser()
 
 		parser.add_option(
 		'-n',
 		'--stegopackets',
 		help='specify the number of packets which shall be exfiltrated: number > 0',
 		action='callback',
-		callback=get_comma_separated_args,
+		callback=helper.get_comma_separated_args,
 		type='string',
 		dest='stegopackets')
 
-		parser.add_option(
-		'-f',
-		'--file',
-		help='specify the file which shall be read and exfiltrated',
-		action='store',
-		type='string',
-		dest='filepath')
+		settings, args = parser.parse_args(argv)
 
-		parser.add_option(
-		'-p',
-		'--consecutive_nonstego',
-		help='specify the number of clean packets inserted before/after stegopackets (default: 0)',
-		default=0,
-		action='store',
-		type='int',
-		dest='consecutive_nonstego')
+		helper.check_channel_options(settings)
 
-		parser.add_option(
-		'-l',
-		'--consecutive_stego',
-		help='specify the burst length of stegopackets (default: 0)',
-		default=0,
-		action='store',
-		type='int',
-		dest='consecutive_stego')
-
-		settings, args = parser.parse_args(argv)
-		
 		settings.stegopackets = [int(x) for x in settings.stegopackets]
 
 		if any(n < 1 for n in settings.stegopackets):
@@ -414,17 +322,6 @@ class Traffic_Class_CC:
 		if not settings.stegopackets:
 			raise ValueError("The List of numbers which shall be exfiltrated needs at least one positive element!")
 
-		if settings.filepath is None:
-			raise ValueError("ValueError: filepath must be specified!")
-
-		if settings.role not in ["sender", "receiver"]:
-			raise ValueError("ValueError: role can be only sender or receiver!")
-
-		if settings.consecutive_nonstego != 0 and settings.consecutive_stego == 0 or settings.consecutive_nonstego == 0 and settings.consecutive_stego != 0:
-			print("settings.consecutive_nonstego and settings.consecutive_stego are set to 0!")
-			settings.consecutive_nonstego = 0
-			settings.consecutive_stego = 0
-		
 		return settings, args
 
 	def __str__(self):
@@ -435,12 +332,13 @@ if __name__ == "__main__":
 
 	settings, args = Traffic_Class_CC.process_command_line(sys.argv)
 
-	traffic_class_cc = Traffic_Class_CC(settings.filepath, helper.read_binary_file_for_n_packets_and_return_chunks(settings.filepath, settings.stegopackets[0], helper.IPv6_HEADER_FIELD_LENGTHS_IN_BITS["Traffic Class"]), settings.stegopackets, settings.role, settings.consecutive_nonstego, settings.consecutive_stego)
+	traffic_class_cc = Traffic_Class_CC(settings.filepath, helper.Chunk_Source(settings.filepath, helper.IPv6_HEADER_FIELD_LENGTHS_IN_BITS["Traffic Class"], settings.stegopackets[0]), settings.stegopackets, settings.role, settings.consecutive_nonstego, settings.consecutive_stego, helper.get_channel_options(settings))
 
 	if traffic_class_cc.role == "sender":
-		helper.append_ip6tables_rule(sender=True)
+		helper.append_ip6tables_rule(sender=True, queues=settings.queues, matches=settings.matches)
 	else:
-		helper.append_ip6tables_rule(sender=False)
+		if settings.capture is None:
+			helper.append_ip6tables_rule(sender=False, queues=settings.queues, matches=settings.matches)
 
 	traffic_class_cc.print_start_message()
 	
@@ -0,0 +1,195 @@
+import ctypes
+import mmap
+import select
+import socket
+import struct
+import helper
+import header_codec
+
+# AF_PACKET socket options and TPACKET_V3 ring (linux/if_packet.h, linux/if_ether.h)
+SOL_PACKET = 263
+PACKET_RX_RING = 5
+PACKET_STATISTICS = 6
+PACKET_VERSION = 10
+TPACKET_V3 = 2
+TP_STATUS_KERNEL = 0
+TP_STATUS_USER = 1
+ETH_P_IPV6 = 0x86dd
+SO_ATTACH_FILTER = 26
+
+# Classic BPF instructions (linux/filter.h): load a word at a fixed offset, jump if equal, return
+BPF_LD_W_ABS = 0x20
+BPF_JMP_JEQ_K = 0x15
+BPF_RET_K = 0x06
+# Ancillary load of the packet type (SKF_AD_OFF + SKF_AD_PKTTYPE), PACKET_OUTGOING for the packets sent by the host
+SKF_AD_PKTTYPE = 0xfffff004
+PACKET_OUTGOING = 4
+
+# Interface name capturing on all the interfaces
+ALL_INTERFACES = 'any'
+DEFAULT_BLOCK_SIZE = 262144
+DEFAULT_BLOCK_COUNT = 64
+FRAME_SIZE = 2048
+# Milliseconds after which the kernel hands over a block which is not full
+BLOCK_TIMEOUT = 10
+
+# Offset of the status of a block in its descriptor (struct tpacket_block_desc)
+BLOCK_STATUS_OFFSET = 8
+_BLOCK_STATUS = struct.Struct('=I')
+# Number of packets and offset of the first one, following the status
+_BLOCK_PACKETS = struct.Struct('=II')
+# tp_next_offset, tp_snaplen, tp_len and tp_mac of struct tpacket3_hdr
+_PACKET_HEADER = struct.Struct('=I8xII4xH')
+_TPACKET_REQ3 = struct.Struct('=7I')
+_TPACKET_STATS_V3 = struct.Struct('=III')
+_SOCK_FILTER = struct.Struct('=HBBI')
+
+def build_address_filter(source, destination, capture_length=helper.HEADER_COPY_RANGE):
+	'''
+	Returns the classic BPF program, as a list of (code, jt, jf, k) instructions, which keeps the first capture_length bytes of the IPv6 packets
+	from source to destination received by the host and drops the other ones. The offsets are counted from the IPv6 header (the socket is SOCK_DGRAM).
+	:param source: The source IPv6 address.
+	:param destination: The destination IPv6 address.
+	:param capture_length: The bytes of each packet copied to userspace.
+	'''
+	words = struct.unpack('!8I', socket.inet_pton(socket.AF_INET6, source) + socket.inet_pton(socket.AF_INET6, destination))
+	# The packets sent by the host jump to the last instruction, which drops the packet
+	program = [(BPF_LD_W_ABS, 0, 0, SKF_AD_PKTTYPE), (BPF_JMP_JEQ_K, 2 * len(words) + 1, 0, PACKET_OUTGOING)]
+	for index, word in enumerate(words):
+		program.append((BPF_LD_W_ABS, 0, 0, header_codec.SOURCE_ADDRESS_OFFSET + 4 * index))
+		# As well as a different word
+		program.append((BPF_JMP_JEQ_K, 0, 2 * (len(words) - index) - 1, word))
+	program.append((BPF_RET_K, 0, 0, capture_length))
+	program.append((BPF_RET_K, 0, 0, 0))
+	return program
+
+def attach_filter(sock, program):
+	'''
+	Attaches the classic BPF program to the socket (SO_ATTACH_FILTER): the kernel copies it, so the buffer is not kept.
+	'''
+	instructions = ctypes.create_string_buffer(b''.join(_SOCK_FILTER.pack(*x) for x in program))
+	sock.setsockopt(socket.SOL_SOCKET, SO_ATTACH_FILTER, struct.pack('HP', len(program), ctypes.addressof(instructions)))
+
+class Captured_Packet:
+
+	__slots__ = ('payload', 'length')
+
+	def __init__(self, payload, length):
+		'''
+		The packet given to the callback of the covert receiver by Packet_Capture: the packet is already on its way, so there is no verdict
+		and its payload may hold only its headers (see header_codec.get_packet_length).
+		:param payload: The first bytes of the IPv6 packet.
+		:param length: The length of the IPv6 packet.
+		'''
+		self.payload = payload
+		self.length = length
+
+	def get_payload(self):
+		return self.payload
+
+	def get_payload_len(self):
+		return self.length
+
+	def set_payload(self, payload):
+		raise ValueError("ValueError: a captured packet cannot be modified!")
+
+	def accept(self):
+		pass
+
+	def drop(self):
+		pass
+
+class Packet_Capture:
+
+	def __init__(self, interface=ALL_INTERFACES, block_size=DEFAULT_BLOCK_SIZE, block_count=DEFAULT_BLOCK_COUNT):
+		'''
+		Used by the covert receiver in place of a NetfilterQueue (same bind, run and unbind methods) to read the packets passively from an
+		AF_PACKET socket: the packets from SOURCE_IPv6_ADDRESS to DESTINATION_IPv6_ADDRESS are selected by a BPF filter in the kernel and their
+		headers are written in a TPACKET_V3 ring shared with the process, which reads them a block at a time. The receiver is not in the path of
+		the packets: they need no ip6tables rule and no verdict, and they are not delayed by it.
+		:param interface: The name of the interface, ALL_INTERFACES to capture on all the interfaces.
+		:param block_size: The size of a block of the ring, a multiple of the page size.
+		:param block_count: The number of blocks of the ring.
+		'''
+		self.interface = interface
+		self.block_size = block_size
+		self.block_count = block_count
+		self.socket = None
+		self.ring = None
+		self.callback = None
+		self.block = 0
+
+		self.packets = 0
+		self.blocks = 0
+		self.drops = 0
+
+	def bind(self, queue_number, callback, range=helper.HEADER_COPY_RANGE):
+		'''
+		Opens the socket and maps its ring.
+		:param queue_number: The number of the netfilter queue, unused.
+		:param callback: The method of the covert receiver called for each packet (i.e., exfiltrate).
+		:param range: The bytes of each packet copied to the ring.
+		'''
+		self.callback = callback
+		# The packets received before the ring is set are left in the socket queue, which is never read
+		self.socket = socket.socket(socket.AF_PACKET, socket.SOCK_DGRAM, socket.htons(ETH_P_IPV6))
+		attach_filter(self.socket, build_address_filter(helper.SOURCE_IPv6_ADDRESS, helper.DESTINATION_IPv6_ADDRESS, range))
+		if self.interface != ALL_INTERFACES:
+			self.socket.bind((self.interface, ETH_P_IPV6))
+		self.socket.setsockopt(SOL_PACKET, PACKET_VERSION, TPACKET_V3)
+		frames = self.block_size // FRAME_SIZE * self.block_count
+		self.socket.setsockopt(SOL_PACKET, PACKET_RX_RING, _TPACKET_REQ3.pack(self.block_size, self.block_count, FRAME_SIZE, frames, BLOCK_TIMEOUT, 0, 0))
+		self.ring = mmap.mmap(self.socket.fileno(), self.block_size * self.block_count, mmap.MAP_SHARED, mmap.PROT_READ | mmap.PROT_WRITE)
+		self.block = 0
+
+	def unbind(self):
+		'''
+		Prints the statistics of the capture and closes the socket.
+		'''
+		print(self.get_stats())
+		self.ring.close()
+		self.socket.close()
+
+	def run(self):
+		'''
+		Hands the blocks filled by the kernel to the callback until Ctrl + c, which is raised.
+		'''
+		ring = self.ring
+		poll = select.poll()
+		poll.register(self.socket, select.POLLIN | select.POLLERR)
+		while True:
+			offset = self.block * self.block_size
+			if not _BLOCK_STATUS.unpack_from(ring, offset + BLOCK_STATUS_OFFSET)[0] & TP_STATUS_USER:
+				poll.poll()
+				continue
+			self.read_block(offset)
+			# The block goes back to the kernel
+			_BLOCK_STATUS.pack_into(ring, offset + BLOCK_STATUS_OFFSET, TP_STATUS_KERNEL)
+			self.block = (self.block + 1) % self.block_count
+
+	def read_block(self, offset):
+		ring = self.ring
+		callback = self.callback
+		count, position = _BLOCK_PACKETS.unpack_from(ring, offset + BLOCK_STATUS_OFFSET + 4)
+		position += offset
+		for x in range(count):
+			next_offset, snaplen, length, mac = _PACKET_HEADER.unpack_from(ring, position)
+			start = position + mac
+			# The bytes are copied: the block is reused by the kernel
+			callback(Captured_Packet(ring[start:start + snaplen], length))
+			position += next_offset
+		self.packets += count
+		self.blocks += 1
+
+	def get_stats(self):
+		'''
+		Returns the packets read, the blocks and the packets dropped by the kernel because the ring was full.
+		'''
+		if self.socket is not None and self.socket.fileno() != -1:
+			packets, drops, freezes = _TPACKET_STATS_V3.unpack(self.socket.getsockopt(SOL_PACKET, PACKET_STATISTICS, _TPACKET_STATS_V3.size))
+			# The kernel resets the counters when they are read
+			self.drops += drops
+		stats = "- Captured packets: " + str(self.packets) + "\n"
+		stats += "- Ring blocks: " + str(self.blocks) + "\n"
+		stats += "- Dropped packets (ring full): " + str(self.drops) + "\n"
+		return stats
@@ -0,0 +1,419 @@
+from netfilterqueue import NetfilterQueue
+import sys
+import time
+sys.path.insert(1, '../')
+import helper
+import header_codec
+import reporting
+import multi_queue
+import async_queue
+import packet_capture
+import flow_sessions
+import striping
+
+class Composite_CC:
+
+	END_SIGNATURE = 524288
+	SIGNATURE_FIELD = "Traffic Class"
+
+	def __init__(self, filepath, chunks, role, consecutive_nonstego, consecutive_stego, codec, options=helper.Channel_Options()):
+		'''
+		Constructor for sender and receiver of a composite cc, which carries each chunk in several fields of the same packet.
+		:param filepath: The path to the message to hide. 
+		:param chunks: A helper.Chunk_Source of integers containing the message to hide splitted in chunks.
+		:param role: The role (i.e., sender or receiver) assigned.
+		:param consecutive_nonstego: The length of the burst of non-stego packets.
+		:param consecutive_stego: The lenght of the burst of stego packets
+		:param codec: The header_codec.Composite_Codec packing the chunks into the fields (but the Traffic Class, which carries the signature).
+		:param options: The helper.Channel_Options of the queue, the signatures, the covert sessions and the codec.
+		'''
+		self.chunks = chunks 				
+		self.role = role
+		self.filepath = filepath
+		self.codec = codec
+		self.signature_scheme = options.signature_scheme
+		self.signature_cache = options.signature_cache
+		# The signature is in the Traffic Class: a value of 255 would cause problems on the receiving side, it is lowered to 254
+		self.schedule = helper.Marking_Schedule(self.chunks, helper.get_signature_stream(options.signature_scheme, helper.USED_INDICES_OF_HASH_TRAFFIC_CLASS, options.signature_cache), \
+			codec.field_length_in_bits, helper.IPv6_HEADER_FIELD_LENGTHS_IN_BITS["Traffic Class"], consecutive_stego, 254)
+
+		self.consecutive_nonstego = consecutive_nonstego
+		self.consecutive_stego = consecutive_stego
+		self.stegotime = True
+		self.clean_counter = 0
+		self.gso_mtu = options.gso_mtu
+		self.stego_segments = 0
+		self.resync_window = helper.Resync_Window(self.schedule, options.resync_window) if options.resync_window > 0 else None
+		self.resyncs = 0
+
+		self.number_of_repetitions = 20
+		self.number_of_repetitions_done = 0
+
+		self.sent_received_chunks = 0
+		if options.queues > 1:
+			self.nfqueue = multi_queue.Queue_Workers(self, options.queues)
+		elif options.event_loop:
+			self.nfqueue = async_queue.Async_Queue(self, options.control_port)
+		elif options.capture is not None:
+			self.nfqueue = packet_capture.Packet_Capture(options.capture)
+		else:
+			self.nfqueue = NetfilterQueue()
+		if options.stripe_weights is not None:
+			self.nfqueue = striping.Stripe_Sessions(self, self.nfqueue, options.stripe_weights, options.idle_timeout)
+		elif options.flows > 0 or options.queues > 1:
+			self.nfqueue = flow_sessions.Flow_Sessions(self, self.nfqueue, options.flows or flow_sessions.DEFAULT_MAX_FLOWS, options.idle_timeout)
+		self.exfiltrated_data = []
+		self.errors = helper.Error_Accumulator(self.chunks)
+		self.reporter = reporting.Reporter()
+
+		# ------------------- MEASUREMENT VARIABLES ------------------- #
+		self.starttime_stegocommunication = 0.0
+		self.endtime_stegocommunication = 0.0
+		self.injection_exfiltration_time_sum = 0.0
+
+	def inject(self, packet):
+		'''
+	   	The inject method of the sender, which is bound the the netfilter queue NETFILTERQUEUE_NUMBER.
+	   	This method injects the i-th chunks of the secret message (i.e., self.chunks[self.sent_received_chunks])
+	   	into the targeted field, accordingly to the sending mode used (i.e., interleaved or burst).
+	   	:param Packet packet: The NetfilterQueue Packet object packet.
+	   	'''
+		if self.number_of_repetitions_done < self.number_of_repetitions:
+			tmp1 = time.perf_counter()
+			payload = packet.get_payload()
+			# The number of segments on the wire of a GSO packet
+			segments = header_codec.get_segment_count(payload, self.gso_mtu) if self.gso_mtu else 1
+			if self.sent_received_chunks < len(self.chunks):
+				if self.sent_received_chunks == 0:
+					self.starttime_stegocommunication = time.perf_counter()
+
+				if segments > 1 and self.stegotime and self.schedule.repeats_signature(self.sent_received_chunks):
+					# The other segments would be taken for the following stego-packet: the GSO packet stays clean
+					pass
+				elif self.stegotime:
+					pkt = bytearray(payload)
+					signature, data = divmod(self.schedule[self.sent_received_chunks], self.schedule.data_modulus)
+					header_codec.set_traffic_class(pkt, signature)
+					self.codec.set(pkt, data)
+					self.exfiltrated_data.append((data, signature))
+
+					packet.set_payload(bytes(pkt))
+					self.sent_received_chunks += 1
+
+					# The last stego-packet of a burst is followed by the clean packets
+					index = self.sent_received_chunks - 1
+					self.stegotime = not self.schedule.ends_burst(index)
+					# The other segments of a GSO packet carry the same mark: after the end of a burst, the receiver counts them as clean packets
+					if segments > 1 and not self.stegotime:
+						self.clean_counter = helper.count_clean_segments(self.clean_counter, self.consecutive_nonstego, segments - 1)
+						self.stegotime = self.clean_counter % self.consecutive_nonstego == 0
+					self.stego_segments += segments
+				else:
+					if segments > 1:
+						self.clean_counter = helper.count_clean_segments(self.clean_counter, self.consecutive_nonstego, segments)
+					else:
+						self.clean_counter += 1
+					self.stegotime = self.clean_counter % self.consecutive_nonstego == 0
+			elif segments > 1:
+				# Each segment of a GSO packet would carry the end signature: it waits for a packet of a single segment
+				pass
+			else:
+				pkt = bytearray(payload)
+				header_codec.set_flow_label(pkt, Composite_CC.END_SIGNATURE)
+				packet.set_payload(bytes(pkt))
+				self.endtime_stegocommunication = time.perf_counter()
+				self.stegotime = True
+				self.number_of_repetitions_done += 1
+				summary = reporting.get_repetition_summary(self)
+				self.reporter.submit(self.statistical_evaluation_sent_packets, summary)
+				self.reporter.submit(self.write_csv, summary)
+				# All the repetitions are done: the kernel can stop queueing the packets
+				if self.number_of_repetitions_done == self.number_of_repetitions:
+					self.reporter.submit(helper.delete_ip6tables_rule, True)
+				self.injection_exfiltration_time_sum = 0
+				self.sent_received_chunks = 0
+				self.exfiltrated_data = []
+				self.stego_segments = 0
+			
+			if self.sent_received_chunks != 0:
+				self.injection_exfiltration_time_sum += time.perf_counter() - tmp1
+		packet.accept()
+
+
+	def exfiltrate(self, packet):
+		'''
+	   	The exfiltration method of the receiver, which is bound the the netfilter queue NETFILTERQUEUE_NUMBER.
+	   	This method extracts the value contained into the targeted field, accordingly to the sending mode used 
+	   	(i.e., interleaved or burst).
+	   	:param Packet packet: The NetfilterQueue Packet object.
+	   	'''
+		if self.number_of_repetitions_done < self.number_of_repetitions:
+			tmp1 = time.perf_counter() 
+			pkt = packet.get_payload()
+			if self.stegotime:
+				signature = header_codec.get_traffic_class(pkt)
+				if signature == self.schedule.get_signature(self.sent_received_chunks) or self.resync_window is not None and self.resync(signature, pkt):
+					if self.sent_received_chunks == 0:
+						self.starttime_stegocommunication = time.perf_counter()
+					self.exfiltrated_data.append((self.codec.get(pkt), signature))
+					self.errors.add(self.exfiltrated_data[-1][0])
+					self.sent_received_chunks += 1
+					# The last stego-packet of a burst is followed by the clean packets
+					index = self.sent_received_chunks - 1
+					self.stegotime = not self.schedule.ends_burst(index)
+			else:
+				self.clean_counter += 1
+				self.stegotime = self.clean_counter % self.consecutive_nonstego == 0
+			if header_codec.get_flow_label(pkt) == Composite_CC.END_SIGNATURE:
+					self.endtime_stegocommunication = time.perf_counter()
+					self.stegotime = True
+					self.number_of_repetitions_done += 1
+					summary = reporting.get_repetition_summary(self)
+					self.reporter.submit(self.statistical_evaluation_received_packets, summary)
+					self.reporter.submit(self.write_csv, summary)
+					# All the repetitions are done: the kernel can stop queueing the packets
+					if self.number_of_repetitions_done == self.number_of_repetitions:
+						self.reporter.submit(helper.delete_ip6tables_rule, False)
+					self.injection_exfiltration_time_sum = 0
+					self.sent_received_chunks = 0
+					self.exfiltrated_data = []
+					self.errors.reset()
+					self.resyncs = 0
+			
+
+			if self.sent_received_chunks != 0:
+				self.injection_exfiltration_time_sum += time.perf_counter() - tmp1
+		packet.accept()
+	
+	def resync(self, signature, pkt):
+		'''
+		Looks for the signature of a packet which is not the expected stego-packet among the following resync_window signatures. 
+		A match is confirmed by the signature of the following stego-packet (see helper.Resync_Window.confirm), so a clean packet 
+		carrying one of the signatures by chance does not resynchronize the receiver. Once confirmed, the stego-packets before the match 
+		are lost: their chunks are accounted as erasures, the chunk of the match is exfiltrated and the exfiltration goes on from the packet.
+		Returns True if the receiver is resynchronized.
+		:param signature: The signature of the packet.
+		:param pkt: The raw IPv6 packet.
+		'''
+		confirmed = self.resync_window.confirm(signature, self.sent_received_chunks, (self.codec.get(pkt), signature), self.consecutive_nonstego)
+		if confirmed is None:
+			return False
+		index, candidate = confirmed
+		if self.sent_received_chunks == 0:
+			self.starttime_stegocommunication = time.perf_counter()
+		gap = index - self.sent_received_chunks
+		self.errors.erase(gap)
+		self.exfiltrated_data.extend([(None, None)] * gap)
+		self.exfiltrated_data.append(candidate)
+		self.errors.add(candidate[0])
+		self.sent_received_chunks = index + 1
+		self.resyncs += 1
+		return True
+
+	def write_csv(self, summary):
+		
+		filename="composite_cc_" + "_".join(x.replace(" ", "_").lower() for x in self.codec.fields) + "_" + self.filepath.replace("../", "", 1) + "_role_" + self.role + "_clean_packets_" + str(self.consecutive_nonstego) + "_number_stegopackets_" + str(self.consecutive_stego) + ".csv"
+		if self.role == 'sender':
+			writer = self.reporter.get_csv_writer(filename, ["Sent Chunks (Packets)", "Duration of Stegocommunication (ms)", "Average Injection Time (ms)", "Bandwidth (bits/s)"])
+		else:
+			writer = self.reporter.get_csv_writer(filename, ["Received Chunks (Packets)", "Duration of Stegocommunication (ms)", "Average Exfiltration Time (ms)", "Bandwith (bits/s)", "Failures", "Error Rate (Failures/Packet)", "Successfully transmitted Message (%)"])
+		
+		if self.role == 'sender':
+			writer.writerow([summary.sent_received_chunks, \
+				round((summary.endtime_stegocommunication - summary.starttime_stegocommunication) * 1000, 2), \
+				round((summary.injection_exfiltration_time_sum / summary.sent_received_chunks) * 1000, 2), \
+				round((self.codec.field_length_in_bits * summary.sent_received_chunks) / (summary.endtime_stegocommunication - summary.starttime_stegocommunication), 2)])  			
+		else:
+			failures = summary.failures
+			index_first_failure = summary.index_first_failure
+				
+			writer.writerow([summary.sent_received_chunks, \
+				round((summary.endtime_stegocommunication - summary.starttime_stegocommunication) * 1000, 2), \
+				round((summary.injection_exfiltration_time_sum / summary.sent_received_chunks) * 1000, 2), \
+				round((self.codec.field_length_in_bits * summary.sent_received_chunks) / (summary.endtime_stegocommunication - summary.starttime_stegocommunication), 2), \
+				failures, \
+				round(failures/summary.number_of_chunks, 2), \
+				# round(100 - ((failures/summary.sent_received_chunks) * 100), 2)])
+				round((index_first_failure/summary.sent_received_chunks) * 100, 2)])
+
+
+	def start_sending(self):
+		'''
+	   	Binds the inject method to the netfilter queue with its specific number and runs the callback function. 
+	   	If the user press Ctrl + c the inject method is unbind.  
+	   	'''
+
+		self.nfqueue.bind(helper.NETFILTER_QUEUE_NUMBER, self.inject)
+		if self.gso_mtu:
+			async_queue.enable_gso(self.nfqueue, helper.NETFILTER_QUEUE_NUMBER)
+		try:
+			self.nfqueue.run()
+		except KeyboardInterrupt:
+			print("The exfiltration is stopped.")
+		self.nfqueue.unbind()
+		self.reporter.close()
+
+	def start_receiving(self):
+		'''
+	   	Binds the exfiltrate method to the netfilter queue with its specific number and runs the callback function. 
+	   	If the user press Ctrl + c the inject method is unbind.  
+	   	'''
+		self.nfqueue.bind(helper.NETFILTER_QUEUE_NUMBER, self.exfiltrate, range=helper.HEADER_COPY_RANGE)
+		try:
+			self.nfqueue.run()
+		except KeyboardInterrupt:
+			print("The exfiltration is stopped.")
+		self.nfqueue.unbind()
+		self.reporter.close()
+
+
+	def print_start_message(self):
+		print('')
+		if self.role == "sender":
+			print('########## Mode: Packet Marking | CC: Composite | Side: Covert Sender ##########')
+		else:
+			print('########## Mode: Packet Marking | CC: Composite | Side: Covert Receiver ##########')
+		print('- Number of Repetitions: ' + str(self.number_of_repetitions))	
+		if isinstance(self.nfqueue, striping.Stripe_Sessions):
+			print('- Stripes: ' + str(len(self.nfqueue.weights)) + ' (weights: ' + ','.join(str(x) for x in self.nfqueue.weights) + ')')
+		elif isinstance(self.nfqueue, flow_sessions.Flow_Sessions):
+			print('- Flow Sessions: up to ' + str(self.nfqueue.max_flows) + ' (idle timeout: ' + str(self.nfqueue.idle_timeout) + ' s)')
+		print('- Signature in field: Traffic Class')			
+		print('- Signature Scheme: ' + self.signature_scheme + (' (cached)' if self.signature_cache else ''))
+		print('- Exfiltrated File: ' + self.filepath)
+		print('- Fields: ' + ' + '.join(x + ' (' + str(header_codec.COMPOSITE_FIELD_LENGTHS_IN_BITS[x]) + ' bits)' for x in self.codec.fields) + ' = ' + str(self.codec.field_length_in_bits) + ' bits per stego-packet')
+		if self.consecutive_nonstego > 0 and self.consecutive_stego > 0:
+			buf = ""
+			for x in range(2):
+				for y in range(self.consecutive_stego):
+					buf += "S "
+				for y in range(self.consecutive_nonstego):
+					buf += "C "	
+			print('- Length Clean Packets: ' + str(self.consecutive_nonstego))		
+			print('- Length Stego Packets: ' + str(self.consecutive_stego))		
+			print('  ==> Packet Pattern (S=stego, C=clean): ' + buf + "...")		
+		print('- Number of Chunks: ' + str(len(self.chunks)))	
+		print('- Schedule Build Time: ' + str(round(self.schedule.build_time * 1000, 2)) + ' ms')
+		if self.role == "sender" and self.gso_mtu:
+			print('- GSO: negotiated with the queue, segments of ' + str(self.gso_mtu) + ' bytes MTU')
+		if self.role == "receiver" and self.resync_window is not None:
+			print('- Resync Window: ' + str(self.resync_window.size) + ' signatures')
+		if self.role == "sender":
+			print('########## Mode: Packet Marking | CC: Composite | Side: Covert Sender ##########')
+		else:
+			print('########## Mode: Packet Marking | CC: Composite | Side: Covert Receiver ##########')
+		print('')
+		if self.role == "sender":
+			print('Injection in covert channel is started...')
+			print('Stop injection with CTRL+C.')
+		else:
+			print('Exfiltration from covert channel is started...')
+			print('Stop exfiltration with CTRL+C...')
+		print('')
+
+	def statistical_evaluation_sent_packets(self, summary):
+		
+		print('')
+		print('##################### ANALYSIS SENT DATA #####################')
+		print("- Number of Repetitions: " + str(summary.number_of_repetitions_done) + "/" + str(self.number_of_repetitions))
+		print("- Sent stego-packets: " + str(summary.sent_received_chunks) + "/" + str(summary.number_of_chunks))
+		print("- Duration: " + str(round((summary.endtime_stegocommunication - summary.starttime_stegocommunication) * 1000, 2)) + " ms")
+		print("- Average Injection Time: " + str(round((summary.injection_exfiltration_time_sum / summary.sent_received_chunks) * 1000, 2)) + " ms")
+		print("- Average Bandwidth: " + str(round((self.codec.field_length_in_bits * summary.sent_received_chunks) / (summary.endtime_stegocommunication - summary.starttime_stegocommunication), 2)) + " bits/s")
+		#print("- Injected data == Chunks: " + str([x[0] for x in self.exfiltrated_data] == self.chunks))
+		if self.gso_mtu:
+			print("- Stego-segments on the wire: " + str(summary.stego_segments))
+		print('##################### ANALYSIS SENT DATA #####################')
+		print('')
+
+	def statistical_evaluation_received_packets(self, summary):
+		failures = summary.failures
+		index_first_failure = summary.index_first_failure
+
+		print('')
+		print('##################### ANALYSIS RECEIVED DATA #####################')
+		print("- Number of Repetitions: " + str(summary.number_of_repetitions_done) + "/" + str(self.number_of_repetitions))
+		print("- Received stego-packets: " + str(summary.sent_received_chunks) + "/" + str(summary.number_of_chunks))
+		print("- Duration: " + str(round((summary.endtime_stegocommunication - summary.starttime_stegocommunication) * 1000, 2)) + " ms")
+		print("- Average Exfiltration Time: " + str(round((summary.injection_exfiltration_time_sum / summary.sent_received_chunks) * 1000, 2)) + " ms")
+		print("- Average Bandwidth: " + str(round((self.codec.field_length_in_bits * summary.sent_received_chunks) / (summary.endtime_stegocommunication - summary.starttime_stegocommunication), 2)) + " bits/s")
+		#print("- Exfiltrated data == Chunks: " + str([x[0] for x in self.exfiltrated_data] == self.chunks) + " (" + str(failures) + " Failures)")
+		print("- Error Rate: " + str(round(failures/summary.number_of_chunks, 2)) + " Failures/Packet")
+		print("- Bit Errors: " + str(summary.bit_errors))
+		if self.resync_window is not None:
+			print("- Resynchronizations: " + str(summary.resyncs) + " (" + str(summary.erasures) + " erased chunks)")
+		#print("- Successfully transmitted Message: " + str(round((index_first_failure/summary.sent_received_chunks) * 100, 2)) + "%")
+		print('##################### ANALYSIS RECEIVED DATA #####################')
+		print('')
+
+	def process_command_line(argv):
+		'''
+		Parses the command line arguments for the Covert Channel and returns the settings to run the specific covert channel.
+		'''
+		parser = helper.get_channel_option_parser(marking=True)
+
+		parser.add_option(
+		'-e',
+		'--fields',
+		help='specify the comma separated fields carrying each chunk, the first one holding its most significant bits: {fl|dscp|hl}, the Traffic Class carries the signature (default: fl,hl)',
+		default=['fl', 'hl'],
+		action='callback',
+		callback=helper.get_comma_separated_args,
+		type='string',
+		dest='fields')
+
+		parser.add_option(
+		'-w',
+		'--resync_window',
+		help='specify the number of signatures following the expected one searched by the receiver, so a lost stego-packet costs a single chunk (default: 0, disabled)',
+		default=0,
+		action='store',
+		type='int',
+		dest='resync_window')
+
+		settings, args = parser.parse_args(argv)
+
+		helper.check_channel_options(settings, marking=True)
+
+		if any(x not in header_codec.COMPOSITE_FIELD_ABBREVIATIONS for x in settings.fields):
+			raise ValueError("ValueError: the fields can be only fl, dscp or hl!")
+		settings.fields = [header_codec.COMPOSITE_FIELD_ABBREVIATIONS[x] for x in settings.fields]
+
+		if "Traffic Class" in settings.fields or "DSCP" in settings.fields:
+			raise ValueError("ValueError: the Traffic Class carries the signature!")
+
+		if settings.resync_window < 0:
+			raise ValueError("ValueError: the resync window cannot be negative!")
+
+		return settings, args
+
+	def __str__(self):
+		return str(self.__dict__)
+
+
+if __name__ == "__main__":
+
+	settings, args = Composite_CC.process_command_line(sys.argv)
+
+	codec = header_codec.Composite_Codec(settings.fields)
+	composite_cc = Composite_CC(settings.filepath, helper.Chunk_Source(settings.filepath, codec.field_length_in_bits), settings.role, settings.consecutive_nonstego, settings.consecutive_stego, codec, helper.get_channel_options(settings))
+
+	if composite_cc.role == "sender":
+		helper.append_ip6tables_rule(sender=True, queues=settings.queues, matches=settings.matches)
+	else:
+		if settings.capture is None:
+			helper.append_ip6tables_rule(sender=False, queues=settings.queues, matches=settings.matches)
+
+	composite_cc.print_start_message()
+	
+	if composite_cc.role == "sender":
+		composite_cc.start_sending()
+	else:
+		composite_cc.start_receiving()
+	
+	if composite_cc.role == "sender":
+		helper.delete_ip6tables_rule(sender=True)
+	else:
+		helper.delete_ip6tables_rule(sender=False)
+
+
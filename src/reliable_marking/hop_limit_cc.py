@@ -1,45 +1,74 @@
 from netfilterqueue import NetfilterQueue
-from scapy.all import *
-import optparse
 import sys
 import time
-import csv
-from pathlib import Path
 sys.path.insert(1, '../')
 import helper
+import header_codec
+import reporting
+import multi_queue
+import async_queue
+import packet_capture
+import flow_sessions
+import striping
 
 class Hop_Limit_CC:
 
 	END_SIGNATURE = 524288
+	SIGNATURE_FIELD = "Flow Label"
 
-	def __init__(self, filepath, chunks, role, consecutive_nonstego, consecutive_stego):
+	def __init__(self, filepath, chunks, role, consecutive_nonstego, consecutive_stego, options=helper.Channel_Options()):
 		'''
 		Constructor for sender and receiver of a Hop Limit cc.
 		:param filepath: The path to the message to hide. 
-		:param chunks: A string list containing the message to hide splitted in chunks.
+		:param chunks: A helper.Chunk_Source of integers containing the message to hide splitted in chunks.
 		:param role: The role (i.e., sender or receiver) assigned.
 		:param consecutive_nonstego: The length of the burst of non-stego packets.
 		:param consecutive_stego: The lenght of the burst of stego packets
+		:param options: The helper.Channel_Options of the queue, the signatures, the covert sessions and the codec.
 		'''
 		self.chunks = chunks 				
 		self.role = role
 		self.filepath = filepath
+		self.signature_scheme = options.signature_scheme
+		self.signature_cache = options.signature_cache
+		self.hop_limit_codec = header_codec.Hop_Limit_Codec(options.hop_limit_levels, baseline=options.hop_limit_baseline)
+		self.hop_limit_calibration = None
+		if role == "receiver" and options.calibration_window > 0:
+			self.hop_limit_calibration = helper.Hop_Limit_Calibration(self.hop_limit_codec, options.calibration_window)
+		self.schedule = helper.Marking_Schedule(self.chunks, helper.get_signature_stream(options.signature_scheme, helper.USED_INDICES_OF_HASH_FLOW_LABEL, options.signature_cache), \
+			self.hop_limit_codec.bits, helper.IPv6_HEADER_FIELD_LENGTHS_IN_BITS["Flow Label"], consecutive_stego)
 
 		self.consecutive_nonstego = consecutive_nonstego
 		self.consecutive_stego = consecutive_stego
 		self.stegotime = True
 		self.clean_counter = 0
+		self.gso_mtu = options.gso_mtu
+		self.stego_segments = 0
 		#self.sleep = False
 		self.next_expected_seq = 0
 		self.count_stego_retransmissions = 0
+		self.retransmissions = helper.Retransmission_Map(options.retransmission_window)
+		self.reassembly = helper.Reassembly_Buffer(self.schedule, options.reorder_window, options.retransmission_window)
 
 		self.number_of_repetitions = 20
 		self.number_of_repetitions_done = 0
-		self.hoplimit_delta = 20
 
 		self.sent_received_chunks = 0
-		self.nfqueue = NetfilterQueue()
+		if options.queues > 1:
+			self.nfqueue = multi_queue.Queue_Workers(self, options.queues)
+		elif options.event_loop:
+			self.nfqueue = async_queue.Async_Queue(self, options.control_port)
+		elif options.capture is not None:
+			self.nfqueue = packet_capture.Packet_Capture(options.capture)
+		else:
+			self.nfqueue = NetfilterQueue()
+		if options.stripe_weights is not None:
+			self.nfqueue = striping.Stripe_Sessions(self, self.nfqueue, options.stripe_weights, options.idle_timeout)
+		elif options.flows > 0 or options.queues > 1:
+			self.nfqueue = flow_sessions.Flow_Sessions(self, self.nfqueue, options.flows or flow_sessions.DEFAULT_MAX_FLOWS, options.idle_timeout)
 		self.exfiltrated_data = []
+		self.errors = helper.Error_Accumulator(self.chunks)
+		self.reporter = reporting.Reporter()
 
 		# ------------------- MEASUREMENT VARIABLES ------------------- #
 		self.starttime_stegocommunication = 0.0
@@ -61,21 +90,25 @@ class Hop_Limit_CC:
 
 		if self.number_of_repetitions_done < self.number_of_repetitions:
 			tmp1 = time.perf_counter() 
-			pkt = IPv6(packet.get_payload())
-			if pkt.nh == 6:
+			pkt = bytearray(packet.get_payload())
+			if header_codec.get_next_header(pkt) == helper.PROTOCOL_IDS["TCP"]:
+				seq, payload_length = header_codec.get_tcp_sequence_number_and_payload_length(pkt)
+				# The number of segments on the wire of a GSO packet
+				segments = header_codec.get_segment_count(pkt, self.gso_mtu, payload_length) if self.gso_mtu else 1
 				if self.sent_received_chunks < len(self.chunks):
 
-					# If no monotonically increasing sequence number in the flow => retransmission
-					if pkt[TCP].seq < self.next_expected_seq:
+					# If no monotonically increasing sequence number in the flow => retransmission (the sequence numbers wrap around)
+					if (self.sent_received_chunks or self.number_of_repetitions_done) and helper.is_sequence_before(seq, self.next_expected_seq):
 
-						# Get the signature and the value of the exfiltrated data 
-						buf = [x for x in self.exfiltrated_data[-5:] if pkt[TCP].seq == x[2]]
+						# Get the value and the signature injected in the segment
+						mark = self.retransmissions.get(seq)
 
 						# If a value was inserted in the stegotime
-						if buf != []:
-							pkt.hl = buf[0][0]
-							pkt.fl = buf[0][1]
+						if mark is not None:
+							self.hop_limit_codec.set(pkt, mark[0])
+							header_codec.set_flow_label(pkt, mark[1])
 							self.count_stego_retransmissions += 1
+							packet.set_payload(bytes(pkt))
 
 					# If it is monotonically increasing 
 					else:
@@ -83,43 +116,62 @@ class Hop_Limit_CC:
 						# If the first packet, set the seq. number
 						if self.sent_received_chunks == 0:
 							self.starttime_stegocommunication = time.perf_counter()
-							self.next_expected_seq = pkt[TCP].seq
+							self.next_expected_seq = seq
 
+						if segments > 1 and self.stegotime and self.schedule.repeats_signature(self.sent_received_chunks):
+							# The other segments would be taken for the following stego-segment: the GSO packet stays clean
+							pass
 						# If it is the stegotime, set the value an dthe signature 
-						if self.stegotime:
-							pkt.fl = helper.get_md5_signature_at_indices(self.sent_received_chunks, helper.USED_INDICES_OF_HASH_FLOW_LABEL)
-							
-							if self.chunks[self.sent_received_chunks] == '1':
-								pkt.hlim += self.hoplimit_delta
-								self.exfiltrated_data.append(('1', pkt.fl, pkt[TCP].seq))
-							else:
-								pkt.hlim -= self.hoplimit_delta
-								self.exfiltrated_data.append(('0', pkt.fl, pkt[TCP].seq))
-	
+						elif self.stegotime:
+							signature, data = divmod(self.schedule[self.sent_received_chunks], self.schedule.data_modulus)
+							header_codec.set_flow_label(pkt, signature)
+							self.retransmissions.add(seq, data, signature, payload_length if segments > 1 else 0)
+							self.hop_limit_codec.set(pkt, data)
+
+							packet.set_payload(bytes(pkt))
 							self.sent_received_chunks += 1
 
-							if self.consecutive_stego > 0:
-								self.stegotime = self.sent_received_chunks % self.consecutive_stego != 0
+							# The last stego-packet of a burst is followed by the clean packets
+							index = self.sent_received_chunks - 1
+							self.stegotime = not self.schedule.ends_burst(index)
+							# The other segments of a GSO packet carry the same mark: after the end of a burst, the receiver counts them as clean packets
+							if segments > 1 and not self.stegotime:
+								self.clean_counter = helper.count_clean_segments(self.clean_counter, self.consecutive_nonstego, segments - 1)
+								self.stegotime = self.clean_counter % self.consecutive_nonstego == 0
+							self.stego_segments += segments
 						else:
-							self.clean_counter += 1
+							if segments > 1:
+								self.clean_counter = helper.count_clean_segments(self.clean_counter, self.consecutive_nonstego, segments)
+							else:
+								self.clean_counter += 1
 							self.stegotime = self.clean_counter % self.consecutive_nonstego == 0
 
 						# Calculate the next expected value						
-						self.next_expected_seq += len(pkt[TCP].payload)
+						self.next_expected_seq = helper.get_next_sequence(self.next_expected_seq, seq, payload_length)
+						self.retransmissions.evict(self.next_expected_seq)
+				elif segments > 1:
+					# Each segment of a GSO packet would carry the end signature: it waits for a packet of a single segment
+					pass
 				else:
-					pkt.fl = Hop_Limit_CC.END_SIGNATURE
+					header_codec.set_flow_label(pkt, Hop_Limit_CC.END_SIGNATURE)
+					packet.set_payload(bytes(pkt))
 					self.endtime_stegocommunication = time.perf_counter()
 					self.stegotime = True
 					self.number_of_repetitions_done += 1
-					self.statistical_evaluation_sent_packets()
-					self.write_csv()
+					summary = reporting.get_repetition_summary(self)
+					self.reporter.submit(self.statistical_evaluation_sent_packets, summary)
+					self.reporter.submit(self.write_csv, summary)
+					# All the repetitions are done: the kernel can stop queueing the packets
+					if self.number_of_repetitions_done == self.number_of_repetitions:
+						self.reporter.submit(helper.delete_ip6tables_rule, True)
 					self.injection_exfiltration_time_sum = 0
 					self.sent_received_chunks = 0
 					self.exfiltrated_data = []
+					self.stego_segments = 0
 					#self.sleep = True
 					self.count_stego_retransmissions = 0
+					self.retransmissions.clear()
 				
-			packet.set_payload(bytes(pkt))
 			if self.sent_received_chunks != 0:
 				self.injection_exfiltration_time_sum += time.perf_counter() - tmp1
 		packet.accept()
@@ -133,104 +185,82 @@ class Hop_Limit_CC:
 	   	'''
 		if self.number_of_repetitions_done < self.number_of_repetitions: 
 			tmp1 = time.perf_counter() 
-			pkt = IPv6(packet.get_payload())
+			pkt = packet.get_payload()
 			if self.stegotime:
-				if pkt.fl == helper.get_md5_signature_at_indices(self.sent_received_chunks, helper.USED_INDICES_OF_HASH_FLOW_LABEL):
+				signature = header_codec.get_flow_label(pkt)
+				value = self.hop_limit_codec.get(pkt)
+				index = self.reassembly.place(self.sent_received_chunks, signature, value, helper.get_retransmission_key(pkt))
+				if index is not None and self.hop_limit_calibration is not None:
+					self.hop_limit_calibration.add_stego(header_codec.get_hop_limit(pkt))
+				if index == self.sent_received_chunks:
 					if self.sent_received_chunks == 0:
 						self.starttime_stegocommunication = time.perf_counter()
-					if pkt.hlim > 64:
-						self.exfiltrated_data.append('1')
-					else:
-						self.exfiltrated_data.append('0')
-					self.sent_received_chunks += 1
-					if self.consecutive_stego > 0:
-						self.stegotime = self.sent_received_chunks % self.consecutive_stego != 0
+					# The chunk of the segment and the following ones received out of order
+					for value in self.reassembly.pop(self.sent_received_chunks):
+						self.exfiltrated_data.append(value)
+						self.errors.add(value)
+						self.sent_received_chunks += 1
+					# The last stego-packet of a burst is followed by the clean packets
+					index = self.sent_received_chunks - 1
+					self.stegotime = not self.schedule.ends_burst(index)
 			else:
+				if self.hop_limit_calibration is not None:
+					self.calibrate(pkt)
 				self.clean_counter += 1
 				self.stegotime = self.clean_counter % self.consecutive_nonstego == 0
-			if pkt.fl == Hop_Limit_CC.END_SIGNATURE:
+			if header_codec.get_flow_label(pkt) == Hop_Limit_CC.END_SIGNATURE:
 				self.endtime_stegocommunication = time.perf_counter()
 				self.stegotime = True
 				self.number_of_repetitions_done += 1
-				self.statistical_evaluation_received_packets()
-				self.write_csv()
+				summary = reporting.get_repetition_summary(self)
+				self.reporter.submit(self.statistical_evaluation_received_packets, summary)
+				self.reporter.submit(self.write_csv, summary)
+				# All the repetitions are done: the kernel can stop queueing the packets
+				if self.number_of_repetitions_done == self.number_of_repetitions:
+					self.reporter.submit(helper.delete_ip6tables_rule, False)
 				self.injection_exfiltration_time_sum = 0
 				self.sent_received_chunks = 0
 				self.exfiltrated_data = []
+				self.errors.reset()
+				self.reassembly.reset()
 					
 			if self.sent_received_chunks != 0:
 				self.injection_exfiltration_time_sum += time.perf_counter() - tmp1				
 		packet.accept()
-	
-	def write_csv(self):
-		
-		filename="hop_limit_cc_" + self.filepath.replace("../", "", 1) + "_role_" + self.role + "_clean_packets_" + str(self.consecutive_nonstego) + "_number_stegopackets_" + str(self.consecutive_stego) + ".csv"
-		csv_file = Path(filename)
-		file_existed=csv_file.is_file()
 
-		with open(filename, 'a', newline='') as file:
-			writer = csv.writer(file)
+	def calibrate(self, pkt):
+		'''
+		Adds the hop limit of a clean packet to the calibration of the receiver, unless the packet carries the signature of the last stego-packet:
+		it is one of the other segments of a GSO packet, which carry the same mark.
+		:param pkt: The raw IPv6 packet.
+		'''
+		if self.sent_received_chunks == 0 or header_codec.get_flow_label(pkt) != self.schedule.get_signature(self.sent_received_chunks - 1):
+			self.hop_limit_calibration.add(header_codec.get_hop_limit(pkt))
 
-			if not file_existed:
-				if self.role == 'sender':
-					writer.writerow(["Sent Chunks (Packets)", "Duration of Stegocommunication (ms)", "Average Injection Time (ms)", "Bandwidth (bits/s)"])
-				else:
-					writer.writerow(["Received Chunks (Packets)", "Duration of Stegocommunication (ms)", "Average Exfiltration Time (ms)", "Bandwith (bits/s)", "Failures", "Error Rate (Failures/Packet)", "Successfully transmitted Message (%)"])
-			
-			if self.role == 'sender':
-				writer.writerow([self.sent_received_chunks, \
-					round((self.endtime_stegocommunication - self.starttime_stegocommunication) * 1000, 2), \
-					round((self.injection_exfiltration_time_sum / self.sent_received_chunks) * 1000, 2), \
-					round(self.sent_received_chunks / (self.endtime_stegocommunication - self.starttime_stegocommunication), 2)])  			
-			else:
-				failures = 0
-				index_first_failure = -1 
-
-				# Count the failures
-				if len(self.exfiltrated_data) <= len(self.chunks):
-					for x in range(len(self.exfiltrated_data)):
-						if self.exfiltrated_data[x] != self.chunks[x]:
-							failures += 1
-				else:
-					for x in range(len(self.chunks)):
-						if self.exfiltrated_data[x] != self.chunks[x]:
-							failures += 1
-				failures += abs(len(self.exfiltrated_data) - len(self.chunks))
-
-				if failures != 0:
-					# Receive less than expected => first failure can happen in the middle or after the last index
-					if len(self.exfiltrated_data) < len(self.chunks):
-						for x in range(len(self.exfiltrated_data)):
-							if self.exfiltrated_data[x] != self.chunks[x]:
-								index_first_failure = x
-								break
-						if index_first_failure == -1:
-							index_first_failure = len(self.exfiltrated_data)
-					# Receive exactly the amount which is expected => index must be in the middle
-					elif len(self.exfiltrated_data) == len(self.chunks):
-						for x in range(len(self.chunks)):
-							if self.exfiltrated_data[x] != self.chunks[x]:
-								index_first_failure = x
-								break
-					else:
-					# Receive more than expected => first failure can happen in the middle or after the last index
-						for x in range(len(self.chunks)):
-							if self.exfiltrated_data[x] != self.chunks[x]:
-								index_first_failure = x
-								break
-						if index_first_failure == -1:
-							index_first_failure = len(self.chunks)
-
-				if index_first_failure == -1:
-					index_first_failure = self.sent_received_chunks
-					
-				writer.writerow([self.sent_received_chunks, \
-					round((self.endtime_stegocommunication - self.starttime_stegocommunication) * 1000, 2), \
-					round((self.injection_exfiltration_time_sum / self.sent_received_chunks) * 1000, 2), \
-					round(self.sent_received_chunks / (self.endtime_stegocommunication - self.starttime_stegocommunication), 2), \
-					failures, \
-					round(failures/len(self.chunks), 2), \
-					round((index_first_failure/self.sent_received_chunks) * 100, 2)])
+	def write_csv(self, summary):
+		
+		filename="hop_limit_cc_" + self.filepath.replace("../", "", 1) + "_role_" + self.role + "_clean_packets_" + str(self.consecutive_nonstego) + "_number_stegopackets_" + str(self.consecutive_stego) + ".csv"
+		if self.role == 'sender':
+			writer = self.reporter.get_csv_writer(filename, ["Sent Chunks (Packets)", "Duration of Stegocommunication (ms)", "Average Injection Time (ms)", "Bandwidth (bits/s)"])
+		else:
+			writer = self.reporter.get_csv_writer(filename, ["Received Chunks (Packets)", "Duration of Stegocommunication (ms)", "Average Exfiltration Time (ms)", "Bandwith (bits/s)", "Failures", "Error Rate (Failures/Packet)", "Successfully transmitted Message (%)"])
+		
+		if self.role == 'sender':
+			writer.writerow([summary.sent_received_chunks, \
+				round((summary.endtime_stegocommunication - summary.starttime_stegocommunication) * 1000, 2), \
+				round((summary.injection_exfiltration_time_sum / summary.sent_received_chunks) * 1000, 2), \
+				round(self.hop_limit_codec.bits * summary.sent_received_chunks / (summary.endtime_stegocommunication - summary.starttime_stegocommunication), 2)])  			
+		else:
+			failures = summary.failures
+			index_first_failure = summary.index_first_failure
+				
+			writer.writerow([summary.sent_received_chunks, \
+				round((summary.endtime_stegocommunication - summary.starttime_stegocommunication) * 1000, 2), \
+				round((summary.injection_exfiltration_time_sum / summary.sent_received_chunks) * 1000, 2), \
+				round(self.hop_limit_codec.bits * summary.sent_received_chunks / (summary.endtime_stegocommunication - summary.starttime_stegocommunication), 2), \
+				failures, \
+				round(failures/summary.number_of_chunks, 2), \
+				round((index_first_failure/summary.sent_received_chunks) * 100, 2)])
 
 
 	def start_sending(self):
@@ -239,23 +269,27 @@ class Hop_Limit_CC:
 	   	If the user press Ctrl + cthe inject method is unbind.  
 	   	'''
 		self.nfqueue.bind(helper.NETFILTER_QUEUE_NUMBER, self.inject)
+		if self.gso_mtu:
+			async_queue.enable_gso(self.nfqueue, helper.NETFILTER_QUEUE_NUMBER)
 		try:
 			self.nfqueue.run()
 		except KeyboardInterrupt:
 			print("The exfiltration is stopped.")
 		self.nfqueue.unbind()
+		self.reporter.close()
 
 	def start_receiving(self):
 		'''
 	   	Binds the exfiltrate method to the netfilter queue with its specific number and runs the callback function. 
 	   	If the user press Ctrl + c the inject method is unbind.  
 	   	'''
-		self.nfqueue.bind(helper.NETFILTER_QUEUE_NUMBER, self.exfiltrate)
+		self.nfqueue.bind(helper.NETFILTER_QUEUE_NUMBER, self.exfiltrate, range=helper.HEADER_COPY_RANGE)
 		try:
 			self.nfqueue.run()
 		except KeyboardInterrupt:
 			print("The exfiltration is stopped.")
 		self.nfqueue.unbind()
+		self.reporter.close()
 
 
 	def print_start_message(self):
@@ -265,8 +299,16 @@ class Hop_Limit_CC:
 		else:
 			print('########## Mode: Reliable Marking | CC: Hop Limit | Side: Covert Receiver ##########')
 		print('- Number of Repetitions: ' + str(self.number_of_repetitions))		
+		if isinstance(self.nfqueue, striping.Stripe_Sessions):
+			print('- Stripes: ' + str(len(self.nfqueue.weights)) + ' (weights: ' + ','.join(str(x) for x in self.nfqueue.weights) + ')')
+		elif isinstance(self.nfqueue, flow_sessions.Flow_Sessions):
+			print('- Flow Sessions: up to ' + str(self.nfqueue.max_flows) + ' (idle timeout: ' + str(self.nfqueue.idle_timeout) + ' s)')
 		print('- Signature in field: Flow Label')			
+		print('- Signature Scheme: ' + self.signature_scheme + (' (cached)' if self.signature_cache else ''))
 		print('- Exfiltrated File: ' + self.filepath)
+		print('- Hop Limit Levels: ' + str(self.hop_limit_codec.levels) + ' (' + str(self.hop_limit_codec.bits) + ' bits per stego-packet, offsets: ' + ', '.join(str(x) for x in self.hop_limit_codec.level_offsets) + ')')
+		if self.role == "receiver":
+			print('- Hop Limit Baseline: ' + str(self.hop_limit_codec.baseline) + (' (learnt from the last ' + str(self.hop_limit_calibration.window) + ' packets)' if self.hop_limit_calibration is not None else ' (fixed)'))
 		if self.consecutive_nonstego > 0 and self.consecutive_stego > 0:
 			buf = ""
 			for x in range(2):
@@ -278,6 +320,13 @@ class Hop_Limit_CC:
 			print('- Length Stego Packets: ' + str(self.consecutive_stego))		
 			print('  ==> Packet Pattern (S=stego, C=clean): ' + buf + "...")	
 		print('- Number of Chunks: ' + str(len(self.chunks)))	
+		print('- Schedule Build Time: ' + str(round(self.schedule.build_time * 1000, 2)) + ' ms')
+		if self.role == "sender" and self.gso_mtu:
+			print('- GSO: negotiated with the queue, segments of ' + str(self.gso_mtu) + ' bytes MTU')
+		if self.role == "sender":
+			print('- Retransmission Window: ' + str(self.retransmissions.window) + ' bytes')
+		elif self.reassembly.window.size > 0:
+			print('- Reorder Window: ' + str(self.reassembly.window.size) + ' signatures')
 		if self.role == "sender":
 			print('########## Mode: Reliable Marking | CC: Hop Limit | Side: Covert Sender ##########')
 		else:
@@ -291,72 +340,39 @@ class Hop_Limit_CC:
 			print('Stop exfiltration with CTRL+C...')
 		print('')
 
-	def statistical_evaluation_sent_packets(self):
+	def statistical_evaluation_sent_packets(self, summary):
 		
 		print('')
 		print('##################### ANALYSIS SENT DATA #####################')
-		print("- Number of Repetitions: " + str(self.number_of_repetitions_done) + "/" + str(self.number_of_repetitions))
-		print("- Sent stego-packets: " + str(self.sent_received_chunks) + "/" + str(len(self.chunks)))
-		print("- Duration: " + str(round((self.endtime_stegocommunication - self.starttime_stegocommunication) * 1000, 2)) + " ms")
-		print("- Average Injection Time: " + str(round((self.injection_exfiltration_time_sum / self.sent_received_chunks) * 1000, 2)) + " ms")
-		print("- Average Bandwidth: " + str(round(self.sent_received_chunks / (self.endtime_stegocommunication - self.starttime_stegocommunication), 2)) + " bits/s")
+		print("- Number of Repetitions: " + str(summary.number_of_repetitions_done) + "/" + str(self.number_of_repetitions))
+		print("- Sent stego-packets: " + str(summary.sent_received_chunks) + "/" + str(summary.number_of_chunks))
+		print("- Duration: " + str(round((summary.endtime_stegocommunication - summary.starttime_stegocommunication) * 1000, 2)) + " ms")
+		print("- Average Injection Time: " + str(round((summary.injection_exfiltration_time_sum / summary.sent_received_chunks) * 1000, 2)) + " ms")
+		print("- Average Bandwidth: " + str(round(self.hop_limit_codec.bits * summary.sent_received_chunks / (summary.endtime_stegocommunication - summary.starttime_stegocommunication), 2)) + " bits/s")
 		#print("- Injected data == Chunks: " + str(self.exfiltrated_data == self.chunks))
-		print("- Number of stego-packets retransmitted: " + str(self.count_stego_retransmissions))
+		print("- Number of stego-packets retransmitted: " + str(summary.count_stego_retransmissions))
+		if self.gso_mtu:
+			print("- Stego-segments on the wire: " + str(summary.stego_segments))
 		print('##################### ANALYSIS SENT DATA #####################')
 		print('')
 
-	def statistical_evaluation_received_packets(self):
-		failures = 0
-		index_first_failure = -1 
-
-		# Count the failures
-		if len(self.exfiltrated_data) <= len(self.chunks):
-			for x in range(len(self.exfiltrated_data)):
-				if self.exfiltrated_data[x] != self.chunks[x]:
-					failures += 1
-		else:
-			for x in range(len(self.chunks)):
-				if self.exfiltrated_data[x] != self.chunks[x]:
-					failures += 1
-		failures += abs(len(self.exfiltrated_data) - len(self.chunks))
-
-		if failures != 0:
-			# Receive less than expected => first failure can happen in the middle or after the last index
-			if len(self.exfiltrated_data) < len(self.chunks):
-				for x in range(len(self.exfiltrated_data)):
-					if self.exfiltrated_data[x] != self.chunks[x]:
-						index_first_failure = x
-						break
-				if index_first_failure == -1:
-					index_first_failure = len(self.exfiltrated_data)
-			# Receive exactly the amount which is expected => index must be in the middle
-			elif len(self.exfiltrated_data) == len(self.chunks):
-				for x in range(len(self.chunks)):
-					if self.exfiltrated_data[x] != self.chunks[x]:
-						index_first_failure = x
-						break
-			else:
-			# Receive more than expected => first failure can happen in the middle or after the last index
-				for x in range(len(self.chunks)):
-					if self.exfiltrated_data[x] != self.chunks[x]:
-						index_first_failure = x
-						break
-				if index_first_failure == -1:
-					index_first_failure = len(self.chunks)
-
-		if index_first_failure == -1:
-			index_first_failure = self.sent_received_chunks
+	def statistical_evaluation_received_packets(self, summary):
+		failures = summary.failures
+		index_first_failure = summary.index_first_failure
 
 		print('')
 		print('##################### ANALYSIS RECEIVED DATA #####################')
-		print("- Number of Repetitions: " + str(self.number_of_repetitions_done) + "/" + str(self.number_of_repetitions))
-		print("- Received stego-packets: " + str(self.sent_received_chunks) + "/" + str(len(self.chunks)))
-		print("- Duration: " + str(round((self.endtime_stegocommunication - self.starttime_stegocommunication) * 1000, 2)) + " ms")
-		print("- Average Exfiltration Time: " + str(round((self.injection_exfiltration_time_sum / self.sent_received_chunks) * 1000, 2)) + " ms")
-		print("- Average Bandwidth: " + str(round(self.sent_received_chunks / (self.endtime_stegocommunication - self.starttime_stegocommunication), 2)) + " bits/s")
+		print("- Number of Repetitions: " + str(summary.number_of_repetitions_done) + "/" + str(self.number_of_repetitions))
+		print("- Received stego-packets: " + str(summary.sent_received_chunks) + "/" + str(summary.number_of_chunks))
+		print("- Duration: " + str(round((summary.endtime_stegocommunication - summary.starttime_stegocommunication) * 1000, 2)) + " ms")
+		print("- Average Exfiltration Time: " + str(round((summary.injection_exfiltration_time_sum / summary.sent_received_chunks) * 1000, 2)) + " ms")
+		print("- Average Bandwidth: " + str(round(self.hop_limit_codec.bits * summary.sent_received_chunks / (summary.endtime_stegocommunication - summary.starttime_stegocommunication), 2)) + " bits/s")
 		#print("- Exfiltrated data == Chunks: " + str(self.exfiltrated_data == self.chunks) + " (" + str(failures) + " Failures)")
-		print("- Error Rate: " + str(round(failures/len(self.chunks), 2)) + " Failures/Packet")
-		#print("- Successfully transmitted Message: " + str(round((index_first_failure/self.sent_received_chunks) * 100, 2)) + "%")
+		print("- Error Rate: " + str(round(failures/summary.number_of_chunks, 2)) + " Failures/Packet")
+		print("- Bit Errors: " + str(summary.bit_errors))
+		print("- Hop Limit Baseline: " + str(summary.hop_limit_baseline) + " (" + str(helper.get_hop_count(summary.hop_limit_baseline)) + " hops, " + str(summary.hop_limit_recalibrations) + " recalibrations)")
+		print("- Duplicates: " + str(summary.duplicates) + " (stego-packets received out of order: " + str(summary.reordered) + ")")
+		#print("- Successfully transmitted Message: " + str(round((index_first_failure/summary.sent_received_chunks) * 100, 2)) + "%")
 		print('##################### ANALYSIS RECEIVED DATA #####################')
 		print('')
 
@@ -364,55 +380,72 @@ class Hop_Limit_CC:
 		'''
 		Parses the command line arguments for the Covert Channel and returns the settings to run the specific covert channel.
 		'''
-		parser = optparse.OptionParser()
+		parser = helper.get_channel_option_parser(marking=True)
 
 		parser.add_option(
-		'-r',
-		'--role',
-		help='specify the sender or the receiving role of the script: {sender|receiver}',
+		'-v',
+		'--levels',
+		help='specify the number of hop limit levels, a power of 2: each stego-packet carries log2(levels) bits (default: 2)',
+		default=2,
 		action='store',
-		type='string',
-		dest='role')
+		type='int',
+		dest='levels')
 
 		parser.add_option(
-		'-f',
-		'--file',
-		help='specify the file which shall be read and exfiltrated',
+		'-x',
+		'--baseline',
+		help='specify the hop limit of the clean packets at the receiver, until it is learnt from the flow (default: ' + str(header_codec.DEFAULT_HOP_LIMIT_BASELINE) + ')',
+		default=header_codec.DEFAULT_HOP_LIMIT_BASELINE,
 		action='store',
-		type='string',
-		dest='filepath')
+		type='int',
+		dest='baseline')
 
 		parser.add_option(
-		'-p',
-		'--consecutive_nonstego',
-		help='specify the number of clean packets inserted before/after stegopackets (default: 0)',
-		default=0,
+		'-u',
+		'--calibration_window',
+		help='specify the number of the last packets from which the receiver learns the hop limit baseline (default: ' + str(helper.DEFAULT_HOP_LIMIT_CALIBRATION_WINDOW) + ', 0: fixed baseline)',
+		default=helper.DEFAULT_HOP_LIMIT_CALIBRATION_WINDOW,
 		action='store',
 		type='int',
-		dest='consecutive_nonstego')
+		dest='calibration_window')
 
 		parser.add_option(
-		'-l',
-		'--consecutive_stego',
-		help='specify the burst length of stegopackets (default: 0)',
+		'-b',
+		'--retransmission_window',
+		help='specify the maximum number of bytes in flight, after which the sender forgets the signature and the value of a stego-segment (default: the maximum TCP send buffer, net.ipv4.tcp_wmem)',
+		default=None,
+		action='store',
+		type='int',
+		dest='retransmission_window')
+
+		parser.add_option(
+		'-w',
+		'--reorder_window',
+		help='specify the number of signatures following the expected one searched by the receiver for the stego-packets received out of order (default: 0, duplicates only)',
 		default=0,
 		action='store',
 		type='int',
-		dest='consecutive_stego')
+		dest='reorder_window')
 
 		settings, args = parser.parse_args(argv)
 
-		if settings.filepath is None:
-			raise ValueError("ValueError: filepath must be specified!")
+		helper.check_channel_options(settings, marking=True)
 
-		if settings.role not in ["sender", "receiver"]:
-			raise ValueError("ValueError: role can be only sender or receiver!")
+		if settings.levels < 2 or settings.levels & (settings.levels - 1):
+			raise ValueError("ValueError: the number of hop limit levels must be a power of 2!")
+
+		if settings.baseline < 1 or settings.baseline > 255:
+			raise ValueError("ValueError: the hop limit baseline must be between 1 and 255!")
+
+		if settings.calibration_window < 0:
+			raise ValueError("ValueError: the calibration window cannot be negative!")
+
+		if settings.retransmission_window is not None and settings.retransmission_window < 1:
+			raise ValueError("ValueError: the retransmission window must be at least 1 byte!")
+
+		if settings.reorder_window < 0:
+			raise ValueError("ValueError: the reorder window cannot be negative!")
 
-		if settings.consecutive_nonstego != 0 and settings.consecutive_stego == 0 or settings.consecutive_nonstego == 0 and settings.consecutive_stego != 0:
-			print("settings.consecutive_nonstego and settings.consecutive_stego are set to 0!")
-			settings.consecutive_nonstego = 0
-			settings.consecutive_stego = 0
-		
 		return settings, args
 
 	def __str__(self):
@@ -423,12 +456,13 @@ if __name__ == "__main__":
 
 	settings, args = Hop_Limit_CC.process_command_line(sys.argv)
 
-	hop_limit_cc = Hop_Limit_CC(settings.filepath, helper.read_binary_file_and_return_chunks(settings.filepath, 1), settings.role, settings.consecutive_nonstego, settings.consecutive_stego)
+	hop_limit_cc = Hop_Limit_CC(settings.filepath, helper.Chunk_Source(settings.filepath, settings.levels.bit_length() - 1), settings.role, settings.consecutive_nonstego, settings.consecutive_stego, helper.get_channel_options(settings))
 
 	if hop_limit_cc.role == "sender":
-		helper.append_ip6tables_rule(sender=True)
+		helper.append_ip6tables_rule(sender=True, queues=settings.queues, matches=settings.matches)
 	else:
-		helper.append_ip6tables_rule(sender=False)
+		if settings.capture is None:
+			helper.append_ip6tables_rule(sender=False, queues=settings.queues, matches=settings.matches)
 
 	hop_limit_cc.print_start_message()
 	
@@ -0,0 +1,160 @@
+import collections
+import csv
+import queue
+import threading
+import traceback
+from pathlib import Path
+
+# Maximum number of pending reports before the packet callback waits for the reporter thread
+REPORT_QUEUE_SIZE = 64
+# Buffer size of the CSV files kept open by the reporter
+CSV_BUFFER_SIZE = 65536
+
+# Immutable snapshot of a repetition, taken by the packet callback when the repetition ends
+Repetition_Summary = collections.namedtuple('Repetition_Summary', [
+	'number_of_repetitions_done',
+	'sent_received_chunks',
+	'number_of_chunks',
+	'starttime_stegocommunication',
+	'endtime_stegocommunication',
+	'injection_exfiltration_time_sum',
+	'failures',
+	'index_first_failure',
+	'bit_errors',
+	'count_stego_retransmissions',
+	'unstuffed_chunks',
+	'actual_number',
+	'resyncs',
+	'erasures',
+	'duplicates',
+	'reordered',
+	'hop_limit_baseline',
+	'hop_limit_recalibrations',
+	'stego_segments'
+])
+
+def get_repetition_summary(cc):
+	'''
+	Returns the Repetition_Summary of the repetition just ended by the covert channel.
+	:param cc: The covert channel (sender or receiver).
+	'''
+	return Repetition_Summary(
+		cc.number_of_repetitions_done,
+		cc.sent_received_chunks,
+		len(cc.chunks),
+		cc.starttime_stegocommunication,
+		cc.endtime_stegocommunication,
+		cc.injection_exfiltration_time_sum,
+		cc.errors.get_failures(),
+		cc.errors.get_index_first_failure(cc.sent_received_chunks),
+		cc.errors.bit_errors,
+		getattr(cc, 'count_stego_retransmissions', 0),
+		len(cc.unstuffer.data) if hasattr(cc, 'unstuffer') else 0,
+		getattr(cc, 'actual_number', 0),
+		getattr(cc, 'resyncs', 0),
+		cc.errors.erasures,
+		cc.reassembly.duplicates if hasattr(cc, 'reassembly') else 0,
+		cc.reassembly.reordered if hasattr(cc, 'reassembly') else 0,
+		cc.hop_limit_codec.baseline if hasattr(cc, 'hop_limit_codec') else None,
+		cc.hop_limit_calibration.recalibrations if getattr(cc, 'hop_limit_calibration', None) is not None else 0,
+		getattr(cc, 'stego_segments', 0))
+
+class Reporter:
+
+	def __init__(self, queue_size=REPORT_QUEUE_SIZE, buffer_size=CSV_BUFFER_SIZE):
+		'''
+		Runs the reports of the covert channels (statistics printing and CSV rows) in a background thread,
+		so the netfilter callback only enqueues them. The CSV files are kept open and buffered.
+		:param queue_size: The maximum number of pending reports.
+		:param buffer_size: The buffer size of the CSV files.
+		'''
+		self.queue = queue.Queue(queue_size)
+		self.buffer_size = buffer_size
+		self.csv_files = {}
+		self.thread = threading.Thread(target=self.run, daemon=True)
+		self.thread.start()
+
+	def submit(self, function, *args):
+		'''
+		Enqueues the call function(*args). Waits only if queue_size reports are already pending.
+		'''
+		self.queue.put((function, args))
+
+	def run(self):
+		while True:
+			report = self.queue.get()
+			if report is None:
+				break
+			function, args = report
+			try:
+				function(*args)
+			except Exception:
+				traceback.print_exc()
+			# Nothing else to do: write the buffered rows
+			if self.queue.empty():
+				self.flush()
+
+	def get_csv_writer(self, filename, header):
+		'''
+		Returns the csv.writer of the file, opened once in append mode. The header is written if the file is new.
+		'''
+		if filename not in self.csv_files:
+			file_existed = Path(filename).is_file()
+			file = open(filename, 'a', newline='', buffering=self.buffer_size)
+			writer = csv.writer(file)
+			if not file_existed:
+				writer.writerow(header)
+			self.csv_files[filename] = (file, writer)
+		return self.csv_files[filename][1]
+
+	def flush(self):
+		for file, writer in self.csv_files.values():
+			file.flush()
+
+	def close(self):
+		'''
+		Waits for the pending reports and closes the CSV files.
+		'''
+		self.queue.put(None)
+		self.thread.join()
+		self.close_files()
+
+	def close_files(self):
+		for file, writer in self.csv_files.values():
+			file.close()
+		self.csv_files = {}
+
+class Loop_Reporter(Reporter):
+
+	def __init__(self, loop, buffer_size=CSV_BUFFER_SIZE):
+		'''
+		Runs the reports as callbacks of the asyncio event loop driving the covert channel (see async_queue.Async_Queue) 
+		instead of in a thread: they run once the packets already received are handled.
+		:param loop: The running event loop.
+		:param buffer_size: The buffer size of the CSV files.
+		'''
+		self.loop = loop
+		self.buffer_size = buffer_size
+		self.csv_files = {}
+		self.reports = collections.deque()
+
+	def submit(self, function, *args):
+		if not self.reports:
+			self.loop.call_soon(self.run_reports)
+		self.reports.append((function, args))
+
+	def run_reports(self):
+		while self.reports:
+			function, args = self.reports.popleft()
+			try:
+				function(*args)
+			except Exception:
+				traceback.print_exc()
+		self.flush()
+
+	def close(self):
+		'''
+		Runs the reports left by a stopped event loop and closes the CSV files.
+		'''
+		self.run_reports()
+		self.close_files()
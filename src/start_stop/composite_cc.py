@@ -0,0 +1,391 @@
+from netfilterqueue import NetfilterQueue
+import sys
+import time
+sys.path.insert(1, '../')
+import helper
+import header_codec
+import reporting
+import multi_queue
+import async_queue
+import packet_capture
+import flow_sessions
+
+class Composite_CC:
+
+	#-------------- MAGIC VALUES --------------#
+	def get_magic_values(codec):
+		'''
+		Returns the start and the end magic values of the fields of the codec: their two largest chunks (as 1048575 and 1048574 in the Flow Label cc).
+		'''
+		return (1 << codec.field_length_in_bits) - 1, (1 << codec.field_length_in_bits) - 2
+	#-------------- MAGIC VALUES --------------#
+
+	def __init__(self, chunks, role, consecutive_nonstego, consecutive_stego, codec, options=helper.Channel_Options()):
+		'''
+		Constructor for sender and receiver of a composite cc, which carries each chunk in several fields of the same packet.
+		:param chunks: An array of integers containing the message to hide splitted in chunks.
+		:param role: The role (i.e., sender or receiver) assigned.
+		:param consecutive_nonstego: The length of the burst of non-stego packets.
+		:param consecutive_stego: The lenght of the burst of stego packets
+		:param codec: The header_codec.Composite_Codec packing the chunks into the fields.
+		:param options: The helper.Channel_Options of the queue, the signatures, the covert sessions and the codec.
+		'''
+		self.chunks = chunks
+		self.codec = codec
+		self.start_magic_value, self.end_magic_value = Composite_CC.get_magic_values(codec)
+		
+		self.sent_received_chunks = 0
+		if options.queues > 1:
+			self.nfqueue = multi_queue.Queue_Workers(self, options.queues)
+		elif options.event_loop:
+			self.nfqueue = async_queue.Async_Queue(self, options.control_port)
+		elif options.capture is not None:
+			self.nfqueue = packet_capture.Packet_Capture(options.capture)
+		else:
+			self.nfqueue = NetfilterQueue()
+		if options.flows > 0 or options.queues > 1:
+			self.nfqueue = flow_sessions.Flow_Sessions(self, self.nfqueue, options.flows or flow_sessions.DEFAULT_MAX_FLOWS, options.idle_timeout)
+		self.exfiltrated_data = []
+		self.errors = helper.Error_Accumulator(self.chunks)
+		self.reporter = reporting.Reporter()
+		self.sent_packets = 0
+		self.received_packets = 0
+		self.role = role
+		self.first_packet = True
+		self.start_exf = False
+		self.unstuffer = helper.Character_Unstuffer(self.end_magic_value, codec.field_length_in_bits)
+		self.separate_test = False
+
+		self.number_of_repetitions = 10
+		self.number_of_repetitions_done = 0
+
+		self.consecutive_nonstego = consecutive_nonstego
+		self.consecutive_stego = consecutive_stego
+		self.stegotime = True
+		self.clean_counter = 0
+
+		# ------------------- MEASUREMENT VARIABLES ------------------- #
+		self.starttime_stegocommunication = 0.0
+		self.endtime_stegocommunication = 0.0
+		self.injection_exfiltration_time_sum = 0.0
+
+	def exfiltrate(self, packet):
+		'''
+	   	The exfiltration method of the receiver, which is bound the the netfilter queue NETFILTERQUEUE_NUMBER.
+	   	This method extracts the value contained into the targeted field, accordingly to the sending mode used 
+	   	(i.e., interleaved or burst).
+	   	:param Packet packet: The NetfilterQueue Packet object.
+	   	'''
+		if self.number_of_repetitions_done < self.number_of_repetitions:
+			
+			if self.start_exf and self.stegotime: 
+				tmp1 = time.perf_counter()
+			
+			pkt = packet.get_payload()
+			value = self.codec.get(pkt)
+			
+			if not self.start_exf:
+				self.start_exf = value == self.start_magic_value
+				if self.start_exf:
+					self.starttime_stegocommunication = time.perf_counter()
+
+			# Exfiltration started
+			else:
+				# If the previous packet was an escape sequence
+				if self.stegotime:
+					if self.unstuffer.escape_pending:
+						# if the current packet is the end value => exfiltrate
+						if self.unstuffer.push(value):
+							self.exfiltrated_data.append(value)
+							self.errors.add(self.exfiltrated_data[-1])
+							self.sent_received_chunks += 1
+							# The escaped value is a stego-packet of the burst too (frequent with few bits per packet)
+							if self.consecutive_stego > 0:
+								self.stegotime = self.sent_received_chunks % self.consecutive_stego != 0
+						# The previous packet gets interpreted as end value => stop exfiltration
+						else:
+							# Stop the Exfiltration
+							self.start_exf = False
+							self.endtime_stegocommunication = time.perf_counter()
+							# Erase the Ending Value
+							self.exfiltrated_data = self.exfiltrated_data[:-1]
+							self.errors.remove_last()
+							self.sent_received_chunks -= 1
+							self.injection_exfiltration_time_sum += time.perf_counter() - tmp1
+							self.number_of_repetitions_done += 1
+							summary = reporting.get_repetition_summary(self)
+							self.reporter.submit(self.statistical_evaluation_received_packets, summary)
+							self.reporter.submit(self.write_csv, summary)
+							# All the repetitions are done: the kernel can stop queueing the packets
+							if self.number_of_repetitions_done == self.number_of_repetitions:
+								self.reporter.submit(helper.delete_ip6tables_rule, False)
+							self.received_packets = 0
+							self.sent_received_chunks = 0
+							self.clean_counter = 0
+							self.exfiltrated_data = []
+							self.errors.reset()
+							self.unstuffer.reset()
+							self.stegotime = True
+							self.starttime_stegocommunication = 0.0
+							self.endtime_stegocommunication = 0.0
+							self.injection_exfiltration_time_sum = 0.0
+							if value == self.start_magic_value:
+								self.starttime_stegocommunication = time.perf_counter()
+								self.start_exf = True
+
+					# Previous packet was not an escape sequence or ending value
+					else:
+						# Is an escape sequence detected? (unstuffed incrementally)
+						self.unstuffer.push(value)
+						self.exfiltrated_data.append(value)
+						self.errors.add(self.exfiltrated_data[-1])
+						self.sent_received_chunks += 1
+						if self.consecutive_stego > 0:
+							self.stegotime = self.sent_received_chunks % self.consecutive_stego != 0
+
+					if self.start_exf: 
+						self.injection_exfiltration_time_sum += time.perf_counter() - tmp1
+				
+				else:
+					self.clean_counter += 1
+					self.stegotime = self.clean_counter % self.consecutive_nonstego == 0
+
+		self.received_packets += 1
+		packet.accept()
+
+	def inject(self, packet):
+		'''
+	   	The inject method of the sender, which is bound the the netfilter queue NETFILTERQUEUE_NUMBER.
+	   	This method injects the i-th chunks of the secret message (i.e., self.chunks[self.sent_received_chunks])
+	   	into the targeted field, accordingly to the sending mode used (i.e., interleaved or burst).
+	   	:param Packet packet: The NetfilterQueue Packet object packet.
+	   	'''
+		if self.number_of_repetitions_done < self.number_of_repetitions:
+			if self.stegotime:
+				tmp1 = time.perf_counter()
+				pkt = bytearray(packet.get_payload())
+				if self.sent_received_chunks < len(self.chunks):
+					if self.first_packet:
+						self.starttime_stegocommunication = time.perf_counter()
+						self.codec.set(pkt, self.start_magic_value)
+						self.first_packet = False
+						packet.set_payload(bytes(pkt))
+					else:
+						self.codec.set(pkt, self.chunks[self.sent_received_chunks])
+						self.exfiltrated_data.append(self.codec.get(pkt))
+						self.sent_received_chunks += 1
+						packet.set_payload(bytes(pkt))
+				
+						if self.consecutive_stego > 0:
+							if self.sent_received_chunks % self.consecutive_stego == 0:
+								self.stegotime = False
+							else:
+								self.stegotime = True
+
+					if not self.first_packet:
+						self.injection_exfiltration_time_sum += time.perf_counter() - tmp1
+				else:
+					self.codec.set(pkt, self.end_magic_value)
+					packet.set_payload(bytes(pkt))
+					self.endtime_stegocommunication = time.perf_counter()
+					self.injection_exfiltration_time_sum += time.perf_counter() - tmp1
+					self.number_of_repetitions_done += 1
+					self.first_packet = True
+					summary = reporting.get_repetition_summary(self)
+					self.reporter.submit(self.statistical_evaluation_sent_packets, summary)
+					self.reporter.submit(self.write_csv, summary)
+					# All the repetitions are done: the kernel can stop queueing the packets
+					if self.number_of_repetitions_done == self.number_of_repetitions:
+						self.reporter.submit(helper.delete_ip6tables_rule, True)
+					# The end value is read as one more stego-packet of the burst: if it ends the burst, the clean packets follow it
+					self.stegotime = self.consecutive_stego == 0 or (self.sent_received_chunks + 1) % self.consecutive_stego != 0
+					self.sent_received_chunks = 0
+					self.sent_packets = 0
+					self.clean_counter = 0
+					self.injection_exfiltration_time_sum = 0
+					self.starttime_stegocommunication = 0
+					self.endtime_stegocommunication = 0
+					self.exfiltrated_data = []
+			else:
+				self.clean_counter += 1
+				if self.clean_counter % self.consecutive_nonstego == 0:
+					self.stegotime = True
+					self.clean_counter = 0
+		
+		self.sent_packets += 1
+		packet.accept()
+
+	def start_sending(self):
+		'''
+	   	Binds the inject method to the netfilter queue with its specific number and runs the callback function. 
+	   	If the user press Ctrl + c the inject method is unbind.  
+	   	'''
+		self.nfqueue.bind(helper.NETFILTER_QUEUE_NUMBER, self.inject)
+		try:
+			self.nfqueue.run()
+		except KeyboardInterrupt:
+			print("The injection is stopped.")
+		self.nfqueue.unbind()
+		self.reporter.close()
+
+	def start_receiving(self):
+		'''
+	   	Binds the exfiltrate method to the netfilter queue with its specific number and runs the callback function. 
+	   	If the user press Ctrl + c the inject method is unbind.  
+	   	'''
+		self.nfqueue.bind(helper.NETFILTER_QUEUE_NUMBER, self.exfiltrate, range=helper.HEADER_COPY_RANGE)
+		try:
+			self.nfqueue.run()
+		except KeyboardInterrupt:
+			print("The exfiltration is stopped.")
+		self.nfqueue.unbind()
+		self.reporter.close()
+
+	def write_csv(self, summary):
+		
+		filename="results_composite_" + "_".join(x.replace(" ", "_").lower() for x in self.codec.fields) + "_" + str(summary.number_of_chunks) + "_" + str(self.role) + ".csv"
+		if self.role == 'sender':
+			writer = self.reporter.get_csv_writer(filename, ["Stego-packets sent", "Duration of Stegocommunication (ms)", "Average Injection Time (ms)", "Bandwidth (bits/s)"])
+		else:
+			writer = self.reporter.get_csv_writer(filename, ["Stego-packets received", "Duration of Stegocommunication (ms)", "Average Exfiltration Time (ms)", "Bandwith (bits/s)", "Failures", "Successfully transmitted Message (%)"])
+		
+		if self.role == 'sender':
+			writer.writerow([summary.sent_received_chunks, \
+				round((summary.endtime_stegocommunication - summary.starttime_stegocommunication) * 1000, 2), \
+				round((summary.injection_exfiltration_time_sum / summary.sent_received_chunks) * 1000, 2), \
+				round((self.codec.field_length_in_bits * summary.sent_received_chunks) / (summary.endtime_stegocommunication - summary.starttime_stegocommunication), 2)])  			
+		else:
+			failures = summary.failures
+			index_first_failure = summary.index_first_failure
+				
+			writer.writerow([summary.sent_received_chunks, \
+				round((summary.endtime_stegocommunication - summary.starttime_stegocommunication) * 1000, 2), \
+				round((summary.injection_exfiltration_time_sum / summary.sent_received_chunks) * 1000, 2), \
+				round((self.codec.field_length_in_bits * summary.sent_received_chunks) / (summary.endtime_stegocommunication - summary.starttime_stegocommunication), 2), \
+				round(failures), \
+				round((index_first_failure/summary.sent_received_chunks),2) * 100])
+
+	def print_start_message(self):
+
+		print('')
+		if self.role == "sender":
+			print('########## Mode: Start/Stop | CC: Composite | Side: Covert Sender ##########')
+		else:
+			print('########## Mode: Start/Stop | CC: Composite | Side: Covert Receiver ##########')
+		print('- Number of Repetitions: ' + str(self.number_of_repetitions))		
+		if isinstance(self.nfqueue, flow_sessions.Flow_Sessions):
+			print('- Flow Sessions: up to ' + str(self.nfqueue.max_flows) + ' (idle timeout: ' + str(self.nfqueue.idle_timeout) + ' s)')
+		if self.consecutive_nonstego > 0 and self.consecutive_stego > 0:
+			buf = ""
+			for x in range(2):
+				for y in range(self.consecutive_stego):
+					buf += "S "
+				for y in range(self.consecutive_nonstego):
+					buf += "C "	
+			print('- Length Clean Packets: ' + str(self.consecutive_nonstego))		
+			print('- Length Stego Packets: ' + str(self.consecutive_stego))		
+			print('  ==> Packet Pattern (S=stego, C=clean): ' + buf + "...")		
+		print('- Fields: ' + ' + '.join(x + ' (' + str(header_codec.COMPOSITE_FIELD_LENGTHS_IN_BITS[x]) + ' bits)' for x in self.codec.fields) + ' = ' + str(self.codec.field_length_in_bits) + ' bits per stego-packet')
+		print('- Number of Chunks: ' + str(len(self.chunks)))	
+		if self.role == "sender":
+			print('########## Mode: Start/Stop | CC: Composite | Side: Covert Sender ##########')
+		else:
+			print('########## Mode: Start/Stop | CC: Composite | Side: Covert Receiver ##########')
+		print('')
+		if self.role == "sender":
+			print('Injection in covert channel is started...')
+			print('Stop injection with CTRL+C.')
+		else:
+			print('Exfiltration from covert channel is started...')
+			print('Stop exfiltration with CTRL+C...')
+		print('')
+
+	def statistical_evaluation_sent_packets(self, summary):
+		
+		print('')
+		print('##################### ANALYSIS SENT DATA #####################')
+		print("- Number of Repetitions: " + str(summary.number_of_repetitions_done) + "/" + str(self.number_of_repetitions))
+		print("- Sent stego-packets: " + str(summary.sent_received_chunks) + "/" + str(summary.number_of_chunks))
+		print("- Duration: " + str(round((summary.endtime_stegocommunication - summary.starttime_stegocommunication) * 1000, 2)) + " ms")
+		print("- Average Injection Time: " + str(round((summary.injection_exfiltration_time_sum / summary.sent_received_chunks) * 1000, 2)) + " ms")
+		print("- Average Bandwidth: " + str(round((self.codec.field_length_in_bits * summary.sent_received_chunks) / (summary.endtime_stegocommunication - summary.starttime_stegocommunication), 2)) + " bits/s")
+		#print("- Injected data == Chunks: " + str(self.exfiltrated_data == self.chunks))
+		print('##################### ANALYSIS SENT DATA #####################')
+		print('')
+
+	def statistical_evaluation_received_packets(self, summary):
+		
+		failures = summary.failures
+		index_first_failure = summary.index_first_failure
+		
+		print('')
+		print('##################### ANALYSIS RECEIVED DATA #####################')
+		print("- Number of Repetitions: " + str(summary.number_of_repetitions_done) + "/" + str(self.number_of_repetitions))
+		print("- Received stego-packets: " + str(summary.sent_received_chunks) + "/" + str(summary.number_of_chunks))
+		print("- Duration: " + str(round((summary.endtime_stegocommunication - summary.starttime_stegocommunication) * 1000, 2)) + " ms")
+		print("- Average Exfiltration Time: " + str(round((summary.injection_exfiltration_time_sum / summary.sent_received_chunks) * 1000, 2)) + " ms")
+		print("- Average Bandwidth: " + str(round((self.codec.field_length_in_bits * summary.sent_received_chunks) / (summary.endtime_stegocommunication - summary.starttime_stegocommunication), 2)) + " bits/s")
+		#print("- Exfiltrated data == Chunks: " + str(self.exfiltrated_data == self.chunks) + " (" + str(failures) + " Failures)")
+		print("- Error Rate: " + str(round(failures/summary.sent_received_chunks, 2)) + " Failures/Packet")
+		print("- Bit Errors: " + str(summary.bit_errors))
+		print("- Unstuffed message: " + str(summary.unstuffed_chunks) + " chunks")
+		#print("- Correct % message: " + str(round((index_first_failure/summary.sent_received_chunks) * 100, 2)))
+		print('##################### ANALYSIS RECEIVED DATA #####################')
+		print('')
+
+	def process_command_line(argv):
+		'''
+		Parses the command line arguments for the Covert Channel and returns the settings to run the specific covert channel.
+		'''
+		parser = helper.get_channel_option_parser()
+
+		parser.add_option(
+		'-e',
+		'--fields',
+		help='specify the comma separated fields carrying each chunk, the first one holding its most significant bits: {fl|tc|dscp|hl} (default: fl,dscp,hl)',
+		default=['fl', 'dscp', 'hl'],
+		action='callback',
+		callback=helper.get_comma_separated_args,
+		type='string',
+		dest='fields')
+
+		settings, args = parser.parse_args(argv)
+
+		helper.check_channel_options(settings)
+
+		if any(x not in header_codec.COMPOSITE_FIELD_ABBREVIATIONS for x in settings.fields):
+			raise ValueError("ValueError: the fields can be only fl, tc, dscp or hl!")
+		settings.fields = [header_codec.COMPOSITE_FIELD_ABBREVIATIONS[x] for x in settings.fields]
+
+		# The magic values are the two largest chunks: a single bit cannot hold them and the data
+		if settings.fields == ["Hop Limit"]:
+			raise ValueError("ValueError: the Hop Limit needs another field in the start/stop mode!")
+
+		return settings, args
+
+	def __str__(self):
+		return str(self.__dict__)
+
+if __name__ == "__main__":
+
+	settings, args = Composite_CC.process_command_line(sys.argv)
+	codec = header_codec.Composite_Codec(settings.fields)
+	composite_cc = Composite_CC(helper.read_binary_file_and_return_chunks(settings.filepath, \
+		codec.field_length_in_bits, \
+		character_stuffing=True, \
+		escape_value=Composite_CC.get_magic_values(codec)[1]), \
+		settings.role, settings.consecutive_nonstego, \
+		settings.consecutive_stego, codec, helper.get_channel_options(settings))
+	if composite_cc.role == 'sender':
+		helper.append_ip6tables_rule(sender=True, queues=settings.queues, matches=settings.matches)
+		composite_cc.print_start_message()
+		composite_cc.start_sending()
+		helper.delete_ip6tables_rule(sender=True)
+	elif composite_cc.role == 'receiver':
+		if settings.capture is None:
+			helper.append_ip6tables_rule(sender=False, queues=settings.queues, matches=settings.matches)
+		composite_cc.print_start_message()
+		composite_cc.start_receiving()
+		helper.delete_ip6tables_rule(sender=False)
+
+
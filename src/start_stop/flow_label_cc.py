@@ -1,12 +1,14 @@
 from netfilterqueue import NetfilterQueue
-from scapy.all import *
-import optparse
 import sys
 import time
-import csv
-from pathlib import Path
 sys.path.insert(1, '../')
 import helper
+import header_codec
+import reporting
+import multi_queue
+import async_queue
+import packet_capture
+import flow_sessions
 
 class Flow_Label_CC:
 
@@ -15,26 +17,37 @@ class Flow_Label_CC:
 	END_MAGIC_VALUE = 1048574
 	#-------------- MAGIC VALUES --------------#
 
-	def __init__(self, chunks, role, consecutive_nonstego, consecutive_stego):
+	def __init__(self, chunks, role, consecutive_nonstego, consecutive_stego, options=helper.Channel_Options()):
 		'''
 		Constructor for sender and receiver of a Flow Label cc.
-		:param chunks: A string list containing the message to hide splitted in chunks.
+		:param chunks: An array of integers containing the message to hide splitted in chunks.
 		:param role: The role (i.e., sender or receiver) assigned.
 		:param consecutive_nonstego: The length of the burst of non-stego packets.
 		:param consecutive_stego: The lenght of the burst of stego packets
+		:param options: The helper.Channel_Options of the queue, the signatures, the covert sessions and the codec.
 		'''
 		self.chunks = chunks
-		self.chunks_int = [int(x,2) for x in self.chunks]
 		
 		self.sent_received_chunks = 0
-		self.nfqueue = NetfilterQueue()
+		if options.queues > 1:
+			self.nfqueue = multi_queue.Queue_Workers(self, options.queues)
+		elif options.event_loop:
+			self.nfqueue = async_queue.Async_Queue(self, options.control_port)
+		elif options.capture is not None:
+			self.nfqueue = packet_capture.Packet_Capture(options.capture)
+		else:
+			self.nfqueue = NetfilterQueue()
+		if options.flows > 0 or options.queues > 1:
+			self.nfqueue = flow_sessions.Flow_Sessions(self, self.nfqueue, options.flows or flow_sessions.DEFAULT_MAX_FLOWS, options.idle_timeout)
 		self.exfiltrated_data = []
+		self.errors = helper.Error_Accumulator(self.chunks)
+		self.reporter = reporting.Reporter()
 		self.sent_packets = 0
 		self.received_packets = 0
 		self.role = role
 		self.first_packet = True
 		self.start_exf = False
-		self.dd = False
+		self.unstuffer = helper.Character_Unstuffer(Flow_Label_CC.END_MAGIC_VALUE, helper.IPv6_HEADER_FIELD_LENGTHS_IN_BITS["Flow Label"])
 		self.separate_test = False
 
 		self.number_of_repetitions = 10
@@ -62,10 +75,11 @@ class Flow_Label_CC:
 			if self.start_exf and self.stegotime: 
 				tmp1 = time.perf_counter()
 			
-			pkt = IPv6(packet.get_payload())
+			pkt = packet.get_payload()
+			fl = header_codec.get_flow_label(pkt)
 			
 			if not self.start_exf:
-				self.start_exf = pkt.fl == Flow_Label_CC.START_MAGIC_VALUE
+				self.start_exf = fl == Flow_Label_CC.START_MAGIC_VALUE
 				if self.start_exf:
 					self.starttime_stegocommunication = time.perf_counter()
 
@@ -73,12 +87,11 @@ class Flow_Label_CC:
 			else:
 				# If the previous packet was an escape sequence
 				if self.stegotime:
-					if self.dd:
-						# Unset delimiter detection Flag 
-						self.dd = False
+					if self.unstuffer.escape_pending:
 						# if the current packet is the end value => exfiltrate
-						if pkt.fl == Flow_Label_CC.END_MAGIC_VALUE:
-							self.exfiltrated_data.append(pkt.fl)
+						if self.unstuffer.push(fl):
+							self.exfiltrated_data.append(fl)
+							self.errors.add(self.exfiltrated_data[-1])
 							self.sent_received_chunks += 1
 						# The previous packet gets interpreted as end value => stop exfiltration
 						else:
@@ -87,28 +100,36 @@ class Flow_Label_CC:
 							self.endtime_stegocommunication = time.perf_counter()
 							# Erase the Ending Value
 							self.exfiltrated_data = self.exfiltrated_data[:-1]
+							self.errors.remove_last()
 							self.sent_received_chunks -= 1
 							self.injection_exfiltration_time_sum += time.perf_counter() - tmp1
 							self.number_of_repetitions_done += 1
-							self.statistical_evaluation_received_packets()
-							self.write_csv()
+							summary = reporting.get_repetition_summary(self)
+							self.reporter.submit(self.statistical_evaluation_received_packets, summary)
+							self.reporter.submit(self.write_csv, summary)
+							# All the repetitions are done: the kernel can stop queueing the packets
+							if self.number_of_repetitions_done == self.number_of_repetitions:
+								self.reporter.submit(helper.delete_ip6tables_rule, False)
 							self.received_packets = 0
 							self.sent_received_chunks = 0
 							self.clean_counter = 0
 							self.exfiltrated_data = []
+							self.errors.reset()
+							self.unstuffer.reset()
 							self.stegotime = True
 							self.starttime_stegocommunication = 0.0
 							self.endtime_stegocommunication = 0.0
 							self.injection_exfiltration_time_sum = 0.0
-							if pkt.fl == Flow_Label_CC.START_MAGIC_VALUE:
+							if fl == Flow_Label_CC.START_MAGIC_VALUE:
 								self.starttime_stegocommunication = time.perf_counter()
 								self.start_exf = True
 
 					# Previous packet was not an escape sequence or ending value
 					else:
-						# Is an escape sequence detected?
-						self.dd = pkt.fl == Flow_Label_CC.END_MAGIC_VALUE
-						self.exfiltrated_data.append(pkt.fl)
+						# Is an escape sequence detected? (unstuffed incrementally)
+						self.unstuffer.push(fl)
+						self.exfiltrated_data.append(fl)
+						self.errors.add(self.exfiltrated_data[-1])
 						self.sent_received_chunks += 1
 						if self.consecutive_stego > 0:
 							self.stegotime = self.sent_received_chunks % self.consecutive_stego != 0
@@ -133,16 +154,16 @@ class Flow_Label_CC:
 		if self.number_of_repetitions_done < self.number_of_repetitions:
 			if self.stegotime:
 				tmp1 = time.perf_counter()
-				pkt = IPv6(packet.get_payload())
+				pkt = bytearray(packet.get_payload())
 				if self.sent_received_chunks < len(self.chunks):
 					if self.first_packet:
 						self.starttime_stegocommunication = time.perf_counter()
-						pkt.fl = Flow_Label_CC.START_MAGIC_VALUE
+						header_codec.set_flow_label(pkt, Flow_Label_CC.START_MAGIC_VALUE)
 						self.first_packet = False
 						packet.set_payload(bytes(pkt))
 					else:
-						pkt.fl = int(self.chunks[self.sent_received_chunks], 2)
-						self.exfiltrated_data.append(pkt.fl)
+						header_codec.set_flow_label(pkt, self.chunks[self.sent_received_chunks])
+						self.exfiltrated_data.append(header_codec.get_flow_label(pkt))
 						self.sent_received_chunks += 1
 						packet.set_payload(bytes(pkt))
 				
@@ -155,14 +176,18 @@ class Flow_Label_CC:
 					if not self.first_packet:
 						self.injection_exfiltration_time_sum += time.perf_counter() - tmp1
 				else:
-					pkt.fl = Flow_Label_CC.END_MAGIC_VALUE
+					header_codec.set_flow_label(pkt, Flow_Label_CC.END_MAGIC_VALUE)
 					packet.set_payload(bytes(pkt))
 					self.endtime_stegocommunication = time.perf_counter()
 					self.injection_exfiltration_time_sum += time.perf_counter() - tmp1
 					self.number_of_repetitions_done += 1
 					self.first_packet = True
-					self.statistical_evaluation_sent_packets()
-					self.write_csv()
+					summary = reporting.get_repetition_summary(self)
+					self.reporter.submit(self.statistical_evaluation_sent_packets, summary)
+					self.reporter.submit(self.write_csv, summary)
+					# All the repetitions are done: the kernel can stop queueing the packets
+					if self.number_of_repetitions_done == self.number_of_repetitions:
+						self.reporter.submit(helper.delete_ip6tables_rule, True)
 					self.sent_received_chunks = 0
 					self.sent_packets = 0
 					self.stegotime = True
@@ -191,87 +216,44 @@ class Flow_Label_CC:
 		except KeyboardInterrupt:
 			print("The injection is stopped.")
 		self.nfqueue.unbind()
+		self.reporter.close()
 
 	def start_receiving(self):
 		'''
 	   	Binds the exfiltrate method to the netfilter queue with its specific number and runs the callback function. 
 	   	If the user press Ctrl + c the inject method is unbind.  
 	   	'''
-		self.nfqueue.bind(helper.NETFILTER_QUEUE_NUMBER, self.exfiltrate)
+		self.nfqueue.bind(helper.NETFILTER_QUEUE_NUMBER, self.exfiltrate, range=helper.HEADER_COPY_RANGE)
 		try:
 			self.nfqueue.run()
 		except KeyboardInterrupt:
 			print("The exfiltration is stopped.")
 		self.nfqueue.unbind()
+		self.reporter.close()
 
-	def write_csv(self):
+	def write_csv(self, summary):
 		
-		filename="results_flow_label_" + str(len(self.chunks_int)) + "_" + str(self.role) + ".csv"
-		csv_file = Path(filename)
-		file_existed = csv_file.is_file()
-
-		with open(filename, 'a', newline='') as file:
-			writer = csv.writer(file)
-
-			if not file_existed:
-				if self.role == 'sender':
-					writer.writerow(["Stego-packets sent", "Duration of Stegocommunication (ms)", "Average Injection Time (ms)", "Bandwidth (bits/s)"])
-				else:
-					writer.writerow(["Stego-packets received", "Duration of Stegocommunication (ms)", "Average Exfiltration Time (ms)", "Bandwith (bits/s)", "Failures", "Successfully transmitted Message (%)"])
-			
-			if self.role == 'sender':
-				writer.writerow([self.sent_received_chunks, \
-					round((self.endtime_stegocommunication - self.starttime_stegocommunication) * 1000, 2), \
-					round((self.injection_exfiltration_time_sum / self.sent_received_chunks) * 1000, 2), \
-					round((helper.IPv6_HEADER_FIELD_LENGTHS_IN_BITS["Flow Label"] * self.sent_received_chunks) / (self.endtime_stegocommunication - self.starttime_stegocommunication), 2)])  			
-			else:
-				failures = 0
-				index_first_failure = -1 
-
-				# Count the failures
-				if len(self.exfiltrated_data) <= len(self.chunks_int):
-					for x in range(len(self.exfiltrated_data)):
-						if self.exfiltrated_data[x] != self.chunks_int[x]:
-							failures += 1
-				else:
-					for x in range(len(self.chunks_int)):
-						if self.exfiltrated_data[x] != self.chunks_int[x]:
-							failures += 1
-				failures += abs(len(self.exfiltrated_data) - len(self.chunks_int))
-
-				if failures != 0:
-					# Receive less than expected => first failure can happen in the middle or after the last index
-					if len(self.exfiltrated_data) < len(self.chunks_int):
-						for x in range(len(self.exfiltrated_data)):
-							if self.exfiltrated_data[x] != self.chunks_int[x]:
-								index_first_failure = x
-								break
-						if index_first_failure == -1:
-							index_first_failure = len(self.exfiltrated_data)
-					# Receive exactly the amount which is expected => index must be in the middle
-					elif len(self.exfiltrated_data) == len(self.chunks_int):
-						for x in range(len(self.chunks_int)):
-							if self.exfiltrated_data[x] != self.chunks_int[x]:
-								index_first_failure = x
-								break
-					else:
-					# Receive more than expected => first failure can happen in the middle or after the last index
-						for x in range(len(self.chunks_int)):
-							if self.exfiltrated_data[x] != self.chunks_int[x]:
-								index_first_failure = x
-								break
-						if index_first_failure == -1:
-							index_first_failure = len(self.chunks_int)
-
-				if index_first_failure == -1:
-					index_first_failure = self.sent_received_chunks
-					
-				writer.writerow([self.sent_received_chunks, \
-					round((self.endtime_stegocommunication - self.starttime_stegocommunication) * 1000, 2), \
-					round((self.injection_exfiltration_time_sum / self.sent_received_chunks) * 1000, 2), \
-					round((helper.IPv6_HEADER_FIELD_LENGTHS_IN_BITS["Flow Label"] * self.sent_received_chunks) / (self.endtime_stegocommunication - self.starttime_stegocommunication), 2), \
-					round(failures), \
-					round((index_first_failure/self.sent_received_chunks),2) * 100])
+		filename="results_flow_label_" + str(summary.number_of_chunks) + "_" + str(self.role) + ".csv"
+		if self.role == 'sender':
+			writer = self.reporter.get_csv_writer(filename, ["Stego-packets sent", "Duration of Stegocommunication (ms)", "Average Injection Time (ms)", "Bandwidth (bits/s)"])
+		else:
+			writer = self.reporter.get_csv_writer(filename, ["Stego-packets received", "Duration of Stegocommunication (ms)", "Average Exfiltration Time (ms)", "Bandwith (bits/s)", "Failures", "Successfully transmitted Message (%)"])
+		
+		if self.role == 'sender':
+			writer.writerow([summary.sent_received_chunks, \
+				round((summary.endtime_stegocommunication - summary.starttime_stegocommunication) * 1000, 2), \
+				round((summary.injection_exfiltration_time_sum / summary.sent_received_chunks) * 1000, 2), \
+				round((helper.IPv6_HEADER_FIELD_LENGTHS_IN_BITS["Flow Label"] * summary.sent_received_chunks) / (summary.endtime_stegocommunication - summary.starttime_stegocommunication), 2)])  			
+		else:
+			failures = summary.failures
+			index_first_failure = summary.index_first_failure
+				
+			writer.writerow([summary.sent_received_chunks, \
+				round((summary.endtime_stegocommunication - summary.starttime_stegocommunication) * 1000, 2), \
+				round((summary.injection_exfiltration_time_sum / summary.sent_received_chunks) * 1000, 2), \
+				round((helper.IPv6_HEADER_FIELD_LENGTHS_IN_BITS["Flow Label"] * summary.sent_received_chunks) / (summary.endtime_stegocommunication - summary.starttime_stegocommunication), 2), \
+				round(failures), \
+				round((index_first_failure/summary.sent_received_chunks),2) * 100])
 
 	def print_start_message(self):
 
@@ -281,6 +263,8 @@ class Flow_Label_CC:
 		else:
 			print('########## Mode: Start/Stop | CC: Flow Label | Side: Covert Receiver ##########')
 		print('- Number of Repetitions: ' + str(self.number_of_repetitions))		
+		if isinstance(self.nfqueue, flow_sessions.Flow_Sessions):
+			print('- Flow Sessions: up to ' + str(self.nfqueue.max_flows) + ' (idle timeout: ' + str(self.nfqueue.idle_timeout) + ' s)')
 		if self.consecutive_nonstego > 0 and self.consecutive_stego > 0:
 			buf = ""
 			for x in range(2):
@@ -305,72 +289,36 @@ class Flow_Label_CC:
 			print('Stop exfiltration with CTRL+C...')
 		print('')
 
-	def statistical_evaluation_sent_packets(self):
+	def statistical_evaluation_sent_packets(self, summary):
 		
 		print('')
 		print('##################### ANALYSIS SENT DATA #####################')
-		print("- Number of Repetitions: " + str(self.number_of_repetitions_done) + "/" + str(self.number_of_repetitions))
-		print("- Sent stego-packets: " + str(self.sent_received_chunks) + "/" + str(len(self.chunks_int)))
-		print("- Duration: " + str(round((self.endtime_stegocommunication - self.starttime_stegocommunication) * 1000, 2)) + " ms")
-		print("- Average Injection Time: " + str(round((self.injection_exfiltration_time_sum / self.sent_received_chunks) * 1000, 2)) + " ms")
-		print("- Average Bandwidth: " + str(round((helper.IPv6_HEADER_FIELD_LENGTHS_IN_BITS["Flow Label"] * self.sent_received_chunks) / (self.endtime_stegocommunication - self.starttime_stegocommunication), 2)) + " bits/s")
-		#print("- Injected data == Chunks: " + str(self.exfiltrated_data == self.chunks_int))
+		print("- Number of Repetitions: " + str(summary.number_of_repetitions_done) + "/" + str(self.number_of_repetitions))
+		print("- Sent stego-packets: " + str(summary.sent_received_chunks) + "/" + str(summary.number_of_chunks))
+		print("- Duration: " + str(round((summary.endtime_stegocommunication - summary.starttime_stegocommunication) * 1000, 2)) + " ms")
+		print("- Average Injection Time: " + str(round((summary.injection_exfiltration_time_sum / summary.sent_received_chunks) * 1000, 2)) + " ms")
+		print("- Average Bandwidth: " + str(round((helper.IPv6_HEADER_FIELD_LENGTHS_IN_BITS["Flow Label"] * summary.sent_received_chunks) / (summary.endtime_stegocommunication - summary.starttime_stegocommunication), 2)) + " bits/s")
+		#print("- Injected data == Chunks: " + str(self.exfiltrated_data == self.chunks))
 		print('##################### ANALYSIS SENT DATA #####################')
 		print('')
 
-	def statistical_evaluation_received_packets(self):
+	def statistical_evaluation_received_packets(self, summary):
 		
-		failures = 0
-		index_first_failure = -1 
-
-		# Count the failures
-		if len(self.exfiltrated_data) <= len(self.chunks_int):
-			for x in range(len(self.exfiltrated_data)):
-				if self.exfiltrated_data[x] != self.chunks_int[x]:
-					failures += 1
-		else:
-			for x in range(len(self.chunks_int)):
-				if self.exfiltrated_data[x] != self.chunks_int[x]:
-					failures += 1
-		failures += abs(len(self.exfiltrated_data) - len(self.chunks_int))
-
-		if failures != 0:
-			# Receive less than expected => first failure can happen in the middle or after the last index
-			if len(self.exfiltrated_data) < len(self.chunks_int):
-				for x in range(len(self.exfiltrated_data)):
-					if self.exfiltrated_data[x] != self.chunks_int[x]:
-						index_first_failure = x
-						break
-				if index_first_failure == -1:
-					index_first_failure = len(self.exfiltrated_data)
-			# Receive exactly the amount which is expected => index must be in the middle
-			elif len(self.exfiltrated_data) == len(self.chunks_int):
-				for x in range(len(self.chunks_int)):
-					if self.exfiltrated_data[x] != self.chunks_int[x]:
-						index_first_failure = x
-						break
-			else:
-			# Receive more than expected => first failure can happen in the middle or after the last index
-				for x in range(len(self.chunks_int)):
-					if self.exfiltrated_data[x] != self.chunks_int[x]:
-						index_first_failure = x
-						break
-				if index_first_failure == -1:
-					index_first_failure = len(self.chunks_int)
-
-		if index_first_failure == -1:
-			index_first_failure = self.sent_received_chunks
+		failures = summary.failures
+		index_first_failure = summary.index_first_failure
 		
 		print('')
 		print('##################### ANALYSIS RECEIVED DATA #####################')
-		print("- Number of Repetitions: " + str(self.number_of_repetitions_done) + "/" + str(self.number_of_repetitions))
-		print("- Received stego-packets: " + str(self.sent_received_chunks) + "/" + str(len(self.chunks_int)))
-		print("- Duration: " + str(round((self.endtime_stegocommunication - self.starttime_stegocommunication) * 1000, 2)) + " ms")
-		print("- Average Exfiltration Time: " + str(round((self.injection_exfiltration_time_sum / self.sent_received_chunks) * 1000, 2)) + " ms")
-		print("- Average Bandwidth: " + str(round((helper.IPv6_HEADER_FIELD_LENGTHS_IN_BITS["Flow Label"] * self.sent_received_chunks) / (self.endtime_stegocommunication - self.starttime_stegocommunication), 2)) + " bits/s")
-		#print("- Exfiltrated data == Chunks: " + str(self.exfiltrated_data == self.chunks_int) + " (" + str(failures) + " Failures)")
-		print("- Error Rate: " + str(round(failures/self.sent_received_chunks, 2)) + " Failures/Packet")
-		#print("- Correct % message: " + str(round((index_first_failure/self.sent_received_chunks) * 100, 2)))
+		print("- Number of Repetitions: " + str(summary.number_of_repetitions_done) + "/" + str(self.number_of_repetitions))
+		print("- Received stego-packets: " + str(summary.sent_received_chunks) + "/" + str(summary.number_of_chunks))
+		print("- Duration: " + str(round((summary.endtime_stegocommunication - summary.starttime_stegocommunication) * 1000, 2)) + " ms")
+		print("- Average Exfiltration Time: " + str(round((summary.injection_exfiltration_time_sum / summary.sent_received_chunks) * 1000, 2)) + " ms")
+		print("- Average Bandwidth: " + str(round((helper.IPv6_HEADER_FIELD_LENGTHS_IN_BITS["Flow Label"] * summary.sent_received_chunks) / (summary.endtime_stegocommunication - summary.starttime_stegocommunication), 2)) + " bits/s")
+		#print("- Exfiltrated data == Chunks: " + str(self.exfiltrated_data == self.chunks) + " (" + str(failures) + " Failures)")
+		print("- Error Rate: " + str(round(failures/summary.sent_received_chunks, 2)) + " Failures/Packet")
+		print("- Bit Errors: " + str(summary.bit_errors))
+		print("- Unstuffed message: " + str(summary.unstuffed_chunks) + " chunks")
+		#print("- Correct % message: " + str(round((index_first_failure/summary.sent_received_chunks) * 100, 2)))
 		print('##################### ANALYSIS RECEIVED DATA #####################')
 		print('')
 
@@ -378,55 +326,12 @@ class Flow_Label_CC:
 		'''
 		Parses the command line arguments for the Covert Channel and returns the settings to run the specific covert channel.
 		'''
-		parser = optparse.OptionParser()
-
-		parser.add_option(
-		'-r',
-		'--role',
-		help='specify the sender or the receiving role of the script: {sender|receiver}',
-		action='store',
-		type='string',
-		dest='role')
-
-		parser.add_option(
-		'-f',
-		'--file',
-		help='specify the file which shall be read and exfiltrated',
-		action='store',
-		type='string',
-		dest='filepath')
-
-		parser.add_option(
-		'-p',
-		'--consecutive_nonstego',
-		help='specify the number of clean packets inserted before/after stegopackets (default: 0)',
-		default=0,
-		action='store',
-		type='int',
-		dest='consecutive_nonstego')
-
-		parser.add_option(
-		'-l',
-		'--consecutive_stego',
-		help='specify the burst length of stegopackets (default: 0)',
-		default=0,
-		action='store',
-		type='int',
-		dest='consecutive_stego')
+		parser = helper.get_channel_option_parser()
 
 		settings, args = parser.parse_args(argv)
 
-		if settings.filepath is None:
-			raise ValueError("ValueError: filepath must be specified!")
-
-		if settings.role not in ["sender", "receiver"]:
-			raise ValueError("ValueError: role can be only sender or receiver!")
+		helper.check_channel_options(settings)
 
-		if settings.consecutive_nonstego != 0 and settings.consecutive_stego == 0 or settings.consecutive_nonstego == 0 and settings.consecutive_stego != 0:
-			print("settings.consecutive_nonstego and settings.consecutive_stego are set to 0!")
-			settings.consecutive_nonstego = 0
-			settings.consecutive_stego = 0
-		
 		return settings, args
 
 	def __str__(self):
@@ -440,14 +345,15 @@ if __name__ == "__main__":
 		character_stuffing=True, \
 		escape_value=Flow_Label_CC.END_MAGIC_VALUE), \
 		settings.role, settings.consecutive_nonstego, \
-		settings.consecutive_stego)
+		settings.consecutive_stego, helper.get_channel_options(settings))
 	if flow_label_cc.role == 'sender':
-		helper.append_ip6tables_rule(sender=True)
+		helper.append_ip6tables_rule(sender=True, queues=settings.queues, matches=settings.matches)
 		flow_label_cc.print_start_message()
 		flow_label_cc.start_sending()
 		helper.delete_ip6tables_rule(sender=True)
 	elif flow_label_cc.role == 'receiver':
-		helper.append_ip6tables_rule(sender=False)
+		if settings.capture is None:
+			helper.append_ip6tables_rule(sender=False, queues=settings.queues, matches=settings.matches)
 		flow_label_cc.print_start_message()
 		flow_label_cc.start_receiving()
 		helper.delete_ip6tables_rule(sender=False)
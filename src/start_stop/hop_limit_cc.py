@@ -1,34 +1,48 @@
 from netfilterqueue import NetfilterQueue
-from scapy.all import *
-import optparse
 import sys
 import time
-import csv
-from pathlib import Path
 sys.path.insert(1, '../')
 import helper
+import header_codec
+import reporting
+import multi_queue
+import async_queue
+import packet_capture
+import flow_sessions
 
 class Hop_Limit_CC:
 
 	#-------------- MAGIC VALUES --------------#
+	# Thresholds of the hop limits of the first (255) and of the last (200) packet with no routers on the path (see set_thresholds)
 	START_MAGIC_VALUE = 230
 	END_MAGIC_VALUE = 150
 	#-------------- MAGIC VALUES --------------#
 
-	def __init__(self, chunks, role, consecutive_nonstego, consecutive_stego):
+	def __init__(self, chunks, role, consecutive_nonstego, consecutive_stego, options=helper.Channel_Options()):
 		'''
 		Constructor for sender and receiver of a Hop Limit cc.
-		:param chunks: A string list containing the message to hide splitted in chunks.
+		:param chunks: An array of integers containing the message to hide splitted in chunks.
 		:param role: The role (i.e., sender or receiver) assigned.
 		:param consecutive_nonstego: The length of the burst of non-stego packets.
 		:param consecutive_stego: The lenght of the burst of stego packets
+		:param options: The helper.Channel_Options of the queue, the signatures, the covert sessions and the codec.
 		'''
 		self.chunks = chunks
-		self.chunks_int = [int(x,2) for x in self.chunks]
 
 		self.sent_received_chunks = 0
-		self.nfqueue = NetfilterQueue()
+		if options.queues > 1:
+			self.nfqueue = multi_queue.Queue_Workers(self, options.queues)
+		elif options.event_loop:
+			self.nfqueue = async_queue.Async_Queue(self, options.control_port)
+		elif options.capture is not None:
+			self.nfqueue = packet_capture.Packet_Capture(options.capture)
+		else:
+			self.nfqueue = NetfilterQueue()
+		if options.flows > 0 or options.queues > 1:
+			self.nfqueue = flow_sessions.Flow_Sessions(self, self.nfqueue, options.flows or flow_sessions.DEFAULT_MAX_FLOWS, options.idle_timeout)
 		self.exfiltrated_data = []
+		self.errors = helper.Error_Accumulator(self.chunks)
+		self.reporter = reporting.Reporter()
 		self.sent_packets = 0
 		self.received_packets = 0
 		self.role = role
@@ -39,6 +53,11 @@ class Hop_Limit_CC:
 		self.number_of_repetitions = 20
 		self.number_of_repetitions_done = 0
 		self.hoplimit_delta = 20
+		self.hop_limit_codec = header_codec.Hop_Limit_Codec(2, self.hoplimit_delta, options.hop_limit_baseline)
+		self.hop_limit_calibration = None
+		if role == "receiver" and options.calibration_window > 0:
+			self.hop_limit_calibration = helper.Hop_Limit_Calibration(self.hop_limit_codec, options.calibration_window)
+		self.set_thresholds()
 
 		self.consecutive_nonstego = consecutive_nonstego
 		self.consecutive_stego = consecutive_stego
@@ -59,44 +78,55 @@ class Hop_Limit_CC:
 	   	'''
 		if self.number_of_repetitions_done < self.number_of_repetitions:
 			tmp1 = time.perf_counter()
-			pkt = IPv6(packet.get_payload())
-			if pkt.hlim > Hop_Limit_CC.START_MAGIC_VALUE:
+			pkt = packet.get_payload()
+			hlim = header_codec.get_hop_limit(pkt)
+			if self.hop_limit_codec.baseline != self.threshold_baseline:
+				self.set_thresholds()
+			if hlim > self.start_threshold:
 				self.starttime_stegocommunication = time.perf_counter()
 				self.start_exf = True
-			if pkt.hlim > Hop_Limit_CC.END_MAGIC_VALUE and pkt.hlim < Hop_Limit_CC.START_MAGIC_VALUE:
+			if hlim > self.end_threshold and hlim < self.start_threshold:
 				self.endtime_stegocommunication = time.perf_counter()
 				self.finish_exf = True
 				self.start_exf = False
 				self.number_of_repetitions_done += 1
 				self.injection_exfiltration_time_sum += time.perf_counter() - tmp1
-				self.statistical_evaluation_received_packets()
-				self.write_csv()
+				summary = reporting.get_repetition_summary(self)
+				self.reporter.submit(self.statistical_evaluation_received_packets, summary)
+				self.reporter.submit(self.write_csv, summary)
+				# All the repetitions are done: the kernel can stop queueing the packets
+				if self.number_of_repetitions_done == self.number_of_repetitions:
+					self.reporter.submit(helper.delete_ip6tables_rule, False)
 				self.starttime_stegocommunication = 0.0
 				self.endtime_stegocommunication = 0.0
 				self.injection_exfiltration_time_sum = 0.0
 				self.received_packets = 0
 				self.sent_received_chunks = 0
 				self.exfiltrated_data = []
+				self.errors.reset()
 				self.clean_counter = 0
 				self.stegotime = True
 
-			if self.start_exf and not pkt.hlim > Hop_Limit_CC.START_MAGIC_VALUE:
+			if self.start_exf and not hlim > self.start_threshold:
 				if self.sent_received_chunks == 0 or self.stegotime:
-					hlim = pkt.hlim
-					if hlim > 64 and hlim < 150:
-						self.exfiltrated_data.append(1)
-					else:
-						if hlim < 64:
-							self.exfiltrated_data.append(0)
+					value = self.hop_limit_codec.get(pkt)
+					self.exfiltrated_data.append(value)
+					self.errors.add(value)
+					if self.hop_limit_calibration is not None:
+						self.hop_limit_calibration.add_stego(hlim)
 					self.sent_received_chunks += 1
 					if self.consecutive_stego > 0:
 						if self.sent_received_chunks % self.consecutive_stego == 0:
 							self.stegotime = False
 				else:
+					if self.hop_limit_calibration is not None:
+						self.hop_limit_calibration.add(hlim)
 					self.clean_counter += 1
 					if self.clean_counter % self.consecutive_nonstego == 0:
 						self.stegotime = True
 						self.clean_counter = 0
+			elif not self.start_exf and hlim <= self.end_threshold and self.hop_limit_calibration is not None:
+				self.hop_limit_calibration.add(hlim)
 		
 			if self.start_exf:
 				self.injection_exfiltration_time_sum += time.perf_counter() - tmp1
@@ -105,6 +135,17 @@ class Hop_Limit_CC:
 		packet.accept()
 
 
+	def set_thresholds(self):
+		'''
+		Places the thresholds of the magic values for the hop limit baseline of the receiver: they are lowered by the routers estimated
+		on the path (see helper.get_hop_count), and the end threshold stays above the hop limits of the stego-packets.
+		'''
+		baseline = self.hop_limit_codec.baseline
+		hops = helper.get_hop_count(baseline)
+		self.start_threshold = Hop_Limit_CC.START_MAGIC_VALUE - hops
+		self.end_threshold = max(Hop_Limit_CC.END_MAGIC_VALUE - hops, baseline + 2 * self.hoplimit_delta)
+		self.threshold_baseline = baseline
+
 	def inject(self, packet):
 		'''
 	   	The inject method of the sender, which is bound the the netfilter queue NETFILTERQUEUE_NUMBER.
@@ -114,20 +155,21 @@ class Hop_Limit_CC:
 	   	'''
 		if self.number_of_repetitions_done < self.number_of_repetitions:
 			tmp1 = time.perf_counter()
-			pkt = IPv6(packet.get_payload())
 			if self.sent_received_chunks < len(self.chunks):
 				if self.sent_received_chunks == 0 or self.stegotime:
 					if self.first_packet:
 						self.starttime_stegocommunication = time.perf_counter()
-						pkt.hlim = 255
+						pkt = bytearray(packet.get_payload())
+						header_codec.set_hop_limit(pkt, 255)
 						self.first_packet = False
 						packet.set_payload(bytes(pkt))
 					else:
-						single_bit = int(self.chunks[self.sent_received_chunks], 2)
+						pkt = bytearray(packet.get_payload())
+						single_bit = self.chunks[self.sent_received_chunks]
 						if single_bit == 1:
-							pkt.hlim += self.hoplimit_delta
+							header_codec.set_hop_limit(pkt, header_codec.get_hop_limit(pkt) + self.hoplimit_delta)
 						else:
-							pkt.hlim -= self.hoplimit_delta
+							header_codec.set_hop_limit(pkt, header_codec.get_hop_limit(pkt) - self.hoplimit_delta)
 						self.exfiltrated_data.append(single_bit)
 						self.sent_received_chunks += 1
 						packet.set_payload(bytes(pkt))
@@ -144,14 +186,19 @@ class Hop_Limit_CC:
 						self.clean_counter = 0
 			else:
 				if self.sent_received_chunks == len(self.chunks):
-					pkt.hlim = 200
+					pkt = bytearray(packet.get_payload())
+					header_codec.set_hop_limit(pkt, 200)
 					packet.set_payload(bytes(pkt))
 					self.endtime_stegocommunication = time.perf_counter()
 					self.injection_exfiltration_time_sum += time.perf_counter() - tmp1
 					self.number_of_repetitions_done += 1
 					self.first_packet = True
-					self.statistical_evaluation_sent_packets()
-					self.write_csv()
+					summary = reporting.get_repetition_summary(self)
+					self.reporter.submit(self.statistical_evaluation_sent_packets, summary)
+					self.reporter.submit(self.write_csv, summary)
+					# All the repetitions are done: the kernel can stop queueing the packets
+					if self.number_of_repetitions_done == self.number_of_repetitions:
+						self.reporter.submit(helper.delete_ip6tables_rule, True)
 					self.sent_received_chunks = 0
 					self.sent_packets = 0
 					self.stegotime = True
@@ -179,87 +226,44 @@ class Hop_Limit_CC:
 		except KeyboardInterrupt:
 			print("The injection is stopped.")
 		self.nfqueue.unbind()
+		self.reporter.close()
 
 	def start_receiving(self):
 		'''
 	   	Binds the exfiltrate method to the netfilter queue with its specific number and runs the callback function. 
 	   	If the user press Ctrl + c the inject method is unbind.  
 	   	'''
-		self.nfqueue.bind(helper.NETFILTER_QUEUE_NUMBER, self.exfiltrate)
+		self.nfqueue.bind(helper.NETFILTER_QUEUE_NUMBER, self.exfiltrate, range=helper.HEADER_COPY_RANGE)
 		try:
 			self.nfqueue.run()
 		except KeyboardInterrupt:
 			print("The exfiltration is stopped.")
 		self.nfqueue.unbind()
+		self.reporter.close()
 
-	def write_csv(self):
+	def write_csv(self, summary):
 		
-		filename="results_hop_limit_" + str(len(self.chunks_int)) + "_" + str(self.role) + ".csv"
-		csv_file = Path(filename)
-		file_existed = csv_file.is_file()
-
-		with open(filename, 'a', newline='') as file:
-			writer = csv.writer(file)
+		filename="results_hop_limit_" + str(summary.number_of_chunks) + "_" + str(self.role) + ".csv"
+		if self.role == 'sender':
+			writer = self.reporter.get_csv_writer(filename, ["Stego-packets sent", "Duration of Stegocommunication (ms)", "Average Injection Time (ms)", "Bandwidth (bits/s)"])
+		else:
+			writer = self.reporter.get_csv_writer(filename, ["Stego-packets received", "Duration of Stegocommunication (ms)", "Average Exfiltration Time (ms)", "Bandwith (bits/s)", "Failures", "Successfully transmitted Message (%)"])
+		
+		if self.role == 'sender':
+			writer.writerow([summary.sent_received_chunks, \
+				round((summary.endtime_stegocommunication - summary.starttime_stegocommunication) * 1000, 2), \
+				round((summary.injection_exfiltration_time_sum / summary.sent_received_chunks) * 1000, 2), \
+				round((1 * summary.sent_received_chunks) / (summary.endtime_stegocommunication - summary.starttime_stegocommunication), 2)])  			
+		else:
+			failures = summary.failures
+			index_first_failure = summary.index_first_failure
 
-			if not file_existed:
-				if self.role == 'sender':
-					writer.writerow(["Stego-packets sent", "Duration of Stegocommunication (ms)", "Average Injection Time (ms)", "Bandwidth (bits/s)"])
-				else:
-					writer.writerow(["Stego-packets received", "Duration of Stegocommunication (ms)", "Average Exfiltration Time (ms)", "Bandwith (bits/s)", "Failures", "Successfully transmitted Message (%)"])
-			
-			if self.role == 'sender':
-				writer.writerow([self.sent_received_chunks, \
-					round((self.endtime_stegocommunication - self.starttime_stegocommunication) * 1000, 2), \
-					round((self.injection_exfiltration_time_sum / self.sent_received_chunks) * 1000, 2), \
-					round((1 * self.sent_received_chunks) / (self.endtime_stegocommunication - self.starttime_stegocommunication), 2)])  			
-			else:
-				failures = 0
-				index_first_failure = -1 
-
-				# Count the failures
-				if len(self.exfiltrated_data) <= len(self.chunks_int):
-					for x in range(len(self.exfiltrated_data)):
-						if self.exfiltrated_data[x] != self.chunks_int[x]:
-							failures += 1
-				else:
-					for x in range(len(self.chunks_int)):
-						if self.exfiltrated_data[x] != self.chunks_int[x]:
-							failures += 1
-				failures += abs(len(self.exfiltrated_data) - len(self.chunks_int))
-
-				if failures != 0:
-					# Receive less than expected => first failure can happen in the middle or after the last index
-					if len(self.exfiltrated_data) < len(self.chunks_int):
-						for x in range(len(self.exfiltrated_data)):
-							if self.exfiltrated_data[x] != self.chunks_int[x]:
-								index_first_failure = x
-								break
-						if index_first_failure == -1:
-							index_first_failure = len(self.exfiltrated_data)
-					# Receive exactly the amount which is expected => index must be in the middle
-					elif len(self.exfiltrated_data) == len(self.chunks_int):
-						for x in range(len(self.chunks_int)):
-							if self.exfiltrated_data[x] != self.chunks_int[x]:
-								index_first_failure = x
-								break
-					else:
-					# Receive more than expected => first failure can happen in the middle or after the last index
-						for x in range(len(self.chunks_int)):
-							if self.exfiltrated_data[x] != self.chunks_int[x]:
-								index_first_failure = x
-								break
-						if index_first_failure == -1:
-							index_first_failure = len(self.chunks_int)
-
-				if index_first_failure == -1:
-					index_first_failure = self.sent_received_chunks
-
-				writer.writerow([self.sent_received_chunks, \
-					round((self.endtime_stegocommunication - self.starttime_stegocommunication) * 1000, 2), \
-					round((self.injection_exfiltration_time_sum / self.sent_received_chunks) * 1000, 2), \
-					round((1 * self.sent_received_chunks) / (self.endtime_stegocommunication - self.starttime_stegocommunication), 2), \
-					round(failures), \
-					round((index_first_failure/self.sent_received_chunks),2) * 100])
+			writer.writerow([summary.sent_received_chunks, \
+				round((summary.endtime_stegocommunication - summary.starttime_stegocommunication) * 1000, 2), \
+				round((summary.injection_exfiltration_time_sum / summary.sent_received_chunks) * 1000, 2), \
+				round((1 * summary.sent_received_chunks) / (summary.endtime_stegocommunication - summary.starttime_stegocommunication), 2), \
+				round(failures), \
+				round((index_first_failure/summary.sent_received_chunks),2) * 100])
 
 	def print_start_message(self):
 
@@ -269,6 +273,10 @@ class Hop_Limit_CC:
 		else:
 			print('########## Mode: Start/Stop | CC: Hop Limit | Side: Covert Receiver ##########')
 		print('- Number of Repetitions: ' + str(self.number_of_repetitions))		
+		if isinstance(self.nfqueue, flow_sessions.Flow_Sessions):
+			print('- Flow Sessions: up to ' + str(self.nfqueue.max_flows) + ' (idle timeout: ' + str(self.nfqueue.idle_timeout) + ' s)')
+		if self.role == "receiver":
+			print('- Hop Limit Baseline: ' + str(self.hop_limit_codec.baseline) + (' (learnt from the last ' + str(self.hop_limit_calibration.window) + ' packets)' if self.hop_limit_calibration is not None else ' (fixed)'))
 		if self.consecutive_nonstego > 0 and self.consecutive_stego > 0:
 			buf = ""
 			for x in range(2):
@@ -294,72 +302,36 @@ class Hop_Limit_CC:
 		print('')
 
 
-	def statistical_evaluation_sent_packets(self):
+	def statistical_evaluation_sent_packets(self, summary):
 		
 		print('')
 		print('##################### ANALYSIS SENT DATA #####################')
-		print("- Number of Repetitions: " + str(self.number_of_repetitions_done) + "/" + str(self.number_of_repetitions))
-		print("- Sent stego-packets: " + str(self.sent_received_chunks) + "/" + str(len(self.chunks_int)))
-		print("- Duration: " + str(round((self.endtime_stegocommunication - self.starttime_stegocommunication) * 1000, 2)) + " ms")
-		print("- Average Injection Time: " + str(round((self.injection_exfiltration_time_sum / self.sent_received_chunks) * 1000, 2)) + " ms")
-		print("- Average Bandwidth: " + str(round(self.sent_received_chunks / (self.endtime_stegocommunication - self.starttime_stegocommunication), 2)) + " bits/s")
-		#print("- Injected data == Chunks: " + str(self.exfiltrated_data == self.chunks_int))
+		print("- Number of Repetitions: " + str(summary.number_of_repetitions_done) + "/" + str(self.number_of_repetitions))
+		print("- Sent stego-packets: " + str(summary.sent_received_chunks) + "/" + str(summary.number_of_chunks))
+		print("- Duration: " + str(round((summary.endtime_stegocommunication - summary.starttime_stegocommunication) * 1000, 2)) + " ms")
+		print("- Average Injection Time: " + str(round((summary.injection_exfiltration_time_sum / summary.sent_received_chunks) * 1000, 2)) + " ms")
+		print("- Average Bandwidth: " + str(round(summary.sent_received_chunks / (summary.endtime_stegocommunication - summary.starttime_stegocommunication), 2)) + " bits/s")
+		#print("- Injected data == Chunks: " + str(self.exfiltrated_data == self.chunks))
 		print('##################### ANALYSIS SENT DATA #####################')
 		print('')
 
-	def statistical_evaluation_received_packets(self):
+	def statistical_evaluation_received_packets(self, summary):
 		
-		failures = 0
-		index_first_failure = -1 
-
-		# Count the failures
-		if len(self.exfiltrated_data) <= len(self.chunks_int):
-			for x in range(len(self.exfiltrated_data)):
-				if self.exfiltrated_data[x] != self.chunks_int[x]:
-					failures += 1
-		else:
-			for x in range(len(self.chunks_int)):
-				if self.exfiltrated_data[x] != self.chunks_int[x]:
-					failures += 1
-		failures += abs(len(self.exfiltrated_data) - len(self.chunks_int))
-
-		if failures != 0:
-			# Receive less than expected => first failure can happen in the middle or after the last index
-			if len(self.exfiltrated_data) < len(self.chunks_int):
-				for x in range(len(self.exfiltrated_data)):
-					if self.exfiltrated_data[x] != self.chunks_int[x]:
-						index_first_failure = x
-						break
-				if index_first_failure == -1:
-					index_first_failure = len(self.exfiltrated_data)
-			# Receive exactly the amount which is expected => index must be in the middle
-			elif len(self.exfiltrated_data) == len(self.chunks_int):
-				for x in range(len(self.chunks_int)):
-					if self.exfiltrated_data[x] != self.chunks_int[x]:
-						index_first_failure = x
-						break
-			else:
-			# Receive more than expected => first failure can happen in the middle or after the last index
-				for x in range(len(self.chunks_int)):
-					if self.exfiltrated_data[x] != self.chunks_int[x]:
-						index_first_failure = x
-						break
-				if index_first_failure == -1:
-					index_first_failure = len(self.chunks_int)
-
-		if index_first_failure == -1:
-			index_first_failure = self.sent_received_chunks
+		failures = summary.failures
+		index_first_failure = summary.index_first_failure
 		
 		print('')
 		print('##################### ANALYSIS RECEIVED DATA #####################')
-		print("- Number of Repetitions: " + str(self.number_of_repetitions_done) + "/" + str(self.number_of_repetitions))
-		print("- Received stego-packets: " + str(self.sent_received_chunks) + "/" + str(len(self.chunks_int)))
-		print("- Duration: " + str(round((self.endtime_stegocommunication - self.starttime_stegocommunication) * 1000, 2)) + " ms")
-		print("- Average Exfiltration Time: " + str(round((self.injection_exfiltration_time_sum / self.sent_received_chunks) * 1000, 2)) + " ms")
-		print("- Average Bandwidth: " + str(round(self.sent_received_chunks / (self.endtime_stegocommunication - self.starttime_stegocommunication), 2)) + " bits/s")
-		print("- Error Rate: " + str(round(failures/self.sent_received_chunks, 2)) + " Failures/Packet")
-		#print("- Exfiltrated data == Chunks: " + str(self.exfiltrated_data == self.chunks_int) + " (" + str(failures) + " Failures)")
-		#print("- Correct % message: " + str(round((index_first_failure/self.sent_received_chunks) * 100, 2)))
+		print("- Number of Repetitions: " + str(summary.number_of_repetitions_done) + "/" + str(self.number_of_repetitions))
+		print("- Received stego-packets: " + str(summary.sent_received_chunks) + "/" + str(summary.number_of_chunks))
+		print("- Duration: " + str(round((summary.endtime_stegocommunication - summary.starttime_stegocommunication) * 1000, 2)) + " ms")
+		print("- Average Exfiltration Time: " + str(round((summary.injection_exfiltration_time_sum / summary.sent_received_chunks) * 1000, 2)) + " ms")
+		print("- Average Bandwidth: " + str(round(summary.sent_received_chunks / (summary.endtime_stegocommunication - summary.starttime_stegocommunication), 2)) + " bits/s")
+		print("- Error Rate: " + str(round(failures/summary.sent_received_chunks, 2)) + " Failures/Packet")
+		print("- Bit Errors: " + str(summary.bit_errors))
+		print("- Hop Limit Baseline: " + str(summary.hop_limit_baseline) + " (" + str(helper.get_hop_count(summary.hop_limit_baseline)) + " hops, " + str(summary.hop_limit_recalibrations) + " recalibrations)")
+		#print("- Exfiltrated data == Chunks: " + str(self.exfiltrated_data == self.chunks) + " (" + str(failures) + " Failures)")
+		#print("- Correct % message: " + str(round((index_first_failure/summary.sent_received_chunks) * 100, 2)))
 		print('##################### ANALYSIS RECEIVED DATA #####################')
 		print('')
 
@@ -367,55 +339,36 @@ class Hop_Limit_CC:
 		'''
 		Parses the command line arguments for the Covert Channel and returns the settings to run the specific covert channel.
 		'''
-		parser = optparse.OptionParser()
-
-		parser.add_option(
-		'-r',
-		'--role',
-		help='specify the sender or the receiving role of the script: {sender|receiver}',
-		action='store',
-		type='string',
-		dest='role')
-
-		parser.add_option(
-		'-f',
-		'--file',
-		help='specify the file which shall be read and exfiltrated',
-		action='store',
-		type='string',
-		dest='filepath')
+		parser = helper.get_channel_option_parser()
 
 		parser.add_option(
-		'-p',
-		'--consecutive_nonstego',
-		help='specify the number of clean packets inserted before/after stegopackets (default: 0)',
-		default=0,
+		'-x',
+		'--baseline',
+		help='specify the hop limit of the clean packets at the receiver, until it is learnt from the flow (default: ' + str(header_codec.DEFAULT_HOP_LIMIT_BASELINE) + ')',
+		default=header_codec.DEFAULT_HOP_LIMIT_BASELINE,
 		action='store',
 		type='int',
-		dest='consecutive_nonstego')
+		dest='baseline')
 
 		parser.add_option(
-		'-l',
-		'--consecutive_stego',
-		help='specify the burst length of stegopackets (default: 0)',
-		default=0,
+		'-u',
+		'--calibration_window',
+		help='specify the number of the last packets from which the receiver learns the hop limit baseline (default: ' + str(helper.DEFAULT_HOP_LIMIT_CALIBRATION_WINDOW) + ', 0: fixed baseline)',
+		default=helper.DEFAULT_HOP_LIMIT_CALIBRATION_WINDOW,
 		action='store',
 		type='int',
-		dest='consecutive_stego')
+		dest='calibration_window')
 
 		settings, args = parser.parse_args(argv)
 
-		if settings.filepath is None:
-			raise ValueError("ValueError: filepath must be specified!")
+		helper.check_channel_options(settings)
 
-		if settings.role not in ["sender", "receiver"]:
-			raise ValueError("ValueError: role can be only sender or receiver!")
+		if settings.baseline < 1 or settings.baseline > 255:
+			raise ValueError("ValueError: the hop limit baseline must be between 1 and 255!")
+
+		if settings.calibration_window < 0:
+			raise ValueError("ValueError: the calibration window cannot be negative!")
 
-		if settings.consecutive_nonstego != 0 and settings.consecutive_stego == 0 or settings.consecutive_nonstego == 0 and settings.consecutive_stego != 0:
-			print("settings.consecutive_nonstego and settings.consecutive_stego are set to 0!")
-			settings.consecutive_nonstego = 0
-			settings.consecutive_stego = 0
-		
 		return settings, args
 
 	def __str__(self):
@@ -424,15 +377,16 @@ class Hop_Limit_CC:
 if __name__ == "__main__":
 
 	settings, args = Hop_Limit_CC.process_command_line(sys.argv)
-	hop_limit_cc = Hop_Limit_CC(helper.read_binary_file_and_return_chunks(settings.filepath, 1), settings.role, settings.consecutive_nonstego, settings.consecutive_stego)
+	hop_limit_cc = Hop_Limit_CC(helper.read_binary_file_and_return_chunks(settings.filepath, 1), settings.role, settings.consecutive_nonstego, settings.consecutive_stego, helper.get_channel_options(settings))
 
 	if hop_limit_cc.role == 'sender':
-		helper.append_ip6tables_rule(sender=True)
+		helper.append_ip6tables_rule(sender=True, queues=settings.queues, matches=settings.matches)
 		hop_limit_cc.print_start_message()
 		hop_limit_cc.start_sending()
 		helper.delete_ip6tables_rule(sender=True)
 	elif hop_limit_cc.role == 'receiver':
-		helper.append_ip6tables_rule(sender=False)
+		if settings.capture is None:
+			helper.append_ip6tables_rule(sender=False, queues=settings.queues, matches=settings.matches)
 		hop_limit_cc.print_start_message()
 		hop_limit_cc.start_receiving()
 		helper.delete_ip6tables_rule(sender=False)
@@ -0,0 +1,151 @@
+import time
+import helper
+import header_codec
+import flow_sessions
+
+# Readers of the header fields carrying the signatures of the marking covert channels (the SIGNATURE_FIELD of the channel)
+SIGNATURE_READERS = {
+	"Traffic Class": header_codec.get_traffic_class,
+	"Flow Label": header_codec.get_flow_label
+}
+
+class Stripe_Reporter(flow_sessions.Session_Reporter):
+
+	def __init__(self, flows, session):
+		'''
+		The reporter of the covert session of a stripe: it also hands the summary and the exfiltrated data of each repetition to the 
+		Stripe_Sessions, before the session resets them.
+		:param flows: The Stripe_Sessions.
+		:param session: The covert session of the stripe.
+		'''
+		super().__init__(flows)
+		self.session = session
+
+	def submit(self, function, *args):
+		super().submit(function, *args)
+		if getattr(function, '__name__', None) == 'write_csv':
+			self.flows.add_summary(self.session, args[0])
+
+def get_chunk_values(exfiltrated_data):
+	'''
+	Returns the chunks of the exfiltrated data of a session, whose items are chunks or (chunk, signature) tuples (None: a lost chunk).
+	'''
+	return [x[0] if isinstance(x, tuple) else x for x in exfiltrated_data]
+
+def get_signature_window_size(cc):
+	'''
+	Returns the number of signatures the receiver cc searches after the expected one: its resync window (packet marking) or its reorder window (reliable marking).
+	'''
+	if getattr(cc, 'resync_window', None) is not None:
+		return cc.resync_window.size
+	if hasattr(cc, 'reassembly'):
+		return cc.reassembly.window.size
+	return 0
+
+class Stripe_Sessions(flow_sessions.Flow_Sessions):
+
+	def __init__(self, cc, nfqueue, weights, idle_timeout=flow_sessions.DEFAULT_IDLE_TIMEOUT):
+		'''
+		Used by a marking covert channel cc in place of its NetfilterQueue to split the message over several overt flows.
+		The stego-packets are dealt to one stripe per weight, weights[i] at a time to the i-th one (see helper.get_stripe_indices),
+		and each stripe is sent as an independent covert session (see flow_sessions.Flow_Sessions) on its own flow, so the covert bandwidth
+		adds up over the flows. The stego-packets keep the signatures of their indices in the message: the sender gives the free stripes
+		to the new flows in order, the receiver gives each new flow the free stripe whose first signature, or one of the following ones
+		in the resync (or reorder) window of the channel, it carries. The packets of the flows beyond the stripes are left untouched.
+		When all the stripes end a repetition, their statistics are merged, and the receiver merges their chunks in the order of the message.
+		:param cc: The marking covert channel (with a schedule and a SIGNATURE_FIELD).
+		:param nfqueue: The queue delivering the packets (a NetfilterQueue or async_queue.Async_Queue).
+		:param weights: The weights of the stripes.
+		:param idle_timeout: The seconds without packets after which a flow and its stripe are forgotten.
+		'''
+		super().__init__(cc, nfqueue, len(weights), idle_timeout)
+		self.weights = weights
+		self.stripes = helper.get_stripe_indices(len(cc.schedule), weights)
+		self.schedules = [cc.schedule.select(x, cc.consecutive_stego) for x in self.stripes]
+		self.read_signature = SIGNATURE_READERS[cc.SIGNATURE_FIELD]
+		# The first packet of a flow may follow some lost stego-packets of its stripe, which the session resynchronizes from
+		window = get_signature_window_size(cc)
+		self.windows = [helper.Resync_Window(x, window) for x in self.schedules] if window > 0 else None
+		# Repetition -> {stripe: (Repetition_Summary, chunks)}
+		self.summaries = {}
+		# The message merged from the stripes in the last repetition (receiver)
+		self.merged_data = []
+
+	def run_callback(self, packet):
+		now = time.monotonic()
+		self.expire(now)
+		pkt = packet.get_payload()
+		key = header_codec.get_flow_key(pkt)
+		sessions = self.sessions
+		entry = sessions.get(key)
+		if entry is None:
+			stripe = self.get_free_stripe(pkt)
+			if stripe is None:
+				packet.accept()
+				return
+			entry = sessions[key] = [self.new_stripe_session(stripe), now]
+			self.created += 1
+		else:
+			sessions.move_to_end(key)
+			entry[1] = now
+		getattr(entry[0], self.callback_name)(packet)
+
+	def get_free_stripe(self, pkt):
+		'''
+		Returns the stripe of the new flow whose first packet is pkt, or None if it carries none of them.
+		'''
+		used = {entry[0].stripe for entry in self.sessions.values()}
+		for x in range(len(self.stripes)):
+			if x in used:
+				continue
+			if self.cc.role == "sender":
+				return x
+			signature = self.read_signature(pkt)
+			if signature == self.schedules[x].get_signature(0) or self.windows is not None and self.windows[x].find(signature, 0) is not None:
+				return x
+		return None
+
+	def new_stripe_session(self, stripe):
+		schedule = self.schedules[stripe]
+		session = self.new_session(helper.Stripe(self.cc.chunks, self.stripes[stripe]), schedule)
+		session.stripe = stripe
+		session.reporter = Stripe_Reporter(self, session)
+		# The state following the schedule is built again for the stripe
+		if getattr(session, 'resync_window', None) is not None:
+			session.resync_window = helper.Resync_Window(schedule, session.resync_window.size)
+		if hasattr(session, 'reassembly'):
+			session.reassembly = helper.Reassembly_Buffer(schedule, session.reassembly.window.size, session.reassembly.segments.window)
+		return session
+
+	def add_summary(self, session, summary):
+		stripes = self.summaries.setdefault(summary.number_of_repetitions_done, {})
+		stripes[session.stripe] = (summary, get_chunk_values(session.exfiltrated_data) if self.cc.role == "receiver" else None)
+		if len(stripes) == len(self.stripes):
+			del self.summaries[summary.number_of_repetitions_done]
+			summaries = [stripes[x][0] for x in range(len(self.stripes))]
+			merged = None
+			if self.cc.role == "receiver":
+				merged = self.merged_data = helper.merge_stripes(self.stripes, [stripes[x][1] for x in range(len(self.stripes))])
+			self.cc.reporter.submit(self.statistical_evaluation_stripes, summaries, merged)
+
+	def statistical_evaluation_stripes(self, summaries, merged=None):
+		field_length_in_bits = self.schedules[0].data_modulus.bit_length() - 1
+		start = min(x.starttime_stegocommunication for x in summaries)
+		end = max(x.endtime_stegocommunication for x in summaries)
+		print('')
+		print('##################### ANALYSIS STRIPES #####################')
+		print("- Number of Repetitions: " + str(summaries[0].number_of_repetitions_done) + "/" + str(self.cc.number_of_repetitions))
+		for x, summary in enumerate(summaries):
+			duration = summary.endtime_stegocommunication - summary.starttime_stegocommunication
+			print("- Stripe " + str(x) + " (weight " + str(self.weights[x]) + "): " + str(summary.sent_received_chunks) + "/" + str(summary.number_of_chunks) \
+				+ " stego-packets, " + str(round(field_length_in_bits * summary.sent_received_chunks / duration, 2)) + " bits/s")
+		print("- Stego-packets: " + str(sum(x.sent_received_chunks for x in summaries)) + "/" + str(sum(x.number_of_chunks for x in summaries)))
+		print("- Duration: " + str(round((end - start) * 1000, 2)) + " ms")
+		print("- Aggregate Bandwidth: " + str(round(field_length_in_bits * sum(x.sent_received_chunks for x in summaries) / (end - start), 2)) + " bits/s")
+		if merged is not None:
+			print("- Failures: " + str(sum(x.failures for x in summaries)))
+			wrong = sum(1 for x, y in zip(merged, self.cc.chunks) if x != y)
+			print("- Merged Message: " + str(sum(1 for x in merged if x is not None)) + "/" + str(len(merged)) + " chunks, " + str(wrong) \
+				+ " missing or wrong (merged message == sent message: " + str(wrong == 0) + ")")
+		print('##################### ANALYSIS STRIPES #####################')
+		print('')
@@ -0,0 +1,197 @@
+import struct
+import unittest
+import header_codec
+try:
+	from scapy.all import TCP, bind_layers, split_layers
+	from scapy.layers.ipsec import AH
+except ImportError:
+	TCP = None
+
+def build_packet(next_header=header_codec.NEXT_HEADER_TCP, payload=b'', hop_limit=64, first_word=0x60000000):
+	'''
+	Returns a raw IPv6 packet with the given first word, next header, hop limit and payload (extension headers and upper layer).
+	'''
+	buf = bytearray(header_codec.IPv6_HEADER_LENGTH) + payload
+	struct.pack_into('!IHBB', buf, 0, first_word, len(payload), next_header, hop_limit)
+	return buf
+
+def build_tcp_segment(seq, data=b'', data_offset=5):
+	segment = bytearray(data_offset * 4) + data
+	struct.pack_into('!I', segment, header_codec.TCP_SEQUENCE_OFFSET, seq)
+	segment[header_codec.TCP_DATA_OFFSET_OFFSET] = data_offset << 4
+	return segment
+
+class First_Word_Test(unittest.TestCase):
+
+	def test_fields_are_set_without_touching_the_others(self):
+		buf = build_packet(first_word=0x6fffffff)
+		header_codec.set_flow_label(buf, 0x12345)
+		self.assertEqual(header_codec.get_flow_label(buf), 0x12345)
+		self.assertEqual(header_codec.get_traffic_class(buf), 0xff)
+		header_codec.set_traffic_class(buf, 0xa5)
+		self.assertEqual(header_codec.get_traffic_class(buf), 0xa5)
+		self.assertEqual(header_codec.get_flow_label(buf), 0x12345)
+		header_codec.set_dscp(buf, 0x15)
+		self.assertEqual(header_codec.get_dscp(buf), 0x15)
+		# The ECN bits and the version are kept
+		self.assertEqual(header_codec.get_traffic_class(buf) & 3, 0xa5 & 3)
+		self.assertEqual(buf[0] >> 4, 6)
+
+	def test_values_are_masked(self):
+		buf = build_packet()
+		header_codec.set_flow_label(buf, 0x1fffff)
+		self.assertEqual(header_codec.get_flow_label(buf), 0xfffff)
+		self.assertEqual(header_codec.get_traffic_class(buf), 0)
+
+	def test_hop_limit_is_clamped(self):
+		buf = build_packet(hop_limit=250)
+		header_codec.set_hop_limit(buf, 270)
+		self.assertEqual(header_codec.get_hop_limit(buf), 255)
+		header_codec.set_hop_limit(buf, -3)
+		self.assertEqual(header_codec.get_hop_limit(buf), 0)
+
+class Hop_Limit_Codec_Test(unittest.TestCase):
+
+	def test_levels_are_gray_coded(self):
+		for levels in (2, 4, 8, 16):
+			codec = header_codec.Hop_Limit_Codec(levels)
+			self.assertEqual(sorted(codec.level_values), list(range(levels)))
+			# Adjacent levels differ by a single bit
+			for low, high in zip(codec.level_values, codec.level_values[1:]):
+				self.assertEqual(bin(low ^ high).count('1'), 1)
+			self.assertEqual(codec.level_offsets[0], -codec.delta)
+			self.assertEqual(codec.level_offsets[-1], codec.delta)
+
+	def test_two_levels_raise_or_lower_by_delta(self):
+		codec = header_codec.Hop_Limit_Codec(2, delta=20, baseline=64)
+		self.assertEqual(codec.offsets, [-20, 20])
+		buf = build_packet(hop_limit=64)
+		codec.set(buf, 1)
+		self.assertEqual(header_codec.get_hop_limit(buf), 84)
+		self.assertEqual(codec.get(buf), 1)
+
+	def test_values_are_read_back(self):
+		for levels in (2, 4, 8):
+			codec = header_codec.Hop_Limit_Codec(levels, baseline=100)
+			for value in range(levels):
+				buf = build_packet(hop_limit=100)
+				codec.set(buf, value)
+				self.assertEqual(codec.get(buf), value)
+
+	def test_one_level_off_is_a_single_bit_error(self):
+		codec = header_codec.Hop_Limit_Codec(8, baseline=100)
+		for level in range(1, 8):
+			hop_limit = 100 + codec.level_offsets[level - 1]
+			buf = build_packet(hop_limit=hop_limit)
+			# A packet of this level received with the hop limit of the level below
+			self.assertEqual(bin(codec.get(buf) ^ codec.level_values[level]).count('1'), 1)
+
+	def test_baseline_moves_the_thresholds(self):
+		codec = header_codec.Hop_Limit_Codec(2, baseline=64)
+		buf = build_packet(hop_limit=60)
+		self.assertEqual(codec.get(buf), 0)
+		codec.set_baseline(50)
+		self.assertEqual(codec.get(buf), 1)
+
+	def test_marking_near_the_bounds_is_clamped(self):
+		codec = header_codec.Hop_Limit_Codec(2, delta=20)
+		buf = build_packet(hop_limit=250)
+		codec.set(buf, 1)
+		self.assertEqual(header_codec.get_hop_limit(buf), 255)
+		buf = build_packet(hop_limit=5)
+		codec.set(buf, 0)
+		self.assertEqual(header_codec.get_hop_limit(buf), 0)
+
+	def test_levels_must_be_a_power_of_2(self):
+		self.assertRaises(ValueError, header_codec.Hop_Limit_Codec, 3)
+		self.assertRaises(ValueError, header_codec.Hop_Limit_Codec, 16, 4)
+
+class Composite_Codec_Test(unittest.TestCase):
+
+	def test_chunks_are_read_back(self):
+		codec = header_codec.Composite_Codec(["Flow Label", "DSCP", "Hop Limit"])
+		self.assertEqual(codec.field_length_in_bits, 27)
+		for value in (0, 1, 0x5a5a5a5, (1 << 27) - 1):
+			buf = build_packet(hop_limit=64, first_word=0x60300000)
+			codec.set(buf, value)
+			self.assertEqual(codec.get(buf), value)
+			# The ECN bits are kept
+			self.assertEqual(header_codec.get_traffic_class(buf) & 3, 3)
+
+	def test_first_field_holds_the_most_significant_bits(self):
+		codec = header_codec.Composite_Codec(["Traffic Class", "Flow Label"])
+		buf = build_packet()
+		codec.set(buf, 0xab << 20 | 0x12345)
+		self.assertEqual(header_codec.get_traffic_class(buf), 0xab)
+		self.assertEqual(header_codec.get_flow_label(buf), 0x12345)
+
+	def test_invalid_fields(self):
+		self.assertRaises(ValueError, header_codec.Composite_Codec, [])
+		self.assertRaises(ValueError, header_codec.Composite_Codec, ["Flow Label", "Flow Label"])
+		self.assertRaises(ValueError, header_codec.Composite_Codec, ["Traffic Class", "DSCP"])
+
+class TCP_Header_Test(unittest.TestCase):
+
+	def test_sequence_number_and_payload_length(self):
+		buf = build_packet(payload=build_tcp_segment(0xfffffff0, b'x' * 100, 8))
+		self.assertEqual(header_codec.get_tcp_offset(buf), 40)
+		self.assertEqual(header_codec.get_tcp_sequence_number_and_payload_length(buf), (0xfffffff0, 100))
+
+	def test_extension_headers_are_walked(self):
+		# Hop-by-Hop Options (8 bytes) followed by TCP
+		extension = bytearray(8)
+		extension[0] = header_codec.NEXT_HEADER_TCP
+		buf = build_packet(0, extension + build_tcp_segment(7, b'data'))
+		self.assertEqual(header_codec.get_tcp_offset(buf), 48)
+		self.assertEqual(header_codec.get_tcp_sequence_number_and_payload_length(buf), (7, 4))
+
+	def test_packets_without_tcp(self):
+		udp = build_packet(17, bytearray(28))
+		self.assertEqual(header_codec.get_tcp_offset(udp), -1)
+		self.assertEqual(header_codec.get_tcp_sequence_number_and_payload_length(udp), (None, None))
+		# A fragment other than the first one
+		fragment = bytearray(8)
+		fragment[0] = header_codec.NEXT_HEADER_TCP
+		struct.pack_into('!H', fragment, 2, 1448)
+		buf = build_packet(header_codec.FRAGMENT_HEADER, fragment + bytearray(100))
+		self.assertEqual(header_codec.get_tcp_offset(buf), -1)
+		self.assertEqual(header_codec.get_tcp_sequence_number_and_payload_length(buf), (None, None))
+
+	def test_truncated_packet_length(self):
+		buf = build_packet(payload=build_tcp_segment(1, b'x' * 1000))
+		# Only the headers are copied, the length comes from the Payload Length field
+		headers = buf[:60]
+		self.assertEqual(header_codec.get_packet_length(headers), 1060)
+		self.assertEqual(header_codec.get_tcp_sequence_number_and_payload_length(headers), (1, 1000))
+
+	def test_segment_count(self):
+		buf = build_packet(payload=build_tcp_segment(1, b'x' * 4000))
+		self.assertEqual(header_codec.get_segment_count(buf, 1500), 3)
+		self.assertEqual(header_codec.get_segment_count(buf, 5000), 1)
+		self.assertEqual(header_codec.get_segment_count(build_packet(17, bytearray(4000)), 1500), 1)
+		# The payload length of the sender is enough, with only the headers of the packet
+		self.assertEqual(header_codec.get_segment_count(buf[:60], 1500, 4000), 3)
+		self.assertEqual(header_codec.get_segment_count(buf, 1360, 4000), 4)
+
+	def test_flow_key(self):
+		buf = build_packet(payload=build_tcp_segment(1))
+		struct.pack_into('!HH', buf, 40, 1234, 80)
+		self.assertEqual(header_codec.get_flow_key(buf), bytes(32) + struct.pack('!HH', 1234, 80))
+		self.assertEqual(header_codec.get_flow_key(build_packet(17, bytearray(8))), bytes(32))
+
+	@unittest.skipIf(TCP is None, "Scapy is not installed")
+	def test_scapy_fallback(self):
+		# An Authentication Header (24 bytes), which only Scapy walks, and only the headers copied
+		authentication = bytearray(24)
+		authentication[0] = header_codec.NEXT_HEADER_TCP
+		authentication[1] = 4
+		buf = build_packet(51, authentication + build_tcp_segment(9, b'x' * 1000, 6))
+		bind_layers(AH, TCP, nh=header_codec.NEXT_HEADER_TCP)
+		try:
+			self.assertEqual(header_codec.get_tcp_sequence_number_and_payload_length(buf[:128]), (9, 1000))
+			self.assertEqual(header_codec.get_tcp_sequence_number_and_payload_length(buf), (9, 1000))
+		finally:
+			split_layers(AH, TCP, nh=header_codec.NEXT_HEADER_TCP)
+
+if __name__ == '__main__':
+	unittest.main()
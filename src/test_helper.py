@@ -0,0 +1,522 @@
+import unittest
+import random
+import os
+import tempfile
+from array import array
+import helper
+import header_codec
+
+ESCAPE = 9
+
+class Fixed_Signatures:
+
+	def __init__(self, signatures):
+		'''
+		A signature stream with the given signatures, so the tests know the signature of each index.
+		'''
+		self.signatures = signatures
+		self.ranges = []
+
+	def get_range(self, start, stop):
+		self.ranges.append((start, stop))
+		return self.signatures[start:stop]
+
+def build_schedule(signatures, chunks=None):
+	'''
+	Returns a Marking_Schedule of 8 bit chunks (by default the index of each chunk) with the given signatures, in a single burst.
+	'''
+	if chunks is None:
+		chunks = list(range(len(signatures)))
+	return helper.Marking_Schedule(chunks, Fixed_Signatures(signatures), 8, 8, 0)
+
+class Hop_Limit_Calibration_Test(unittest.TestCase):
+
+	def receive(self, calibration, baseline, values, levels):
+		'''
+		Returns the values read by the receiver of calibration from the stego-packets carrying values, sent on a path where the clean packets
+		arrive with the hop limit baseline.
+		'''
+		sender = header_codec.Hop_Limit_Codec(levels)
+		decoded = []
+		for value in values:
+			pkt = bytearray(40)
+			pkt[header_codec.HOP_LIMIT_OFFSET] = baseline
+			sender.set(pkt, value)
+			decoded.append(calibration.codec.get(pkt))
+			calibration.add_stego(header_codec.get_hop_limit(pkt))
+		return decoded
+
+	def test_stego_packets_only(self):
+		# No clean packets between the stego-packets, on paths below and above the default baseline
+		generator = random.Random(1)
+		for levels in (2, 4, 8):
+			for baseline in (57, 74):
+				calibration = helper.Hop_Limit_Calibration(header_codec.Hop_Limit_Codec(levels), 256)
+				values = [generator.randrange(levels) for x in range(512)]
+				decoded = self.receive(calibration, baseline, values, levels)
+				self.assertEqual(calibration.codec.baseline, baseline)
+				self.assertEqual(decoded[-256:], values[-256:])
+
+	def test_stego_packets_follow_a_path_change(self):
+		generator = random.Random(2)
+		calibration = helper.Hop_Limit_Calibration(header_codec.Hop_Limit_Codec(8), 128)
+		self.receive(calibration, 57, [generator.randrange(8) for x in range(256)], 8)
+		values = [generator.randrange(8) for x in range(256)]
+		decoded = self.receive(calibration, 74, values, 8)
+		self.assertEqual(calibration.codec.baseline, 74)
+		self.assertEqual(decoded[-128:], values[-128:])
+
+	def test_stego_packets_missing_a_level(self):
+		# The centre of the stego hop limits is not the baseline until the lowest and the highest level are received
+		calibration = helper.Hop_Limit_Calibration(header_codec.Hop_Limit_Codec(4), 256)
+		self.receive(calibration, 57, [0, 1, 3] * 20, 4)
+		self.assertEqual(calibration.codec.baseline, 64)
+		self.assertEqual(calibration.recalibrations, 0)
+		self.receive(calibration, 57, [2], 4)
+		self.assertEqual(calibration.codec.baseline, 57)
+		self.assertEqual(calibration.recalibrations, 1)
+
+	def test_clean_packets(self):
+		calibration = helper.Hop_Limit_Calibration(header_codec.Hop_Limit_Codec(4), 32)
+		for hop_limit in [57] * 15:
+			calibration.add(hop_limit)
+		self.assertEqual(calibration.codec.baseline, 64)
+		calibration.add(57)
+		self.assertEqual(calibration.codec.baseline, 57)
+		# The most frequent hop limit of the window, once the old samples have left it
+		for hop_limit in [58, 58, 57] * 16:
+			calibration.add(hop_limit)
+		self.assertEqual(calibration.codec.baseline, 58)
+		self.assertEqual(calibration.recalibrations, 2)
+
+	def test_clean_packets_take_over_the_stego_packets(self):
+		calibration = helper.Hop_Limit_Calibration(header_codec.Hop_Limit_Codec(4), 256)
+		for x in range(16):
+			calibration.add(60)
+		# With enough clean packets, the stego hop limits (centred on 57) no longer move the baseline
+		self.receive(calibration, 57, [0, 1, 2, 3] * 8, 4)
+		self.assertEqual(calibration.codec.baseline, 60)
+
+class Resync_Window_Test(unittest.TestCase):
+
+	def test_find_in_the_window(self):
+		window = helper.Resync_Window(build_schedule([10, 11, 12, 13, 11, 14, 15]), 3)
+		# The window covers the indices 1, 2 and 3 following the expected index 0
+		self.assertEqual(window.find(12, 0), 2)
+		self.assertEqual(window.find(14, 0), None)
+		self.assertEqual(window.find(10, 0), None)
+		self.assertEqual(window.lookup(11, 0), [1])
+		self.assertEqual(window.lookup(11, 1), [4])
+
+	def test_window_moves(self):
+		signatures = [x % 5 for x in range(50)]
+		schedule = build_schedule(signatures)
+		window = helper.Resync_Window(schedule, 4)
+		for start in list(range(0, 45, 3)) + [2, 30, 31, 10]:
+			for signature in range(5):
+				expected = [x for x in range(start + 1, start + 5) if signatures[x] == signature]
+				self.assertEqual(list(window.lookup(signature, start)), expected)
+
+	def test_window_at_the_end_of_the_message(self):
+		window = helper.Resync_Window(build_schedule([1, 2, 3]), 4)
+		self.assertEqual(window.find(3, 1), 2)
+		self.assertEqual(window.find(1, 2), None)
+
+	def test_confirm(self):
+		window = helper.Resync_Window(build_schedule([10, 11, 12, 13, 14, 15, 16]), 4)
+		# A clean packet with the signature of the stego-packet 2, followed by another clean packet
+		self.assertEqual(window.confirm(12, 0, 'clean'), None)
+		self.assertEqual(window.confirm(99, 0, 'clean'), None)
+		# The stego-packet 2 followed by the stego-packet 3
+		self.assertEqual(window.confirm(12, 0, 'second'), None)
+		self.assertEqual(window.confirm(13, 0, 'third'), (2, 'second'))
+		# A candidate found while another index was expected is stale
+		self.assertEqual(window.confirm(13, 1, 'third'), None)
+		self.assertEqual(window.confirm(14, 2, 'fourth'), None)
+
+	def test_confirm_across_the_clean_packets(self):
+		signatures = [10, 11, 12, 13, 14, 15, 16]
+		schedule = helper.Marking_Schedule(list(range(7)), Fixed_Signatures(signatures), 8, 8, 3)
+		window = helper.Resync_Window(schedule, 4)
+		# The stego-packet 2 ends its burst: the stego-packet 3 follows the 2 clean packets
+		self.assertEqual(window.confirm(12, 0, 'third'), None)
+		self.assertEqual(window.confirm(99, 0, 'clean'), None)
+		self.assertEqual(window.confirm(98, 0, 'clean'), None)
+		self.assertEqual(window.confirm(13, 0, 'fourth', 2), None)
+		self.assertEqual(window.confirm(12, 0, 'third', 2), None)
+		self.assertEqual(window.confirm(99, 0, 'clean', 2), None)
+		self.assertEqual(window.confirm(98, 0, 'clean', 2), None)
+		self.assertEqual(window.confirm(13, 0, 'fourth', 2), (2, 'third'))
+		# One more clean packet than the burst drops the candidate
+		self.assertEqual(window.confirm(12, 0, 'third', 2), None)
+		for signature in (99, 98, 97):
+			self.assertEqual(window.confirm(signature, 0, 'clean', 2), None)
+		self.assertEqual(window.confirm(13, 0, 'fourth', 2), None)
+
+class Next_Sequence_Test(unittest.TestCase):
+
+	def send(self, segments, min_length):
+		'''
+		Returns the segments taken for retransmissions by a reliable sender which sees only the segments of (seq, payload length)
+		with at least min_length bytes, as with the min_payload match.
+		'''
+		retransmissions = []
+		next_expected_seq = None
+		for seq, payload_length in segments:
+			if payload_length < min_length:
+				continue
+			if next_expected_seq is not None and helper.is_sequence_before(seq, next_expected_seq):
+				retransmissions.append(seq)
+			else:
+				next_expected_seq = helper.get_next_sequence(seq if next_expected_seq is None else next_expected_seq, seq, payload_length)
+		return retransmissions
+
+	def test_filtered_segments(self):
+		for start in (1000, 0xfffffe00):
+			# More bytes in the small segments than in a large one
+			lengths = [500] + [10] * 60 + [500, 500]
+			segments = []
+			seq = start
+			for length in lengths:
+				segments.append((seq, length))
+				seq = (seq + length) & helper.TCP_SEQUENCE_MASK
+			# The retransmissions of the last segment and of a small one, then new data
+			segments += [segments[-1], segments[1], (seq, 500)]
+			self.assertEqual(self.send(segments, 100), [segments[62][0]])
+			self.assertEqual(self.send(segments, 0), [segments[62][0], segments[1][0]])
+
+	def test_retransmission_does_not_move_back(self):
+		self.assertEqual(helper.get_next_sequence(2000, 1000, 500), 2000)
+		self.assertEqual(helper.get_next_sequence(2000, 1500, 1000), 2500)
+		self.assertEqual(helper.get_next_sequence(0x100, 0xffffff00, 0x100), 0x100)
+		self.assertEqual(helper.get_next_sequence(0xffffff00, 0xffffff80, 0x100), 0x80)
+
+class Clean_Segments_Test(unittest.TestCase):
+
+	def test_segments_in_the_burst(self):
+		self.assertEqual(helper.count_clean_segments(0, 4, 3), 3)
+		self.assertEqual(helper.count_clean_segments(5, 4, 2), 7)
+
+	def test_segments_past_the_burst_are_not_counted(self):
+		# The receiver goes back to the stegotime after 4 clean packets
+		self.assertEqual(helper.count_clean_segments(1, 4, 10), 4)
+		self.assertEqual(helper.count_clean_segments(8, 4, 5), 12)
+		self.assertEqual(helper.count_clean_segments(4, 4, 6), 8)
+
+class Ip6tables_Matches_Test(unittest.TestCase):
+
+	def test_min_payload(self):
+		self.assertEqual(helper.get_ip6tables_matches(['protocol=tcp', 'min_payload=1']), ['-p', 'tcp', '-m', 'length', '--length', '101:'])
+		for options in (['min_payload=1'], ['protocol=udp', 'min_payload=1'], ['protocol=tcp', 'min_payload=x']):
+			with self.assertRaises(ValueError):
+				helper.get_ip6tables_matches(options)
+
+class Channel_Option_Parser_Test(unittest.TestCase):
+
+	def parse(self, argv, marking=False):
+		settings, args = helper.get_channel_option_parser(marking).parse_args(argv)
+		helper.check_channel_options(settings, marking)
+		return settings
+
+	def test_marking_options(self):
+		settings = self.parse(['-r', 'sender', '-f', 'message', '-t', '2', '-g', '1,3', '-d', '1500'], True)
+		self.assertEqual(settings.stripe_weights, [1, 3])
+		self.assertEqual(settings.gso_mtu, 1500)
+		self.assertEqual(settings.matches, [])
+		self.assertEqual(self.parse(['-r', 'sender', '-f', 'message'], True).stripe_weights, [1])
+		self.assertFalse(hasattr(self.parse(['-r', 'sender', '-f', 'message']), 'stripes'))
+
+	def test_invalid_options(self):
+		for argv in (['-r', 'sender'], ['-r', 'both', '-f', 'message'], ['-r', 'sender', '-f', 'message', '-z', 'any'], ['-r', 'receiver', '-f', 'message', '-q', '2', '-a'], ['-r', 'sender', '-f', 'message', '-d', '1000'], ['-r', 'sender', '-f', 'message', '-t', '2', '-g', '1']):
+			with self.assertRaises(ValueError):
+				self.parse(argv, True)
+
+	def test_both_burst_lengths_are_needed(self):
+		settings = self.parse(['-r', 'sender', '-f', 'message', '-p', '3'])
+		self.assertEqual((settings.consecutive_nonstego, settings.consecutive_stego), (0, 0))
+		settings = self.parse(['-r', 'sender', '-f', 'message', '-p', '3', '-l', '2'])
+		self.assertEqual((settings.consecutive_nonstego, settings.consecutive_stego), (3, 2))
+
+class Marking_Schedule_Test(unittest.TestCase):
+
+	def setUp(self):
+		self.signatures = Fixed_Signatures([(x * 7) % 256 for x in range(100)])
+		self.chunks = [(x * 13) % 256 for x in range(100)]
+
+	def test_slots_are_packed_by_block(self):
+		schedule = helper.Marking_Schedule(self.chunks, self.signatures, 8, 8, 3, block_slots=16)
+		# Nothing is packed until a stego-packet is needed
+		self.assertEqual(self.signatures.ranges, [])
+		self.assertEqual(len(schedule), 100)
+		self.assertEqual(divmod(schedule[37], schedule.data_modulus), (self.signatures.signatures[37], self.chunks[37]))
+		self.assertEqual(self.signatures.ranges, [(32, 48)])
+		self.assertEqual(list(schedule), [signature << 8 | data for data, signature in zip(self.chunks, self.signatures.signatures)])
+		self.assertEqual(schedule.get_signature(99), self.signatures.signatures[99])
+		self.assertEqual(schedule.get_signature(100), None)
+		with self.assertRaises(IndexError):
+			schedule[100]
+
+	def test_cached_blocks(self):
+		schedule = helper.Marking_Schedule(self.chunks, self.signatures, 8, 8, 3, block_slots=8)
+		# The resync window ahead of the expected stego-packet is read from the blocks kept
+		for index in range(60, 70):
+			schedule[index]
+			schedule[index + 24]
+		self.assertEqual(self.signatures.ranges, [(56, 64), (80, 88), (64, 72), (88, 96)])
+		for index in range(0, 100, 8):
+			schedule[index]
+		self.assertEqual(list(schedule.blocks), [9, 10, 11, 12])
+
+	def test_burst_ends(self):
+		schedule = helper.Marking_Schedule(self.chunks, self.signatures, 8, 8, 3)
+		self.assertEqual([x for x in range(10) if schedule.ends_burst(x)], [2, 5, 8])
+		schedule = helper.Marking_Schedule(self.chunks, self.signatures, 8, 8, 0)
+		self.assertFalse(any(schedule.ends_burst(x) for x in range(100)))
+
+	def test_max_signature(self):
+		schedule = helper.Marking_Schedule(self.chunks, Fixed_Signatures([255, 254, 3]), 8, 8, 0, 254)
+		self.assertEqual([schedule.get_signature(x) for x in range(3)], [254, 254, 3])
+		self.assertTrue(schedule.repeats_signature(0))
+		self.assertFalse(schedule.repeats_signature(1))
+
+	def test_select(self):
+		schedule = helper.Marking_Schedule(self.chunks, self.signatures, 8, 8, 0, block_slots=4)
+		indices = array('Q', range(1, 100, 3))
+		stripe = schedule.select(indices, 2)
+		self.assertEqual(len(stripe), len(indices))
+		self.assertEqual(list(stripe), [schedule[x] for x in indices])
+		self.assertEqual([x for x in range(6) if stripe.ends_burst(x)], [1, 3, 5])
+		# A stripe of a stripe keeps the chunks and the signatures of the message
+		substripe = stripe.select(array('Q', [0, 2, 4]), 0)
+		self.assertEqual(list(substripe), [schedule[1], schedule[7], schedule[13]])
+
+class Character_Unstuffer_Test(unittest.TestCase):
+
+	def test_push(self):
+		unstuffer = helper.Character_Unstuffer(ESCAPE, 8)
+		for symbol in (1, ESCAPE, ESCAPE, 2):
+			self.assertTrue(unstuffer.push(symbol))
+		# A single escape value followed by another value is the delimiter
+		self.assertTrue(unstuffer.push(ESCAPE))
+		self.assertFalse(unstuffer.push(3))
+		self.assertEqual(unstuffer.data.tolist(), [1, ESCAPE, 2])
+
+	def test_feed_stops_at_the_delimiter(self):
+		for symbols in ([1, ESCAPE, ESCAPE, 2, ESCAPE, 3, 4], array('B', [1, ESCAPE, ESCAPE, 2, ESCAPE, 3, 4])):
+			unstuffer = helper.Character_Unstuffer(ESCAPE, 8)
+			self.assertEqual(unstuffer.feed(symbols), 5)
+			self.assertTrue(unstuffer.escape_pending)
+			self.assertEqual(unstuffer.data.tolist(), [1, ESCAPE, 2])
+
+	def test_feed_across_blocks(self):
+		stuffed = [1, ESCAPE, ESCAPE, 2, ESCAPE, ESCAPE, ESCAPE, ESCAPE, 3]
+		for size in range(1, len(stuffed) + 1):
+			unstuffer = helper.Character_Unstuffer(ESCAPE, 8)
+			for x in range(0, len(stuffed), size):
+				block = array('B', stuffed[x:x + size])
+				self.assertEqual(unstuffer.feed(block), len(block))
+			self.assertEqual(unstuffer.data.tolist(), [1, ESCAPE, 2, ESCAPE, ESCAPE, 3])
+
+	def test_wide_symbols(self):
+		escape = 1048574
+		chunks = array('I', [escape, 5, escape, 1 << 19])
+		stuffed = helper.character_stuff(chunks, escape)
+		self.assertEqual(stuffed.tolist(), [escape, escape, 5, escape, escape, 1 << 19])
+		unstuffer = helper.Character_Unstuffer(escape, 20)
+		self.assertEqual(unstuffer.feed(stuffed), len(stuffed))
+		self.assertEqual(unstuffer.data.tolist(), chunks.tolist())
+
+	def test_reset(self):
+		unstuffer = helper.Character_Unstuffer(ESCAPE, 8)
+		unstuffer.feed([1, ESCAPE])
+		unstuffer.reset()
+		self.assertFalse(unstuffer.escape_pending)
+		self.assertEqual(len(unstuffer.data), 0)
+
+	def test_character_unstuff(self):
+		self.assertEqual(helper.character_unstuff([1, ESCAPE, ESCAPE, 2], ESCAPE), [1, ESCAPE, 2])
+		self.assertEqual(helper.character_unstuff([ESCAPE, 1, ESCAPE], ESCAPE), [1, ESCAPE])
+
+class Signature_Cache_Test(unittest.TestCase):
+
+	def setUp(self):
+		self.directory = tempfile.TemporaryDirectory()
+
+	def tearDown(self):
+		self.directory.cleanup()
+
+	def test_signatures_of_the_scheme(self):
+		for scheme, stream in helper.SIGNATURE_SCHEMES.items():
+			cache = helper.Signature_Cache(scheme, [0, 3, 7], directory=self.directory.name, block_size=64)
+			self.assertEqual(cache.get_range(10, 100).tolist(), list(stream([0, 3, 7]).get_range(10, 100)))
+			self.assertEqual(cache[150], stream([0, 3, 7]).get_range(150, 151)[0])
+			cache.close()
+
+	def test_file_grows_by_blocks(self):
+		cache = helper.Signature_Cache('counter', [1, 2], directory=self.directory.name, block_size=64)
+		self.assertEqual(len(cache), 0)
+		cache.get_range(0, 10)
+		self.assertEqual(len(cache), 64)
+		cache[64]
+		self.assertEqual(len(cache), 128)
+		self.assertEqual(os.path.getsize(cache.path), 128 * cache.itemsize)
+		cache.close()
+
+	def test_file_is_shared(self):
+		first = helper.Signature_Cache('legacy', [1, 2], directory=self.directory.name, block_size=64)
+		first.get_range(0, 200)
+		# Another process with the same parameters maps the signatures without generating them
+		second = helper.Signature_Cache('legacy', [1, 2], directory=self.directory.name, block_size=64)
+		self.assertEqual(second.path, first.path)
+		self.assertEqual(len(second), 256)
+		self.assertEqual(second.get_range(0, 200), first.get_range(0, 200))
+		# The file is keyed by the scheme, the seed and the indices
+		self.assertNotEqual(helper.Signature_Cache('counter', [1, 2], directory=self.directory.name).path, first.path)
+		self.assertNotEqual(helper.Signature_Cache('legacy', [1, 3], directory=self.directory.name).path, first.path)
+		self.assertNotEqual(helper.Signature_Cache('legacy', [1, 2], seed=7, directory=self.directory.name).path, first.path)
+		first.close()
+		second.close()
+
+class Retransmission_Map_Test(unittest.TestCase):
+
+	def test_sequence_order(self):
+		self.assertTrue(helper.is_sequence_before(1, 2))
+		self.assertFalse(helper.is_sequence_before(2, 1))
+		self.assertFalse(helper.is_sequence_before(5, 5))
+		self.assertTrue(helper.is_sequence_before(0xfffffff0, 0x10))
+		self.assertFalse(helper.is_sequence_before(0x10, 0xfffffff0))
+
+	def test_get_and_evict_across_a_wrap(self):
+		retransmissions = helper.Retransmission_Map(3000)
+		seq = 0xfffff000
+		sent = []
+		for index in range(10):
+			retransmissions.add(seq, index, index + 100)
+			sent.append(seq)
+			seq = (seq + 1000) & helper.TCP_SEQUENCE_MASK
+			retransmissions.evict(seq)
+		# Only the segments starting at most 3000 bytes before the next sequence number are kept
+		self.assertEqual(len(retransmissions), 3)
+		for index, seq in enumerate(sent):
+			self.assertEqual(retransmissions.get(seq), (index, index + 100) if index >= 7 else None)
+
+	def test_gso_packets_across_a_wrap(self):
+		retransmissions = helper.Retransmission_Map(100000)
+		retransmissions.add(0xffffe000, 1, 11, 0x3000)
+		retransmissions.add(0x00001000, 2, 12)
+		retransmissions.add(0x00002000, 3, 13, 0x2000)
+		# The segments cut from a GSO packet
+		self.assertEqual(retransmissions.get(0xffffe000 + 0x1000), (1, 11))
+		self.assertEqual(retransmissions.get(0x00000800), (1, 11))
+		self.assertEqual(retransmissions.get(0x00003000), (3, 13))
+		# Past the end of a GSO packet, or of a single segment, or before the first packet
+		self.assertEqual(retransmissions.get(0x00001800), None)
+		self.assertEqual(retransmissions.get(0x00004000), None)
+		self.assertEqual(retransmissions.get(0xffffd000), None)
+
+	def test_evicted_sequence_numbers_are_dropped_in_batches(self):
+		retransmissions = helper.Retransmission_Map(1000)
+		for seq in range(0, 10000, 100):
+			# Every other one is a GSO packet of 2 segments
+			retransmissions.add(seq, seq, 1, 100 if seq % 200 else 0)
+		# A segment without data repeats the sequence number of the following one
+		retransmissions.add(9900, 9900, 1)
+		retransmissions.evict(5000)
+		self.assertEqual(len(retransmissions), 60)
+		self.assertEqual((retransmissions.first, len(retransmissions.sequence_numbers)), (40, 101))
+		# Past half of the list, the evicted sequence numbers are dropped
+		retransmissions.evict(7000)
+		self.assertEqual((retransmissions.first, retransmissions.sequence_numbers[0]), (0, 6000))
+		self.assertEqual(len(retransmissions), 40)
+		self.assertTrue(all(seq >= 6000 for seq in retransmissions.ends))
+		self.assertEqual(retransmissions.get(6150), (6100, 1))
+		self.assertEqual(retransmissions.get(5950), None)
+		retransmissions.evict(20000)
+		self.assertEqual(len(retransmissions), 0)
+		self.assertEqual(retransmissions.get(9900), None)
+
+	def test_clear(self):
+		retransmissions = helper.Retransmission_Map(1000)
+		retransmissions.add(5, 1, 2, 100)
+		retransmissions.clear()
+		self.assertEqual(len(retransmissions), 0)
+		self.assertEqual(retransmissions.get(50), None)
+
+class Reassembly_Buffer_Test(unittest.TestCase):
+
+	def setUp(self):
+		self.schedule = build_schedule([20, 21, 22, 23, 24, 25], [100, 101, 102, 103, 104, 105])
+
+	def test_in_order(self):
+		buffer = helper.Reassembly_Buffer(self.schedule, 3, 10000)
+		self.assertEqual(buffer.place(0, 20, 100, 1000), 0)
+		self.assertEqual(list(buffer.pop(0)), [100])
+		self.assertEqual(buffer.reordered, 0)
+
+	def test_reordered_segments_wait_for_the_missing_ones(self):
+		buffer = helper.Reassembly_Buffer(self.schedule, 3, 10000)
+		self.assertEqual(buffer.place(0, 22, 102, 1200), 2)
+		self.assertEqual(buffer.place(0, 21, 101, 1100), 1)
+		self.assertEqual(list(buffer.pop(0)), [])
+		self.assertEqual(buffer.place(0, 20, 100, 1000), 0)
+		self.assertEqual(list(buffer.pop(0)), [100, 101, 102])
+		self.assertEqual(buffer.reordered, 2)
+
+	def test_duplicates_are_dropped(self):
+		buffer = helper.Reassembly_Buffer(self.schedule, 3, 10000)
+		buffer.place(0, 20, 100, 1000)
+		# A retransmission of the same segment
+		self.assertEqual(buffer.place(1, 20, 100, 1000), None)
+		# A copy of a segment whose signature is already taken in the window
+		buffer.place(1, 22, 102, 1200)
+		self.assertEqual(buffer.place(1, 22, 102, None), None)
+		self.assertEqual(buffer.duplicates, 2)
+		# A signature outside the window is not a duplicate
+		self.assertEqual(buffer.place(1, 25, 105, 1500), None)
+		self.assertEqual(buffer.duplicates, 2)
+
+	def test_sequence_numbers_wrap(self):
+		buffer = helper.Reassembly_Buffer(self.schedule, 3, 1000)
+		seq = 0xfffffe00
+		for index in range(4):
+			self.assertEqual(buffer.place(index, 20 + index, 100 + index, seq), index)
+			seq = (seq + 400) & helper.TCP_SEQUENCE_MASK
+		self.assertEqual(buffer.highest_seq, 0x000002b0)
+		# The segments more than 1000 bytes behind are forgotten, the following ones are still known
+		self.assertEqual(len(buffer.segments), 3)
+		self.assertEqual(buffer.place(4, 21, 101, 0xffffff90), None)
+
+	def test_reset(self):
+		buffer = helper.Reassembly_Buffer(self.schedule, 3, 10000)
+		buffer.place(0, 21, 101, 1100)
+		buffer.reset()
+		self.assertEqual(buffer.values, {})
+		self.assertEqual(len(buffer.segments), 0)
+		self.assertEqual(buffer.place(0, 20, 100, 1000), 0)
+
+class Stripe_Test(unittest.TestCase):
+
+	def test_merge_stripes_is_the_inverse_of_get_stripe_indices(self):
+		for length, weights in ((10, [1, 1]), (17, [2, 1, 3]), (5, [4, 4]), (3, [1, 1, 1, 1])):
+			stripes = helper.get_stripe_indices(length, weights)
+			self.assertEqual(sorted(x for indices in stripes for x in indices), list(range(length)))
+			values = [[x * 10 for x in indices] for indices in stripes]
+			self.assertEqual(helper.merge_stripes(stripes, values), [x * 10 for x in range(length)])
+
+	def test_stripes_are_dealt_by_weight(self):
+		stripes = helper.get_stripe_indices(12, [2, 1, 3])
+		self.assertEqual([x.tolist() for x in stripes], [[0, 1, 6, 7], [2, 8], [3, 4, 5, 9, 10, 11]])
+
+	def test_incomplete_stripe(self):
+		stripes = helper.get_stripe_indices(6, [1, 2])
+		merged = helper.merge_stripes(stripes, [[0, 3], [1]])
+		self.assertEqual(merged, [0, 1, None, 3, None, None])
+
+	def test_stripe_view(self):
+		stripe = helper.Stripe([10, 11, 12, 13], array('Q', [1, 3]))
+		self.assertEqual(len(stripe), 2)
+		self.assertEqual(stripe[1], 13)
+		self.assertEqual(list(stripe), [11, 13])
+
+if __name__ == '__main__':
+	unittest.main()
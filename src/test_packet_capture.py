@@ -0,0 +1,111 @@
+import ctypes
+import socket
+import struct
+import unittest
+import helper
+import packet_capture
+
+SOURCE = 'fd00::1'
+DESTINATION = 'fd00::2'
+
+class tpacket_hdr_v1(ctypes.Structure):
+	_fields_ = [('block_status', ctypes.c_uint32), ('num_pkts', ctypes.c_uint32), ('offset_to_first_pkt', ctypes.c_uint32),
+		('blk_len', ctypes.c_uint32), ('seq_num', ctypes.c_uint64), ('ts_first_pkt', ctypes.c_uint32 * 2), ('ts_last_pkt', ctypes.c_uint32 * 2)]
+
+class tpacket_block_desc(ctypes.Structure):
+	_fields_ = [('version', ctypes.c_uint32), ('offset_to_priv', ctypes.c_uint32), ('hdr', tpacket_hdr_v1)]
+
+class tpacket3_hdr(ctypes.Structure):
+	_fields_ = [('tp_next_offset', ctypes.c_uint32), ('tp_sec', ctypes.c_uint32), ('tp_nsec', ctypes.c_uint32), ('tp_snaplen', ctypes.c_uint32),
+		('tp_len', ctypes.c_uint32), ('tp_status', ctypes.c_uint32), ('tp_mac', ctypes.c_uint16), ('tp_net', ctypes.c_uint16)]
+
+class sock_filter(ctypes.Structure):
+	_fields_ = [('code', ctypes.c_uint16), ('jt', ctypes.c_uint8), ('jf', ctypes.c_uint8), ('k', ctypes.c_uint32)]
+
+def run_filter(program, packet, packet_type):
+	'''
+	Runs the classic BPF program on the packet (the subset of instructions used by build_address_filter) and returns the bytes kept.
+	'''
+	pc = 0
+	accumulator = 0
+	while True:
+		code, jt, jf, k = program[pc]
+		if code == packet_capture.BPF_LD_W_ABS:
+			if k == packet_capture.SKF_AD_PKTTYPE:
+				accumulator = packet_type
+			elif k + 4 > len(packet):
+				return 0
+			else:
+				accumulator = struct.unpack_from('!I', packet, k)[0]
+			pc += 1
+		elif code == packet_capture.BPF_JMP_JEQ_K:
+			pc += 1 + (jt if accumulator == k else jf)
+		elif code == packet_capture.BPF_RET_K:
+			return k
+		else:
+			raise ValueError("ValueError: unexpected BPF instruction " + hex(code) + "!")
+
+def build_packet(source, destination):
+	packet = bytearray(60)
+	packet[0] = 0x60
+	packet[8:24] = socket.inet_pton(socket.AF_INET6, source)
+	packet[24:40] = socket.inet_pton(socket.AF_INET6, destination)
+	return packet
+
+class Address_Filter_Test(unittest.TestCase):
+
+	def setUp(self):
+		self.program = packet_capture.build_address_filter(SOURCE, DESTINATION, 128)
+
+	def test_packets_from_source_to_destination_are_kept(self):
+		self.assertEqual(run_filter(self.program, build_packet(SOURCE, DESTINATION), 0), 128)
+
+	def test_other_packets_are_dropped(self):
+		for source, destination in ((DESTINATION, SOURCE), ('fd00::3', DESTINATION), (SOURCE, 'fd00::3'), ('fd01::1', 'fd00::2'), (SOURCE, 'fd00::2:0')):
+			self.assertEqual(run_filter(self.program, build_packet(source, destination), 0), 0)
+
+	def test_outgoing_packets_are_dropped(self):
+		self.assertEqual(run_filter(self.program, build_packet(SOURCE, DESTINATION), packet_capture.PACKET_OUTGOING), 0)
+
+	def test_jumps_stay_in_the_program(self):
+		for pc, (code, jt, jf, k) in enumerate(self.program):
+			if code == packet_capture.BPF_JMP_JEQ_K:
+				self.assertLess(pc + 1 + max(jt, jf), len(self.program))
+		self.assertEqual(self.program[-1], (packet_capture.BPF_RET_K, 0, 0, 0))
+
+	def test_default_capture_length(self):
+		program = packet_capture.build_address_filter(SOURCE, DESTINATION)
+		self.assertEqual(run_filter(program, build_packet(SOURCE, DESTINATION), 0), helper.HEADER_COPY_RANGE)
+
+class Ring_Layout_Test(unittest.TestCase):
+
+	def test_block_descriptor(self):
+		self.assertEqual(packet_capture.BLOCK_STATUS_OFFSET, tpacket_block_desc.hdr.offset + tpacket_hdr_v1.block_status.offset)
+		block = tpacket_block_desc()
+		block.hdr.block_status = packet_capture.TP_STATUS_USER
+		block.hdr.num_pkts = 3
+		block.hdr.offset_to_first_pkt = 48
+		raw = bytes(block)
+		self.assertEqual(packet_capture._BLOCK_STATUS.unpack_from(raw, packet_capture.BLOCK_STATUS_OFFSET)[0], packet_capture.TP_STATUS_USER)
+		self.assertEqual(packet_capture._BLOCK_PACKETS.unpack_from(raw, packet_capture.BLOCK_STATUS_OFFSET + 4), (3, 48))
+
+	def test_packet_header(self):
+		header = tpacket3_hdr(tp_next_offset=1024, tp_sec=1, tp_nsec=2, tp_snaplen=128, tp_len=1500, tp_status=5, tp_mac=68, tp_net=68)
+		self.assertEqual(packet_capture._PACKET_HEADER.unpack_from(bytes(header)), (1024, 128, 1500, 68))
+
+	def test_request_statistics_and_filter_sizes(self):
+		self.assertEqual(packet_capture._TPACKET_REQ3.size, 7 * ctypes.sizeof(ctypes.c_uint32))
+		self.assertEqual(packet_capture._TPACKET_STATS_V3.size, 3 * ctypes.sizeof(ctypes.c_uint32))
+		instruction = sock_filter(packet_capture.BPF_JMP_JEQ_K, 1, 2, 0xdeadbeef)
+		self.assertEqual(packet_capture._SOCK_FILTER.pack(packet_capture.BPF_JMP_JEQ_K, 1, 2, 0xdeadbeef), bytes(instruction))
+
+class Captured_Packet_Test(unittest.TestCase):
+
+	def test_captured_packet_cannot_be_modified(self):
+		packet = packet_capture.Captured_Packet(b'headers', 1500)
+		self.assertEqual(packet.get_payload(), b'headers')
+		self.assertEqual(packet.get_payload_len(), 1500)
+		self.assertRaises(ValueError, packet.set_payload, b'')
+
+if __name__ == '__main__':
+	unittest.main()